@@ -0,0 +1,110 @@
+import argparse
+import sys
+
+from benchmarks import suite
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help='time every pipeline stage and store the results as JSON')
+    run.add_argument('--out', default='bench_results.json')
+    run.add_argument('--shapefile', default='data/GSHHS_c_L1.shp')
+    run.add_argument('--scale', choices=sorted(suite.SCALES), default='small',
+                     help='synthetic polygon sizes, "full" goes up to 1M vertices')
+    run.add_argument('--sizes', type=lambda s: [int(n) for n in s.split(',')], default=None,
+                     help='comma separated synthetic polygon sizes, overrides --scale')
+    run.add_argument('--repeat', type=int, default=3)
+    run.add_argument('--queries', type=int, default=200)
+    run.add_argument('--only', nargs='*', help='run only these datasets')
+
+    cmp = commands.add_parser('compare', help='flag stages slower or hungrier than a saved baseline')
+    cmp.add_argument('baseline')
+    cmp.add_argument('current')
+    cmp.add_argument('--threshold', type=float, default=0.10, help='allowed slowdown, as a fraction')
+    cmp.add_argument('--memory-threshold', type=float, default=0.10,
+                     help='allowed growth of the peak memory, as a fraction')
+
+    local = commands.add_parser('locality', help='compare triangulation order with the Morton renumbered index')
+    local.add_argument('--out', default=None, help='also store the results as JSON')
+    local.add_argument('--scale', choices=sorted(suite.SCALES), default='small')
+    local.add_argument('--sizes', type=lambda s: [int(n) for n in s.split(',')], default=None)
+    local.add_argument('--repeat', type=int, default=3)
+    local.add_argument('--queries', type=int, default=200)
+
+    engine = commands.add_parser('engines', help='compare the DCEL corridor and funnel with the visibility graph')
+    engine.add_argument('--out', default=None, help='also store the results as JSON')
+    engine.add_argument('--sizes', type=lambda s: [int(n) for n in s.split(',')], default=suite.ENGINE_SIZES)
+    engine.add_argument('--repeat', type=int, default=3)
+    engine.add_argument('--queries', type=int, default=200)
+
+    imports = commands.add_parser('imports', help='check the cold start of the query path against a budget')
+    imports.add_argument('--budget-ms', type=float, default=suite.IMPORT_BUDGET_MS)
+    imports.add_argument('--repeat', type=int, default=5)
+    imports.add_argument('modules', nargs='*', default=suite.QUERY_MODULES)
+
+    args = parser.parse_args()
+    if args.command == 'locality':
+        report = suite.locality(args.sizes or suite.SCALES[args.scale], args.repeat, args.queries)
+        if args.out:
+            suite.save(report, args.out)
+        for dataset, result in report['results'].items():
+            before, after = result['triangulation'], result['morton']
+            print(f'{dataset}: median neighbor gap {before["median_neighbor_gap"]:.0f} -> '
+                  f'{after["median_neighbor_gap"]:.0f}')
+            for stage in ('corridor', 'walk', 'neighbor_gather'):
+                b, a = before[stage]['median_s'], after[stage]['median_s']
+                print(f'  {stage:<16} {b * 1000:10.2f} ms -> {a * 1000:10.2f} ms  ({b / a:.2f}x)')
+        return 0
+
+    if args.command == 'engines':
+        report = suite.engines(args.sizes, args.repeat, args.queries)
+        if args.out:
+            suite.save(report, args.out)
+        for dataset, result in report['results'].items():
+            funnel, graph = result['bfs+funnel']['per_query_s'], result['visibility']['per_query_s']
+            print(f'{dataset}: {result["reflex_vertices"]} reflex vertices, {result["graph_edges"]} edges '
+                  f'({result["graph_bytes"] / 2**20:.2f} MiB) built in {result["visibility_build"]["median_s"]:.2f} s')
+            print(f'  bfs+funnel {funnel * 1000:8.3f} ms  visibility {graph * 1000:8.3f} ms  '
+                  f'({"visibility" if graph < funnel else "bfs+funnel"} {max(funnel, graph) / min(funnel, graph):.2f}x)')
+        return 0
+
+    if args.command == 'imports':
+        result = suite.import_time(args.modules, args.repeat)
+        print(f'{", ".join(args.modules)}: {result["median_s"] * 1000:.0f} ms (budget {args.budget_ms:.0f} ms)')
+        failed = result['median_s'] * 1000 > args.budget_ms
+        if result['heavy']:
+            print(f'FAIL heavy modules imported: {", ".join(result["heavy"])}')
+        if failed:
+            print('FAIL over budget')
+        return 1 if failed or result['heavy'] else 0
+
+    if args.command == 'run':
+        report = suite.run(args.shapefile, args.sizes or suite.SCALES[args.scale],
+                           args.repeat, args.queries, args.only)
+        suite.save(report, args.out)
+        for dataset, stages in report['results'].items():
+            print(dataset)
+            for stage, result in stages.items():
+                if isinstance(result, dict):
+                    print(f'  {stage:<34} {result["median_s"] * 1000:10.2f} ms {result["peak_bytes"] / 2**20:9.2f} MiB')
+        print(f'Results written to {args.out}')
+        return 0
+
+    regressions = suite.compare(suite.load(args.baseline), suite.load(args.current), args.threshold,
+                                args.memory_threshold)
+    for dataset, stage, metric, before, after in regressions:
+        if metric == 'peak_bytes':
+            print(f'REGRESSION {dataset} {stage}: peak {before / 2**20:.2f} MiB -> {after / 2**20:.2f} MiB '
+                  f'({(after - before) / 2**20:+.2f} MiB)')
+        else:
+            print(f'REGRESSION {dataset} {stage}: {before * 1000:.2f} ms -> {after * 1000:.2f} ms '
+                  f'({(after / before - 1) * 100:+.0f}%)')
+    if not regressions:
+        print('No regressions.')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,296 @@
+import gc
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from itertools import chain
+from typing import Callable
+
+import numpy as np
+
+from lib.index.flat import FlatIndex
+from lib.index.visibility import VisibilityIndex
+from lib.path_finding.path_tools import DCEL
+from lib.point_location import min_triangle
+from lib.point_location.geo import generator
+from lib.point_location.geo.reader import read_polygons
+from lib.point_location.geo.shapes import Point, Polygon
+from lib.point_location.kirkpatrick import MultiPolygonLocator, SinglePolygonLocator
+from lib.triangulation.earcut import earcut
+
+SCALES = {
+    'small': [1_000, 10_000],
+    'full': [1_000, 10_000, 100_000, 1_000_000],
+}
+
+
+def datasets(shapefile: str, sizes: list[int]) -> dict[str, Callable[[], Polygon]]:
+    """
+        The polygons to benchmark, built lazily: the largest shape of the shapefile and synthetic
+        ones, a quarter of the vertices of the 'hole' ones going to their hole.
+    """
+    def largest_shape() -> Polygon:
+        return max(read_polygons(shapefile), key=lambda poly: poly.n)
+
+    sets = {'gshhs-largest': largest_shape}
+    for n in sizes:
+        sets[f'synthetic-{n}'] = lambda n=n: generator.random_simple_polygon(n, seed=0)
+        sets[f'coastline-{n}'] = lambda n=n: generator.fractal_coastline(n, seed=0)
+        sets[f'hole-{n}'] = lambda n=n: generator.random_polygon_with_hole(n - n // 4, n // 4, seed=0)
+    return sets
+
+
+def measure(func: Callable, repeat: int) -> dict:
+    """Times func 'repeat' times, then runs it once more under tracemalloc for its peak memory."""
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {'median_s': statistics.median(times), 'min_s': min(times), 'peak_bytes': peak}
+
+
+def sample_points(polygon: Polygon, count: int, seed: int) -> list[Point]:
+    """Interior points of the polygon, sampled by triangle area."""
+    return [Point(x, y) for x, y in generator.sample_interior_points(polygon, count, seed).tolist()]
+
+
+def run_polygon(polygon: Polygon, repeat: int, queries: int) -> dict:
+    """Measures every stage of the pipeline on one polygon."""
+    results = {'vertices': polygon.n}
+    coordinates = list(chain.from_iterable((p.x, p.y) for p in polygon.points))
+    holes = None
+    if polygon.hole:
+        holes = [len(coordinates) // 2]
+        coordinates += list(chain.from_iterable((p.x, p.y) for p in polygon.hole))
+
+    results['earcut'] = measure(lambda: earcut(coordinates, holes, 2), repeat)
+    results['Polygon.triangulation'] = measure(lambda: Polygon(polygon.points).triangulation, repeat)
+    results['larger_bounding_triangle'] = measure(
+        lambda: min_triangle.larger_bounding_triangle(polygon.points), repeat)
+
+    triangles = polygon.triangulation
+    results['triangles'] = len(triangles)
+    results['DCEL'] = measure(lambda: DCEL(triangles), repeat)
+
+    locator = SinglePolygonLocator(triangles, polygon)
+    results['SinglePolygonLocator._preprocess'] = measure(lambda: locator._preprocess(triangles, polygon), repeat)
+
+    starts = sample_points(polygon, queries, seed=1)
+    ends = sample_points(polygon, queries, seed=2)
+    start_triangles = [locator.locate(p) for p in starts]
+    end_triangles = [locator.locate(p) for p in ends]
+    corridors = [locator.dcel.corridor(a, b) for a, b in zip(start_triangles, end_triangles)]
+
+    def shortest_paths():
+        for a, b in zip(starts, ends):
+            locator.set_first_point(a)
+            locator.get_shortest_path(b)
+
+    stages = {
+        'locate': lambda: [locator.locate(p) for p in starts],
+        'bfs': lambda: [locator.dcel.bfs(a, b) for a, b in zip(start_triangles, end_triangles)],
+        'corridor': lambda: [locator.dcel.corridor(a, b) for a, b in zip(start_triangles, end_triangles)],
+        'funnel': lambda: [locator.dcel.funnel(c, a, b) for c, a, b in zip(corridors, starts, ends)],
+        'get_shortest_path': shortest_paths,
+    }
+    for name, func in stages.items():
+        results[name] = measure(func, repeat)
+        results[name]['per_query_s'] = results[name]['median_s'] / queries
+    return results
+
+
+def run_locality(polygon: Polygon, repeat: int, queries: int) -> dict:
+    """
+        Compares the index in triangulation order with the Morton renumbered one: how far
+        apart adjacent triangles are stored, and the time of the stages that follow adjacency
+        (corridor searches, segment walks and a gather of every triangle's neighbors).
+    """
+    locator = MultiPolygonLocator()
+    locator.add_regions([polygon])
+    starts = generator.sample_interior_points(polygon, queries, seed=1).tolist()
+    ends = generator.sample_interior_points(polygon, queries, seed=2).tolist()
+
+    results = {'vertices': polygon.n}
+    for order, index in (('triangulation', FlatIndex.from_locator(locator, renumber=False)),
+                         ('morton', FlatIndex.from_locator(locator, renumber=True))):
+        neighbors = index.neighbors
+        t, _ = np.nonzero(neighbors >= 0)
+        start_triangles = [index.locate(*p) for p in starts]
+        end_triangles = [index.locate(*p) for p in ends]
+        centroids = index.vertices[index.triangles].mean(axis=1)
+        adjacent = np.where(neighbors >= 0, neighbors, np.arange(len(neighbors))[:, None])
+
+        results[order] = {
+            'median_neighbor_gap': float(np.median(np.abs(neighbors[neighbors >= 0] - t))),
+            'corridor': measure(lambda: [index.corridor(a, b) for a, b in zip(start_triangles, end_triangles)],
+                                repeat),
+            'walk': measure(lambda: [index.walk(a, p, q) for a, p, q in zip(start_triangles, starts, ends)], repeat),
+            'neighbor_gather': measure(lambda: centroids[adjacent].mean(axis=1), repeat),
+        }
+    return results
+
+
+def locality(sizes: list[int], repeat: int, queries: int) -> dict:
+    report = {'meta': {'date': datetime.now(timezone.utc).isoformat(), 'revision': git_revision(),
+                       'python': platform.python_version(), 'machine': platform.platform(),
+                       'repeat': repeat, 'queries': queries},
+              'results': {}}
+    for n in sizes:
+        print(f'coastline-{n}...', flush=True)
+        report['results'][f'coastline-{n}'] = run_locality(generator.fractal_coastline(n, seed=0), repeat, queries)
+    return report
+
+
+# Polygon sizes of the engine comparison: building the visibility graph grows faster than the polygon.
+ENGINE_SIZES = [100, 1_000, 10_000]
+
+
+def run_engines(polygon: Polygon, repeat: int, queries: int) -> dict:
+    """
+        Compares the DCEL corridor search and funnel with the visibility graph of the
+        reflex vertices, on the same queries: the time to build the graph, its size, and
+        the time of the queries of both engines.
+    """
+    triangles = polygon.triangulation
+    locator = SinglePolygonLocator(triangles, polygon)
+    multi = MultiPolygonLocator()
+    multi.add_regions([polygon])
+    index = FlatIndex.from_locator(multi)
+    starts = sample_points(polygon, queries, seed=1)
+    ends = sample_points(polygon, queries, seed=2)
+    start_triangles = [locator.locate(p) for p in starts]
+    end_triangles = [locator.locate(p) for p in ends]
+    pairs = [((a.x, a.y), (b.x, b.y)) for a, b in zip(starts, ends)]
+
+    results = {'vertices': polygon.n, 'triangles': len(triangles)}
+    results['visibility_build'] = measure(lambda: VisibilityIndex(index), 1)
+    engine = VisibilityIndex(index)
+    results['reflex_vertices'] = len(engine.node_keys)
+    results['graph_edges'] = len(engine.edge_targets)
+    results['graph_bytes'] = engine.nbytes
+
+    stages = {
+        'bfs+funnel': lambda: [locator.dcel.funnel(locator.dcel.bfs(s, t), a, b)
+                               for s, t, a, b in zip(start_triangles, end_triangles, starts, ends)],
+        'visibility': lambda: [engine.shortest_path(a, b) for a, b in pairs],
+    }
+    for name, func in stages.items():
+        results[name] = measure(func, repeat)
+        results[name]['per_query_s'] = results[name]['median_s'] / queries
+    return results
+
+
+def engines(sizes: list[int], repeat: int, queries: int) -> dict:
+    report = {'meta': {'date': datetime.now(timezone.utc).isoformat(), 'revision': git_revision(),
+                       'python': platform.python_version(), 'machine': platform.platform(),
+                       'repeat': repeat, 'queries': queries},
+              'results': {}}
+    for n in sizes:
+        for name, build in ((f'synthetic-{n}', generator.random_simple_polygon),
+                            (f'coastline-{n}', generator.fractal_coastline)):
+            print(f'{name}...', flush=True)
+            report['results'][name] = run_engines(build(n, seed=0), repeat, queries)
+    return report
+
+
+# The modules short lived query workers import, and the heavy dependencies they must not load.
+QUERY_MODULES = ['lib.cli', 'lib.index.flat', 'lib.index.pool', 'lib.point_location.kirkpatrick']
+HEAVY_MODULES = ['scipy', 'matplotlib', 'shapefile']
+# Cold start budget of the query path, checked by `imports` and tests/test_imports.py.
+IMPORT_BUDGET_MS = 500.0
+
+
+def import_time(modules: list[str], repeat: int = 5) -> dict:
+    """
+        Imports the modules in fresh interpreters.
+
+        Returns: the median import time of 'repeat' cold starts and the heavy modules they loaded
+    """
+    script = ('import sys, time\n'
+              't = time.perf_counter()\n'
+              f'for m in {modules!r}: __import__(m)\n'
+              'print(time.perf_counter() - t)\n'
+              f'print(",".join(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n')
+    times, loaded = [], set()
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True).stdout
+        seconds, heavy = out.splitlines()
+        times.append(float(seconds))
+        loaded.update(filter(None, heavy.split(',')))
+    return {'median_s': statistics.median(times), 'min_s': min(times), 'heavy': sorted(loaded)}
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run(shapefile: str, sizes: list[int], repeat: int, queries: int, only: list[str] = None) -> dict:
+    report = {
+        'meta': {'date': datetime.now(timezone.utc).isoformat(), 'revision': git_revision(),
+                 'python': platform.python_version(), 'machine': platform.platform(),
+                 'repeat': repeat, 'queries': queries},
+        'results': {},
+    }
+    for name, build in datasets(shapefile, sizes).items():
+        if only and name not in only:
+            continue
+        print(f'{name}...', flush=True)
+        report['results'][name] = run_polygon(build(), repeat, queries)
+    return report
+
+
+# Peak memory changes smaller than this are tracemalloc noise, whatever their fraction.
+MEMORY_SLACK_BYTES = 64 * 1024
+
+
+def compare(baseline: dict, current: dict, threshold: float,
+            memory_threshold: float = 0.10) -> list[tuple[str, str, str, float, float]]:
+    """
+        Compares the median times and the peak memory of two reports.
+
+        Returns: the (dataset, stage, metric, baseline, current) of every stage whose
+        'median_s' grew by more than 'threshold', or whose 'peak_bytes' grew by more than
+        'memory_threshold' (fractions of the baseline) and MEMORY_SLACK_BYTES
+    """
+    regressions = []
+    for dataset, stages in current['results'].items():
+        for stage, result in stages.items():
+            if not isinstance(result, dict):
+                continue
+            if (before := baseline['results'].get(dataset, {}).get(stage)) is None:
+                continue
+            if result['median_s'] > before['median_s'] * (1 + threshold):
+                regressions.append((dataset, stage, 'median_s', before['median_s'], result['median_s']))
+            # Reports from before peak memory was measured have nothing to compare.
+            if (peak := result.get('peak_bytes')) is None or (previous := before.get('peak_bytes')) is None:
+                continue
+            if peak > previous * (1 + memory_threshold) and peak - previous > MEMORY_SLACK_BYTES:
+                regressions.append((dataset, stage, 'peak_bytes', previous, peak))
+    return regressions
+
+
+def load(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def save(report: dict, path: str):
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
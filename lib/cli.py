@@ -0,0 +1,226 @@
+import argparse
+import csv
+import os
+import struct
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Iterator, Optional
+
+import numpy as np
+
+from lib.index.flat import FlatIndex
+from lib.path_finding.funnel import from_ragged, path_length
+
+# Binary paths output: for every query the number of points n (uint32) followed by n (x, y) float64 pairs.
+PATH_HEADER = struct.Struct('<I')
+
+
+def build(shapefile: str, out: str, limit: Optional[int] = None, next_hop_limit: int = 256,
+          workers: Optional[int] = None, clearance: bool = True) -> FlatIndex:
+    """
+        Builds the index of a shapefile and saves it to the 'out' directory, with the next hop
+        tables of the polygons of at most next_hop_limit triangles (0 for none) built on
+        'workers' processes, and the edge and passage widths paths with a radius need unless
+        clearance is False.
+    """
+    from lib.point_location.geo.reader import read_polygons
+    from lib.point_location.kirkpatrick import MultiPolygonLocator
+
+    locator = MultiPolygonLocator()
+    skipped = locator.add_regions(read_polygons(shapefile, limit))
+    index = FlatIndex.from_locator(locator)
+    if next_hop_limit > 0:
+        index = index.with_next_hops(next_hop_limit, workers)
+    if clearance:
+        index = index.with_clearance()
+    index.save(out)
+    print(f'{len(index.polygon_bounds)} polygons, {len(index.triangles)} triangles, '
+          f'{index.nbytes / 2 ** 20:.1f} MiB, skipped {sorted(skipped or [])}', file=sys.stderr)
+    return index
+
+
+def read_pairs(path: str, chunk_size: int) -> Iterator[np.ndarray]:
+    """
+        Streams (N, 4) chunks of start x, start y, end x, end y from a .csv file (an optional
+        header is skipped), a .npy file (memory mapped) or any other file, read as raw
+        little endian float64 records of four values.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.npy':
+        pairs = np.load(path, mmap_mode='r').reshape(-1, 4)
+        for i in range(0, len(pairs), chunk_size):
+            yield np.asarray(pairs[i:i + chunk_size], dtype=np.float64)
+    elif extension == '.csv':
+        with open(path, newline='') as f:
+            rows = csv.reader(f)
+            first = next(rows, None)
+            if first is None:
+                return
+            try:
+                pending = [[float(v) for v in first]]
+            except ValueError:
+                pending = []
+            while chunk := pending + list(islice(rows, chunk_size - len(pending))):
+                pending = []
+                yield np.array(chunk, dtype=np.float64).reshape(-1, 4)
+    else:
+        record = 4 * 8
+        with open(path, 'rb') as f:
+            while data := f.read(chunk_size * record):
+                yield np.frombuffer(data[:len(data) - len(data) % record], dtype='<f8').reshape(-1, 4)
+
+
+# The index used by the current process, loaded once per worker.
+_index: Optional[FlatIndex] = None
+
+# Query engines over a loaded index: the funnel over the searched corridor or over hourglasses, or
+# A* over the visibility graph of the reflex vertices.
+ENGINES = ('funnel', 'hourglass', 'visibility')
+
+
+def _load(path: str, engine: str = 'funnel'):
+    global _index
+    _index = FlatIndex.load(path)
+    if engine == 'hourglass':
+        from lib.index.hourglass import HourglassIndex
+        if len(_index.dual.chords):
+            print('hourglass engine: the index has polygons with a hole, using the funnel engine', file=sys.stderr)
+        else:
+            _index = HourglassIndex(_index)
+    elif engine == 'visibility':
+        from lib.index.visibility import VisibilityIndex
+        _index = VisibilityIndex(_index)
+
+
+def _solve(pairs: np.ndarray, distances: bool) -> np.ndarray | list[Optional[list[tuple[float, float]]]]:
+    results = []
+    for path in from_ragged(*_index.shortest_paths(pairs[:, :2], pairs[:, 2:])):
+        path = None if path is None else list(zip(path['x'], path['y']))
+        results.append(path if not distances else (np.nan if path is None else path_length(path)))
+    return np.array(results, dtype=np.float64) if distances else results
+
+
+class ResultWriter:
+    """Writes the results of consecutive chunks to a .csv file, or to a binary file otherwise."""
+
+    def __init__(self, path: str, distances: bool):
+        self.distances = distances
+        self.text = os.path.splitext(path)[1].lower() == '.csv'
+        self.file = open(path, 'w' if self.text else 'wb')
+        self.count = 0
+
+    def write(self, results):
+        if self.distances:
+            if self.text:
+                self.file.writelines(f'{d!r}\n' for d in results.tolist())
+            else:
+                self.file.write(results.astype('<f8').tobytes())
+        else:
+            for path in results:
+                if self.text:
+                    coordinates = ' '.join(f'{x!r} {y!r}' for x, y in path or [])
+                    length = 'nan' if path is None else repr(path_length(path))
+                    self.file.write(f'{self.count},{length},{coordinates}\n')
+                else:
+                    path = path or []
+                    self.file.write(PATH_HEADER.pack(len(path)))
+                    self.file.write(np.array(path, dtype='<f8').tobytes())
+                self.count += 1
+
+    def close(self):
+        self.file.close()
+
+
+def query(index_path: str, input_path: str, output_path: str, distances: bool = False,
+          chunk_size: int = 10_000, workers: int = 1, engine: str = 'funnel') -> int:
+    """
+        Answers every query of the input file with the saved index, writing the results in
+        input order one chunk at a time. With more than one worker the chunks are spread
+        across processes, each memory mapping the same index files. The hourglass engine
+        is built by every process when it loads the index, or replaced by the funnel
+        engine if a polygon has a hole.
+
+        Returns: the number of queries answered
+    """
+    writer = ResultWriter(output_path, distances)
+    chunks = read_pairs(input_path, chunk_size)
+    done = 0
+    start = time.perf_counter()
+
+    progress = sys.stderr.isatty()
+
+    def report(results):
+        nonlocal done
+        writer.write(results)
+        done += len(results)
+        if progress:
+            rate = done / max(time.perf_counter() - start, 1e-9)
+            print(f'\r{done} queries, {rate:.0f}/s', end='', file=sys.stderr, flush=True)
+
+    try:
+        if workers <= 1:
+            _load(index_path, engine)
+            for chunk in chunks:
+                report(_solve(chunk, distances))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_load, initargs=(index_path, engine)) as pool:
+                # Bound the chunks in flight so that huge inputs are not read into memory at once.
+                pending = deque()
+                for chunk in chunks:
+                    pending.append(pool.submit(_solve, chunk, distances))
+                    if len(pending) >= 2 * workers:
+                        report(pending.popleft().result())
+                while pending:
+                    report(pending.popleft().result())
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    print(f'\r{done} queries in {elapsed:.1f} s, {done / max(elapsed, 1e-9):.0f}/s', file=sys.stderr)
+    return done
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m lib.cli',
+                                     description='Headless point location and shortest path queries.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build_cmd = commands.add_parser('build', help='build the index of a shapefile and save it')
+    build_cmd.add_argument('shapefile')
+    build_cmd.add_argument('index', help='output directory of the index')
+    build_cmd.add_argument('--limit', type=int, default=None, help='use only the first LIMIT shapes')
+    build_cmd.add_argument('--next-hop-limit', type=int, default=256,
+                           help='precompute the corridors of polygons of at most this many triangles, 0 for none')
+    build_cmd.add_argument('--workers', type=int, default=os.cpu_count())
+    build_cmd.add_argument('--no-clearance', dest='clearance', action='store_false',
+                           help='skip the edge and passage widths needed by paths with a radius')
+
+    for name, description in (('query', 'answer the queries of a file in this process'),
+                              ('run', 'answer the queries of a file across worker processes')):
+        cmd = commands.add_parser(name, help=description)
+        cmd.add_argument('index', help='directory of an index saved by build')
+        cmd.add_argument('input', help='.csv, .npy or raw float64 file of start x, start y, end x, end y')
+        cmd.add_argument('output', help='.csv for text output, any other extension for binary')
+        cmd.add_argument('--distances', action='store_true', help='write path lengths instead of paths')
+        cmd.add_argument('--chunk-size', type=int, default=10_000)
+        cmd.add_argument('--engine', choices=ENGINES, default='funnel',
+                         help='hourglass: precompute hourglasses, then queries do not depend on corridor length; '
+                              'visibility: precompute the visibility graph of the reflex vertices')
+        if name == 'run':
+            cmd.add_argument('--workers', type=int, default=os.cpu_count())
+
+    args = parser.parse_args(argv)
+    if args.command == 'build':
+        build(args.shapefile, args.index, args.limit, args.next_hop_limit, args.workers, args.clearance)
+        return 0
+
+    query(args.index, args.input, args.output, args.distances, args.chunk_size,
+          args.workers if args.command == 'run' else 1, args.engine)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,56 @@
+from math import hypot
+
+import numpy as np
+
+from lib.path_finding.funnel import Coordinate, segment_distance
+
+
+def _passage_width(points: list[Coordinate], triangles: list[list[int]], neighbors: list[list[int]],
+                   t: int, k: int) -> float:
+    """
+        The width of the passage through triangle t between the two edges at corner k: the
+        distance from that corner to the nearest boundary across the opposite edge, at most
+        the length of both edges. The search beyond the opposite edge only crosses edges
+        closer to the corner than the best distance found so far.
+    """
+    tri = triangles[t]
+    c, u, v = points[tri[k]], points[tri[(k + 1) % 3]], points[tri[(k + 2) % 3]]
+    width = min(hypot(u[0] - c[0], u[1] - c[1]), hypot(v[0] - c[0], v[1] - c[1]))
+    # With an obtuse angle at u or v the closest point of the opposite edge is one of its ends.
+    if ((c[0] - u[0]) * (v[0] - u[0]) + (c[1] - u[1]) * (v[1] - u[1]) <= 0
+            or (c[0] - v[0]) * (u[0] - v[0]) + (c[1] - v[1]) * (u[1] - v[1]) <= 0):
+        return width
+
+    stack = [((k + 1) % 3, t)]
+    while stack:
+        e, s = stack.pop()
+        a, b = points[triangles[s][e]], points[triangles[s][(e + 1) % 3]]
+        if (distance := segment_distance(c, a, b)) >= width:
+            continue
+        if (n := neighbors[s][e]) < 0:
+            width = distance
+            continue
+        # Every vertex is on the boundary, the third one of the next triangle included.
+        i = neighbors[n].index(s)
+        w = points[triangles[n][(i + 2) % 3]]
+        width = min(width, hypot(w[0] - c[0], w[1] - c[1]))
+        stack.append(((i + 1) % 3, n))
+        stack.append(((i + 2) % 3, n))
+    return width
+
+
+def clearance(vertices: np.ndarray, triangles: np.ndarray, neighbors: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+        The room a disk has to move through every triangle.
+
+        Returns: (T, 3) float64 edge widths, the length of edge (i, i + 1) of every triangle,
+        and (T, 3) float64 passage widths, the widest disk that can go through a triangle
+        between the two edges at corner i (see `_passage_width`)
+    """
+    corners = vertices[triangles]
+    edge_width = np.hypot(*(np.roll(corners, -1, axis=1) - corners).transpose(2, 0, 1))
+    points = [tuple(p) for p in vertices.tolist()]
+    tris, adjacent = triangles.tolist(), neighbors.tolist()
+    passage = np.array([[_passage_width(points, tris, adjacent, t, k) for k in range(3)] for t in range(len(tris))],
+                       dtype=np.float64).reshape(-1, 3)
+    return edge_width, passage
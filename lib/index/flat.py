@@ -0,0 +1,572 @@
+import json
+import os
+from collections import deque
+from math import isqrt
+from typing import Optional
+
+import numpy as np
+
+from lib.index.clearance import clearance
+from lib.index.next_hop import NO_HOP, next_hop_tables
+from lib.path_finding.dual_tree import DualTree
+from lib.path_finding.cancellation import CancellationToken
+from lib.path_finding.funnel import clear_string_pull, path_length, segment_distance, shortest_pull, to_ragged, to_xy
+from lib.path_finding.path_tools import CHECK_INTERVAL
+from lib.point_location.kirkpatrick import MultiPolygonLocator, SinglePolygonLocator
+
+
+# Points located at once by `FlatIndex.locate_many`.
+LOCATE_CHUNK = 4096
+
+
+def z_order(points: np.ndarray, bounds: Optional[tuple[float, float, float, float]] = None) -> np.ndarray:
+    """
+        Morton codes of (N, 2) points, the same 15 bit per axis interleaving earcut uses for
+        its zOrder hash, over all the points at once.
+
+        Arguments:
+        points -- the coordinates to encode
+        bounds -- (min_x, min_y, max_x, max_y) of the frame, the bounding box of the points by default
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    if not len(points):
+        return np.empty(0, dtype=np.uint32)
+    if bounds is None:
+        bounds = (*points.min(axis=0), *points.max(axis=0))
+    min_x, min_y, max_x, max_y = bounds
+    size = max(max_x - min_x, max_y - min_y)
+    inv_size = 1 / size if size else 0
+    xy = (32767 * (points - (min_x, min_y)) * inv_size).clip(0, 32767).astype(np.uint32)
+    for shift, mask in ((8, 0x00FF00FF), (4, 0x0F0F0F0F), (2, 0x33333333), (1, 0x55555555)):
+        xy = (xy | (xy << shift)) & mask
+    return xy[:, 0] | (xy[:, 1] << 1)
+
+
+class FlatIndex:
+    """
+        Array form of a built locator: everything a query needs stored in a few NumPy
+        arrays, without any Python object graph. The arrays may be views into shared
+        memory or a memory mapped file; queries never write to them.
+
+        vertices -- (V, 2) float64, coordinates of every distinct vertex
+        triangles -- (T, 3) int32, counter-clockwise vertex indices of the initial triangles
+        neighbors -- (T, 3) int32, the triangle across edge (i, i + 1) of each triangle, -1 on the boundary
+        polygon -- (T,) int32, the polygon every triangle belongs to
+        polygon_bounds -- (P, 4) float64, (min_x, min_y, max_x, max_y) of every polygon
+        roots -- (P,) int32, the root node of the Kirkpatrick hierarchy of every polygon
+        node_points -- (K, 3, 2) float64, the corners of every node of the hierarchies
+        child_offsets -- (K + 1,) int64, children of node k are children[child_offsets[k]:child_offsets[k + 1]]
+        children -- (C,) int32, node indices
+        node_leaf -- (K,) int32, the triangle of a leaf node, -1 for inner nodes and boundary leaves
+
+        Optional, added by `with_next_hops`:
+        next_hop_offsets -- (P + 1,) int64, the table of polygon p is next_hop[next_hop_offsets[p]:
+                            next_hop_offsets[p + 1]]
+        next_hop -- uint8, for a polygon of n triangles starting at f, entry (i - f) * n + (j - f)
+                    is the edge of triangle i to cross towards triangle j; empty for large polygons
+
+        Optional, added by `with_clearance`:
+        edge_width -- (T, 3) float64, the length of edge (i, i + 1) of every triangle
+        clearance -- (T, 3) float64, the width of the passage through every triangle between
+                     its two edges at corner i
+    """
+    ARRAYS = ('vertices', 'triangles', 'neighbors', 'polygon', 'polygon_bounds', 'roots',
+              'node_points', 'child_offsets', 'children', 'node_leaf')
+    OPTIONAL_ARRAYS = ('next_hop_offsets', 'next_hop', 'edge_width', 'clearance')
+
+    def __init__(self, **arrays: np.ndarray):
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+        for name in self.OPTIONAL_ARRAYS:
+            setattr(self, name, arrays.get(name))
+        self._dual: Optional[DualTree] = None
+
+    @property
+    def arrays(self) -> dict[str, np.ndarray]:
+        names = self.ARRAYS + tuple(name for name in self.OPTIONAL_ARRAYS if getattr(self, name) is not None)
+        return {name: getattr(self, name) for name in names}
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in self.arrays.values())
+
+    @classmethod
+    def from_locator(cls, locator: MultiPolygonLocator | SinglePolygonLocator, renumber: bool = False) -> 'FlatIndex':
+        """
+            Flattens the triangulation, adjacency and hierarchy of a built locator. The vertices
+            and triangles keep the order the triangulation produced them in, unless renumber
+            is True: then they are renumbered along a Morton curve (see `renumbered`).
+        """
+        if isinstance(locator, SinglePolygonLocator):
+            locators = [locator]
+        else:
+            locators = locator._bounded_locators
+
+        vertex_ids: dict[tuple[float, float], int] = {}
+        triangles, polygon, triangle_ids = [], [], {}
+        node_points, children, child_offsets, node_leaf, roots = [], [], [0], [], []
+
+        def vertex(p) -> int:
+            return vertex_ids.setdefault((float(p.x), float(p.y)), len(vertex_ids))
+
+        for polygon_id, single in enumerate(locators):
+            for t in single.regions:
+                a, b, c = (vertex(p) for p in t.points)
+                pa, pb, pc = t.points
+                if (pb.x - pa.x) * (pc.y - pa.y) - (pb.y - pa.y) * (pc.x - pa.x) < 0:
+                    b, c = c, b
+                triangle_ids[id(t)] = len(triangles)
+                triangles.append((a, b, c))
+                polygon.append(polygon_id)
+
+            # Number the nodes of the hierarchy breadth first from the root.
+            root = single.dag.root()
+            node_ids = {id(root): len(node_leaf)}
+            order = [root]
+            for node in order:
+                for child in single.dag.e[node]:
+                    if id(child) not in node_ids:
+                        node_ids[id(child)] = len(node_leaf) + len(order)
+                        order.append(child)
+
+            roots.append(node_ids[id(root)])
+            for node in order:
+                node_points.append([(p.x, p.y) for p in node.points])
+                node_children = [node_ids[id(child)] for child in single.dag.e[node]]
+                children.extend(node_children)
+                child_offsets.append(len(children))
+                node_leaf.append(triangle_ids.get(id(node), -1) if not node_children else -1)
+
+        triangles = np.array(triangles, dtype=np.int32).reshape(-1, 3)
+
+        # Connect the triangles sharing an edge, within a polygon: polygons may touch along an edge.
+        neighbors = np.full(triangles.shape, -1, dtype=np.int32)
+        edges: dict[tuple[int, int, int], tuple[int, int]] = {}
+        for t, tri in enumerate(triangles.tolist()):
+            for i in range(3):
+                u, v = tri[i], tri[(i + 1) % 3]
+                key = (polygon[t], u, v) if u < v else (polygon[t], v, u)
+                if (other := edges.pop(key, None)) is not None:
+                    neighbors[t, i] = other[0]
+                    neighbors[other] = t
+                else:
+                    edges[key] = (t, i)
+
+        vertices = np.array(list(vertex_ids.keys()), dtype=np.float64).reshape(-1, 2)
+        index = cls(vertices=vertices, triangles=triangles, neighbors=neighbors,
+                   polygon=np.array(polygon, dtype=np.int32),
+                   polygon_bounds=np.array([single.bounds for single in locators], dtype=np.float64).reshape(-1, 4),
+                   roots=np.array(roots, dtype=np.int32),
+                   node_points=np.array(node_points, dtype=np.float64).reshape(-1, 3, 2),
+                   child_offsets=np.array(child_offsets, dtype=np.int64),
+                   children=np.array(children, dtype=np.int32),
+                   node_leaf=np.array(node_leaf, dtype=np.int32))
+        return index.renumbered() if renumber else index
+
+    def renumbered(self) -> 'FlatIndex':
+        """
+            Returns a copy of the index with the vertices sorted along a Morton curve and the
+            triangles sorted by polygon, then along the same curve by centroid, with every
+            index remapped. Triangles that are close in the plane end up close in memory, so
+            corridor searches and walks touch fewer cache lines. The hierarchy nodes keep their
+            order, only their triangles are remapped. Next hop tables are dropped, they depend
+            on the triangle numbers.
+        """
+        vertices = self.vertices
+        bounds = (*vertices.min(axis=0), *vertices.max(axis=0)) if len(vertices) else None
+
+        vertex_order = np.argsort(z_order(vertices, bounds), kind='stable')
+        vertex_rank = np.empty_like(vertex_order)
+        vertex_rank[vertex_order] = np.arange(len(vertex_order))
+        # Renaming the corners keeps their rotation, so the edge numbering of the neighbors holds.
+        triangles = vertex_rank[self.triangles].astype(np.int32)
+
+        centroids = vertices[self.triangles].mean(axis=1)
+        triangle_order = np.lexsort((z_order(centroids, bounds), self.polygon))
+        triangle_rank = np.full(len(triangle_order) + 1, -1, dtype=np.int32)
+        triangle_rank[triangle_order] = np.arange(len(triangle_order))
+        # -1 (no neighbor, no leaf) picks the last entry, which stays -1.
+        neighbors = triangle_rank[self.neighbors[triangle_order]]
+
+        arrays = {name: getattr(self, name) for name in self.ARRAYS}
+        arrays.update(vertices=vertices[vertex_order], triangles=triangles[triangle_order], neighbors=neighbors,
+                      polygon=self.polygon[triangle_order], node_leaf=triangle_rank[self.node_leaf])
+        return type(self)(**{name: np.ascontiguousarray(a) for name, a in arrays.items()})
+
+    def save(self, path: str):
+        """Stores the index as a directory of .npy files that `load` can memory map."""
+        os.makedirs(path, exist_ok=True)
+        for name, array in self.arrays.items():
+            np.save(os.path.join(path, f'{name}.npy'), array)
+        with open(os.path.join(path, 'index.json'), 'w') as f:
+            json.dump({'arrays': list(self.arrays)}, f)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> 'FlatIndex':
+        """Loads an index written by `save`, memory mapping the arrays read only."""
+        mode = 'r' if mmap else None
+        with open(os.path.join(path, 'index.json')) as f:
+            names = json.load(f)['arrays']
+        return cls(**{name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mode) for name in names})
+
+    def with_next_hops(self, max_triangles: int = 256, processes: Optional[int] = None) -> 'FlatIndex':
+        """
+            Returns a copy of the index with the next hop tables of every polygon of at most
+            max_triangles triangles, built on a pool of processes (see `next_hop_tables`).
+            The corridors of these polygons are then followed from table to table instead of
+            searched. A table takes n * n bytes for n triangles.
+        """
+        offsets, tables = next_hop_tables(self.neighbors, self.polygon, max_triangles, processes)
+        return type(self)(**{**self.arrays, 'next_hop_offsets': offsets, 'next_hop': tables})
+
+    def with_clearance(self) -> 'FlatIndex':
+        """
+            Returns a copy of the index with the edge and passage widths of every triangle
+            (see `clearance`), which `shortest_path` needs for a radius.
+        """
+        edge_width, passage = clearance(self.vertices, self.triangles, self.neighbors)
+        return type(self)(**{**self.arrays, 'edge_width': edge_width, 'clearance': passage})
+
+    def _node_contains(self, node: int, x: float, y: float) -> bool:
+        (ax, ay), (bx, by), (cx, cy) = self.node_points[node].tolist()
+        d1 = (bx - ax) * (y - ay) - (by - ay) * (x - ax)
+        d2 = (cx - bx) * (y - by) - (cy - by) * (x - bx)
+        d3 = (ax - cx) * (y - cy) - (ay - cy) * (x - cx)
+        return not ((d1 < 0 or d2 < 0 or d3 < 0) and (d1 > 0 or d2 > 0 or d3 > 0))
+
+    def locate(self, x: float, y: float) -> int:
+        """Returns the index of the triangle containing (x, y), -1 if it is outside every polygon."""
+        b = self.polygon_bounds
+        candidates = np.flatnonzero((b[:, 0] <= x) & (x <= b[:, 2]) & (b[:, 1] <= y) & (y <= b[:, 3]))
+        for polygon_id in candidates.tolist():
+            node = int(self.roots[polygon_id])
+            if not self._node_contains(node, x, y):
+                continue
+            while (first := int(self.child_offsets[node])) != (last := int(self.child_offsets[node + 1])):
+                for child in self.children[first:last].tolist():
+                    if self._node_contains(child, x, y):
+                        node = child
+                        break
+                else:
+                    break
+            if (triangle := int(self.node_leaf[node])) >= 0:
+                return triangle
+        return -1
+
+    def _nodes_contain(self, nodes: np.ndarray, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """`_node_contains` for arrays of nodes and points."""
+        (ax, ay), (bx, by), (cx, cy) = self.node_points[nodes].transpose(1, 2, 0)
+        d1 = (bx - ax) * (y - ay) - (by - ay) * (x - ax)
+        d2 = (cx - bx) * (y - by) - (cy - by) * (x - bx)
+        d3 = (ax - cx) * (y - cy) - (ay - cy) * (x - cx)
+        return ~(((d1 < 0) | (d2 < 0) | (d3 < 0)) & ((d1 > 0) | (d2 > 0) | (d3 > 0)))
+
+    def locate_many(self, points: np.ndarray) -> np.ndarray:
+        """
+            `locate` for a (N, 2) array of points. All the points descend the hierarchies
+            together, one level at a time, so the work per level is a few NumPy operations.
+
+            Returns: (N,) int64, the triangle containing every point, -1 outside every polygon
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        located = np.full(len(points), -1, dtype=np.int64)
+        b = self.polygon_bounds
+        for first in range(0, len(points), LOCATE_CHUNK):
+            x, y = points[first:first + LOCATE_CHUNK, :1], points[first:first + LOCATE_CHUNK, 1:]
+            # Every (point, polygon) pair whose bounding box contains the point, by point then polygon.
+            rows, polygons = np.nonzero((b[:, 0] <= x) & (x <= b[:, 2]) & (b[:, 1] <= y) & (y <= b[:, 3]))
+            px, py = x[rows, 0], y[rows, 0]
+            node = self.roots[polygons].astype(np.int64)
+            active = np.flatnonzero(self._nodes_contain(node, px, py))
+            while len(active):
+                first_child, last_child = self.child_offsets[node[active]], self.child_offsets[node[active] + 1]
+                moved = np.zeros(len(active), dtype=bool)
+                for k in range(int((last_child - first_child).max(initial=0))):
+                    # The first child containing the point, as in `locate`.
+                    candidate = np.flatnonzero(~moved & (first_child + k < last_child))
+                    child = self.children[first_child[candidate] + k]
+                    inside = self._nodes_contain(child, px[active[candidate]], py[active[candidate]])
+                    node[active[candidate[inside]]] = child[inside]
+                    moved[candidate[inside]] = True
+                active = active[moved]
+
+            # The first polygon in which a pair ends on a triangle.
+            triangle = self.node_leaf[node]
+            found = triangle >= 0
+            chunk_rows, first_found = np.unique(rows[found], return_index=True)
+            located[first + chunk_rows] = triangle[found][first_found]
+        return located
+
+    @property
+    def dual(self) -> DualTree:
+        """The rooted dual tree of the triangles, built on first use (not stored with the arrays)."""
+        if self._dual is None:
+            self._dual = DualTree(self.neighbors)
+        return self._dual
+
+    def corridor(self, t1: int, t2: int) -> Optional[list[int]]:
+        """
+            The sequence of triangles from t1 to t2: read from the next hop table of their
+            polygon when it has one, from the dual tree when the polygon has no hole, by a
+            breadth first search otherwise.
+        """
+        if self.next_hop is not None and (p := int(self.polygon[t1])) == self.polygon[t2]:
+            start, end = int(self.next_hop_offsets[p]), int(self.next_hop_offsets[p + 1])
+            if start < end:
+                first = int(np.searchsorted(self.polygon, p))
+                n = isqrt(end - start)
+                table, neighbors = self.next_hop[start:end], self.neighbors
+                path = [t1]
+                while (t := path[-1]) != t2:
+                    if (e := int(table[(t - first) * n + t2 - first])) == NO_HOP:
+                        return None
+                    path.append(int(neighbors[t, e]))
+                return path
+
+        if (dual := self.dual).covers(t1):
+            return dual.corridor(t1, t2)
+
+        parents = {t1: -1}
+        queue = deque((t1,))
+        while queue:
+            t = queue.popleft()
+            if t == t2:
+                path = []
+                while t != -1:
+                    path.append(t)
+                    t = parents[t]
+                return path[::-1]
+            for n in self.neighbors[t].tolist():
+                if n >= 0 and n not in parents:
+                    parents[n] = t
+                    queue.append(n)
+        return None
+
+    def corridors(self, t1: int, t2: int) -> list[list[int]]:
+        """
+            The corridors from t1 to t2 a shortest path may follow: `corridor` when their
+            polygon has no hole, one per way around it otherwise (see `DualTree.corridors`).
+        """
+        if self.dual.covers(t1):
+            return [] if (corridor := self.corridor(t1, t2)) is None else [corridor]
+        return self.dual.corridors(t1, t2)
+
+    def _passes(self, previous: int, t: int, n: int, radius: float) -> bool:
+        """Whether a disk of the given radius entering triangle t from previous (-1 if it starts there) can leave it to n."""
+        neighbors = self.neighbors[t].tolist()
+        j = neighbors.index(n)
+        if self.edge_width[t, j] < 2 * radius:
+            return False
+        if previous < 0:
+            return True
+        i = neighbors.index(previous)
+        # The corner shared by the entry and the exit edges.
+        return self.clearance[t, j if j == (i + 1) % 3 else i] >= 2 * radius
+
+    def near_boundary(self, t: int, point: tuple[float, float], radius: float) -> bool:
+        """
+            Whether the boundary of the polygon passes closer than the radius to a point of
+            triangle t. Only the triangles behind edges closer than the radius are searched.
+        """
+        vertices, triangles, neighbors = self.vertices, self.triangles, self.neighbors
+        point = tuple(point)
+        stack, seen = [t], {t}
+        while stack:
+            s = stack.pop()
+            corners = vertices[triangles[s]].tolist()
+            for e, n in enumerate(neighbors[s].tolist()):
+                if segment_distance(point, tuple(corners[e]), tuple(corners[(e + 1) % 3])) >= radius:
+                    continue
+                if n < 0:
+                    return True
+                if n not in seen:
+                    seen.add(n)
+                    stack.append(n)
+        return False
+
+    def _beside(self, corridor: list[int], radius: float) -> list[list[tuple[float, float]]]:
+        """
+            The boundary vertices closer than the radius to an edge of a corridor triangle the
+            corridor does not cross, for every portal of the triangles they are beside: a path
+            through the corridor can only come that close to the boundary behind those edges
+            near them. The search beyond an edge only crosses edges closer than the radius to it.
+        """
+        vertices, triangles, neighbors = self.vertices, self.triangles, self.neighbors
+        inside = set(corridor)
+        beside = [[] for _ in range(max(len(corridor) - 1, 0))]
+        for k, t in enumerate(corridor):
+            corners = vertices[triangles[t]].tolist()
+            found = set()
+            for e, n in enumerate(neighbors[t].tolist()):
+                if n in inside:
+                    continue
+                u, v = tuple(corners[e]), tuple(corners[(e + 1) % 3])
+                found.update((u, v))
+                stack = [(n, t)] if n >= 0 else []
+                seen = {t, n}
+                while stack:
+                    s, previous = stack.pop()
+                    tri, adjacent = triangles[s].tolist(), neighbors[s].tolist()
+                    i = adjacent.index(previous)
+                    w = tuple(vertices[tri[(i + 2) % 3]].tolist())
+                    if segment_distance(w, u, v) < radius:
+                        found.add(w)
+                    # The two other edges both end at w.
+                    for j in ((i + 1) % 3, (i + 2) % 3):
+                        a, b = tuple(vertices[tri[j]].tolist()), tuple(vertices[tri[(j + 1) % 3]].tolist())
+                        near = min(segment_distance(a, u, v), segment_distance(b, u, v),
+                                   segment_distance(u, a, b), segment_distance(v, a, b))
+                        if adjacent[j] >= 0 and adjacent[j] not in seen and near < radius:
+                            seen.add(adjacent[j])
+                            stack.append((adjacent[j], s))
+            for i in range(max(k - 1, 0), min(k + 1, len(beside))):
+                beside[i].extend(found)
+        return beside
+
+    def _fits(self, corridor: list[int], radius: float) -> bool:
+        """Whether a disk of the given radius fits through every triangle of a corridor."""
+        previous = [-1] + corridor[:-2]
+        return all(self._passes(p, t, n, radius) for p, t, n in zip(previous, corridor, corridor[1:]))
+
+    def clear_corridor(self, t1: int, t2: int, radius: float, cancel: CancellationToken = None) -> Optional[list[int]]:
+        """
+            The sequence of triangles from t1 to t2 a disk of the given radius fits through,
+            skipping edges and passages narrower than its diameter; None if there is none.
+            Needs the arrays of `with_clearance`. Stops with QueryCancelled once the cancel
+            token is triggered.
+        """
+        if self.clearance is None:
+            raise ValueError('The index has no clearance arrays, see FlatIndex.with_clearance.')
+        if self.dual.covers(t1):
+            if (corridor := self.corridor(t1, t2)) is None or not self._fits(corridor, radius):
+                return None
+            return corridor
+
+        # Around holes the width depends on the entry edge, so the search is over (entered from, triangle).
+        parents = {(-1, t1): None}
+        queue = deque(((-1, t1),))
+        iterations = 0
+        while queue:
+            iterations += 1
+            if cancel is not None and iterations % CHECK_INTERVAL == 0:
+                cancel.check()
+            state = queue.popleft()
+            previous, t = state
+            if t == t2:
+                path = []
+                while state is not None:
+                    path.append(state[1])
+                    state = parents[state]
+                return path[::-1]
+            for n in self.neighbors[t].tolist():
+                if n >= 0 and n != previous and (t, n) not in parents and self._passes(previous, t, n, radius):
+                    parents[(t, n)] = state
+                    queue.append((t, n))
+        return None
+
+    def walk(self, t: int, start: tuple[float, float], end: tuple[float, float]) -> Optional[list[int]]:
+        """
+            Follows the segment from start, inside triangle t, to end through the triangles it
+            crosses. The work is proportional to the number of triangles crossed.
+
+            Returns: the triangles crossed, from t to the one containing end, or None if the
+            segment leaves the polygon
+        """
+        (sx, sy), (ex, ey) = start, end
+        vertices, triangles, neighbors = self.vertices, self.triangles, self.neighbors
+        walked = [t]
+        for _ in range(len(triangles)):
+            corners = vertices[triangles[t]].tolist()
+            exit_edge = -1
+            for i in range(3):
+                (ux, uy), (vx, vy) = corners[i], corners[(i + 1) % 3]
+                # The segment leaves through the edge with end beyond it, u on its right and v on its left.
+                if ((vx - ux) * (ey - uy) - (vy - uy) * (ex - ux) < 0
+                        and (ex - sx) * (uy - sy) - (ey - sy) * (ux - sx) <= 0
+                        and (ex - sx) * (vy - sy) - (ey - sy) * (vx - sx) >= 0):
+                    exit_edge = i
+                    break
+            if exit_edge < 0:
+                return walked
+            # Outside the polygon, or stuck going back and forth on a segment through a vertex.
+            if (t := int(neighbors[t, exit_edge])) < 0 or len(walked) > 1 and t == walked[-2]:
+                return None
+            walked.append(t)
+        return None
+
+    def portal(self, t: int, n: int) -> tuple[tuple[float, float], tuple[float, float]]:
+        """Returns the (left, right) endpoints of the edge from triangle t to its neighbor n."""
+        i = self.neighbors[t].tolist().index(n)
+        right, left = self.triangles[t, i], self.triangles[t, (i + 1) % 3]
+        return tuple(self.vertices[left].tolist()), tuple(self.vertices[right].tolist())
+
+    def portals(self, corridor: list[int]) -> list[tuple[tuple[float, float], tuple[float, float]]]:
+        """Returns the (left, right) endpoints of the edges between consecutive triangles of a corridor."""
+        return [self.portal(t, n) for t, n in zip(corridor, corridor[1:])]
+
+    def shortest_path(self, start: tuple[float, float], end: tuple[float, float], radius: float = 0.0) -> Optional[dict]:
+        """
+            Finds the shortest path between two points, None if they are not in the same polygon.
+            With a radius, the path of a disk of that radius instead, see `clear_path`.
+        """
+        if (t1 := self.locate(*start)) < 0 or (t2 := self.locate(*end)) < 0:
+            return None
+        if self.polygon[t1] != self.polygon[t2]:
+            return None
+        if radius > 0:
+            return self.clear_path(start, end, t1, t2, radius)
+        options = [self.portals(c) for c in self.corridors(t1, t2)]
+        if (path := shortest_pull(options, tuple(start), tuple(end))) is None:
+            return None
+        return to_xy(path)
+
+    def clear_path(self, start: tuple[float, float], end: tuple[float, float], t1: int, t2: int, radius: float,
+                   cancel: CancellationToken = None) -> Optional[dict]:
+        """
+            The shortest path of a disk of the given radius between two points of triangles t1
+            and t2 of a polygon: through the corridor it fits in (see `clear_corridor`) and kept
+            that far from the boundary (see `clear_string_pull`). None if either point is closer
+            than the radius to the boundary, or the disk does not fit.
+        """
+        if self.near_boundary(t1, start, radius) or self.near_boundary(t2, end, radius):
+            return None
+        if (corridor := self.clear_corridor(t1, t2, radius, cancel)) is None:
+            return None
+        options = [corridor]
+        if not self.dual.covers(t1):
+            # Around a hole, the disk may also fit along the other way.
+            options += [c for c in self.corridors(t1, t2) if c != corridor and self._fits(c, radius)]
+        paths = [clear_string_pull(self.portals(c), tuple(start), tuple(end), radius, self._beside(c, radius))
+                 for c in options]
+        if (path := min((p for p in paths if p is not None), key=path_length, default=None)) is None:
+            return None
+        return to_xy(path)
+
+    def shortest_paths(self, starts: np.ndarray, ends: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+            Finds the shortest path of a batch of queries: all the points are located with
+            `locate_many`, and queries between the same two triangles share their corridors
+            and portals.
+
+            Arguments:
+            starts, ends -- (N, 2) coordinates of the first and last point of every query
+
+            Returns: the paths as a ragged array, see `to_ragged`
+        """
+        starts = np.asarray(starts, dtype=np.float64).reshape(-1, 2)
+        ends = np.asarray(ends, dtype=np.float64).reshape(-1, 2)
+        t1, t2 = self.locate_many(starts), self.locate_many(ends)
+        valid = (t1 >= 0) & (t2 >= 0)
+        valid[valid] = self.polygon[t1[valid]] == self.polygon[t2[valid]]
+
+        paths: list[Optional[dict]] = [None] * len(starts)
+        queries = np.flatnonzero(valid)
+        _, group = np.unique(t1[queries] * len(self.triangles) + t2[queries], return_inverse=True)
+        portals: dict[int, list[list]] = {}
+        for query, g in zip(queries.tolist(), group.ravel().tolist()):
+            if g not in portals:
+                portals[g] = [self.portals(c) for c in self.corridors(int(t1[query]), int(t2[query]))]
+            start, end = tuple(starts[query].tolist()), tuple(ends[query].tolist())
+            if (path := shortest_pull(portals[g], start, end)) is not None:
+                paths[query] = to_xy(path)
+        return to_ragged(paths)
@@ -0,0 +1,148 @@
+from typing import Optional
+
+import numpy as np
+
+from lib.index.flat import FlatIndex
+from lib.index.tree import centroid_decomposition, separator_level
+from lib.path_finding.funnel import Coordinate, cross, string_pull, to_ragged, to_xy
+
+Portal = tuple[Coordinate, Coordinate]
+
+
+def _crossings(chain: list[Coordinate], portals: list[Portal]) -> list[Coordinate]:
+    """
+        Where a path crossing every portal in order does so. Its bends are portal endpoints,
+        and the portals at a bend are consecutive.
+    """
+    crossings = []
+    k = 0
+    for portal in portals:
+        if chain[k] in portal:
+            crossings.append(chain[k])
+            continue
+        if chain[k + 1] in portal:
+            k += 1
+            crossings.append(chain[k])
+            continue
+        (lx, ly), (rx, ry) = portal
+        a, b = cross(chain[k], chain[k + 1], portal[0]), cross(chain[k], chain[k + 1], portal[1])
+        s = min(1.0, max(0.0, a / (a - b))) if a != b else 0.0
+        crossings.append((lx + s * (rx - lx), ly + s * (ry - ly)))
+    return crossings
+
+
+def hourglass(portals: list[Portal]) -> list[Portal]:
+    """
+        The shortest paths between the first and the last portal of a corridor stay between
+        the shortest path joining their left ends and the one joining their right ends (the
+        hourglass of the two portals), and only bend at the vertices of these two paths.
+        Returns the portals cut down to the hourglass, keeping only the first, the last, and
+        those where a bend of either path starts or ends: a funnel through them gives the
+        same paths as through the whole corridor, for any points before and after it.
+    """
+    if len(portals) < 3:
+        return portals
+    (first_left, first_right), (last_left, last_right) = portals[0], portals[-1]
+    inner = portals[1:-1]
+    left = string_pull(inner, first_left, last_left)
+    right = string_pull(inner, first_right, last_right)
+    lefts, rights = _crossings(left, portals), _crossings(right, portals)
+
+    bends = set(left) | set(right)
+    kept = []
+    for i, (l, r) in enumerate(zip(lefts, rights)):
+        if i == 0 or i == len(portals) - 1:
+            kept.append((l, r))
+            continue
+        # Between two kept portals both paths are straight, or stay on the same bend.
+        if (l in bends and (lefts[i - 1] != l or lefts[i + 1] != l)
+                or r in bends and (rights[i - 1] != r or rights[i + 1] != r)):
+            kept.append((l, r))
+    return kept
+
+
+class HourglassIndex:
+    """
+        Shortest paths whose cost does not grow with the length of their corridor.
+
+        The triangles of a polygon form a tree; its centroid decomposition (see
+        `centroid_decomposition`) puts O(log T) separator triangles above every triangle,
+        and the corridor between two triangles goes through the first separator between
+        them. For every triangle and every separator above it, the portals from the
+        triangle to the edge of the separator facing it are stored cut down to their
+        hourglass (see `hourglass`), each computed from the one of its neighbor towards
+        the separator. A query locates its points, finds their first separator in
+        O(log T) and runs the funnel over the two stored hourglasses only: its cost depends
+        on the number of bends the hourglasses hold, not on the number of triangles crossed.
+
+        Stores O(T log T) hourglasses; the exact paths are those of `FlatIndex.shortest_path`.
+        Around a hole the triangles do not form a tree and a stored corridor only goes one
+        way round, so indexes with a polygon with a hole are refused.
+    """
+
+    def __init__(self, index: FlatIndex):
+        if len(index.dual.chords):
+            raise ValueError('Hourglasses only go one way round a hole: the index has polygons with a hole.')
+        self.index = index
+        self.depth, self.ancestor_offsets, self.ancestors, self.facing = centroid_decomposition(index)
+
+        # The hourglass from every triangle to each separator above it, in the order of ancestors
+        # (empty for the triangle itself).
+        neighbors = index.neighbors
+        glasses: list[list[Portal]] = [[] for _ in range(len(self.ancestors))]
+        for c in range(len(self.depth)):
+            level = int(self.depth[c])
+            # The part of the tree of c that it separates: deeper triangles, each reached from
+            # its neighbor towards c.
+            below = {}
+            queue = [(n, c) for n in neighbors[c].tolist() if n >= 0 and self.depth[n] > level]
+            for t, towards in queue:
+                portal = index.portal(t, towards)
+                below[t] = [portal] if towards == c else hourglass([portal] + below[towards])
+                glasses[int(self.ancestor_offsets[t]) + level] = below[t]
+                queue.extend((n, t) for n in neighbors[t].tolist() if n >= 0 and n != towards and self.depth[n] > level)
+
+        sizes = np.array([len(g) for g in glasses], dtype=np.int64)
+        self.glass_offsets = np.concatenate(([0], np.cumsum(sizes)))
+        self.glasses = np.array([p for g in glasses for p in g], dtype=np.float64).reshape(-1, 2, 2)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.depth, self.ancestor_offsets, self.ancestors, self.facing,
+                                      self.glass_offsets, self.glasses))
+
+    def _hourglass(self, t: int, level: int) -> list[Portal]:
+        entry = int(self.ancestor_offsets[t]) + level
+        stored = self.glasses[self.glass_offsets[entry]:self.glass_offsets[entry + 1]].tolist()
+        return [(tuple(left), tuple(right)) for left, right in stored]
+
+    def portals(self, t1: int, t2: int) -> list[Portal]:
+        """Portals equivalent to those of the corridor between two triangles of a polygon, for the funnel."""
+        if t1 == t2:
+            return []
+        level = separator_level(self.ancestor_offsets, self.ancestors, t1, t2)
+        # The second half is walked from the separator, the other way round.
+        return self._hourglass(t1, level) + [(right, left) for left, right in reversed(self._hourglass(t2, level))]
+
+    def shortest_path(self, start: tuple[float, float], end: tuple[float, float]) -> Optional[dict]:
+        """Finds the shortest path between two points, None if they are not in the same polygon."""
+        index = self.index
+        if (t1 := index.locate(*start)) < 0 or (t2 := index.locate(*end)) < 0:
+            return None
+        if index.polygon[t1] != index.polygon[t2]:
+            return None
+        return to_xy(string_pull(self.portals(t1, t2), tuple(start), tuple(end)))
+
+    def shortest_paths(self, starts: np.ndarray, ends: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """`shortest_path` for (N, 2) arrays of points, as a ragged array (see `FlatIndex.shortest_paths`)."""
+        index = self.index
+        starts = np.asarray(starts, dtype=np.float64).reshape(-1, 2)
+        ends = np.asarray(ends, dtype=np.float64).reshape(-1, 2)
+        t1, t2 = index.locate_many(starts), index.locate_many(ends)
+        paths: list[Optional[dict]] = []
+        for start, end, a, b in zip(starts.tolist(), ends.tolist(), t1.tolist(), t2.tolist()):
+            if a < 0 or b < 0 or index.polygon[a] != index.polygon[b]:
+                paths.append(None)
+                continue
+            paths.append(to_xy(string_pull(self.portals(a, b), tuple(start), tuple(end))))
+        return to_ragged(paths)
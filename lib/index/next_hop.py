@@ -0,0 +1,69 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import numpy as np
+
+# Table entry of a triangle towards itself, or towards a triangle it is not connected to.
+NO_HOP = 3
+
+
+def next_hop_table(neighbors: np.ndarray) -> np.ndarray:
+    """
+        All pairs next hops over the triangles of one polygon, by a breadth first search from
+        every target.
+
+        Arguments:
+        neighbors -- (n, 3) the neighbor across every edge, numbered within the polygon, -1 on the boundary
+
+        Returns: (n * n,) uint8, entry i * n + j is the edge of triangle i to cross towards j (NO_HOP if none)
+    """
+    n = len(neighbors)
+    adjacent = neighbors.tolist()
+    # The edge of the neighbor across edge e of t that leads back to t.
+    back = [[adjacent[u].index(t) if u >= 0 else -1 for u in adjacent[t]] for t in range(n)]
+    columns = []
+    for j in range(n):
+        hop = [NO_HOP] * n
+        seen = bytearray(n)
+        seen[j] = 1
+        queue = [j]
+        for t in queue:
+            for e, u in enumerate(adjacent[t]):
+                if u >= 0 and not seen[u]:
+                    seen[u] = 1
+                    hop[u] = back[t][e]
+                    queue.append(u)
+        columns.append(hop)
+    return np.ascontiguousarray(np.array(columns, dtype=np.uint8).reshape(n, n).T).ravel()
+
+
+def next_hop_tables(neighbors: np.ndarray, polygon: np.ndarray, max_triangles: int = 256,
+                    processes: Optional[int] = None) -> tuple[np.ndarray, np.ndarray]:
+    """
+        Next hop tables of every polygon with at most max_triangles triangles, built on a
+        pool of worker processes. The triangles of every polygon must be consecutive.
+
+        Returns: (P + 1,) int64 offsets and the tables one after the other, see
+        `next_hop_table`; the table of a polygon over the limit is empty
+    """
+    count = int(polygon.max()) + 1 if len(polygon) else 0
+    first = np.searchsorted(polygon, np.arange(count + 1))
+    sizes = np.diff(first)
+    small = np.flatnonzero((sizes > 1) & (sizes <= max_triangles))
+
+    offsets = np.zeros(count + 1, dtype=np.int64)
+    offsets[small + 1] = sizes[small] ** 2
+    offsets = np.cumsum(offsets)
+    tables = np.full(int(offsets[-1]), NO_HOP, dtype=np.uint8)
+
+    local = []
+    for p in small.tolist():
+        a, b = int(first[p]), int(first[p + 1])
+        block = neighbors[a:b].astype(np.int64) - a
+        local.append(np.where((neighbors[a:b] >= a) & (neighbors[a:b] < b), block, -1))
+    if local:
+        with ProcessPoolExecutor(max_workers=min(processes or os.cpu_count(), len(local))) as executor:
+            for p, table in zip(small.tolist(), executor.map(next_hop_table, local, chunksize=8)):
+                tables[offsets[p]:offsets[p + 1]] = table
+    return offsets, tables
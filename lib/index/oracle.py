@@ -0,0 +1,296 @@
+from math import hypot
+from typing import Optional
+
+import numpy as np
+
+from lib.index.flat import FlatIndex
+from lib.index.tree import SOURCE, centroid_decomposition, funnels, separator_level, tangent
+from lib.path_finding.funnel import path_length, shortest_pull
+
+# Queries bounded at once by `DistanceOracle.approx_distances`.
+ORACLE_CHUNK = 4096
+
+
+def _grid(k: int) -> np.ndarray:
+    """
+        Barycentric (b, c) weights of the corners of a triangle, then of the points strictly
+        inside it of its subdivision in k steps (points on the edges would be collinear with
+        the funnel sides, where rounding decides which side they fall on).
+    """
+    inner = [(i / k, j / k) for i in range(1, k) for j in range(1, k - i)]
+    return np.array([(0.0, 0.0), (1.0, 0.0), (0.0, 1.0)] + inner).reshape(-1, 2)
+
+
+class DistanceOracle:
+    """
+        Geodesic distance estimates from precomputed portal distances.
+
+        The triangles of a polygon form a tree. Its centroid decomposition picks a separator
+        triangle that splits it in parts of at most half the size, then does the same in
+        every part. A path between two points goes through the first separator between
+        them, crossing the edge facing each point and going straight inside it. Every edge
+        of a separator gets 'portals' evenly spaced points, and the oracle stores the
+        distance from the sites of every triangle (its corners, plus a grid of up to
+        'subdivisions' steps inside triangles longer than the median) to the portals of
+        each separator above it: O(T log T * sites * portals) distances, set by 'portals'
+        and 'subdivisions'.
+
+        A query bounds the distance from both sides with the portals and sites nearest to
+        the true crossing points. When the bounds are within 1 + epsilon of each other the
+        upper one is returned, otherwise (mostly for points close together, where it is
+        cheap) the exact distance: the estimate d' always satisfies d <= d' <= (1 + epsilon) d.
+
+        Separators only split the tree of a polygon without a hole: around a hole every
+        query is exact, and nothing is stored for its triangles.
+
+        A single query costs about as much as an exact one, both being mostly the location
+        of the two points, since the corridors of earcut triangulations are short.
+        `approx_distances` locates a batch at once and bounds it with array operations, so
+        that only the uncertified queries pay for a corridor and a funnel.
+    """
+
+    def __init__(self, index: FlatIndex, portals: int = 8, subdivisions: int = 6, epsilon: float = 0.1):
+        self.index = index
+        self.portals = max(2, portals)
+        self.epsilon = epsilon
+        self.certified = self.fallbacks = 0
+
+        vertices, triangles, neighbors = index.vertices, index.triangles, index.neighbors
+        count = len(triangles)
+
+        # Centroid decomposition: the depth of every triangle as a separator, the separators
+        # above it (itself last) and the edge of each of them facing it.
+        self.depth, self.ancestor_offsets, self.ancestors, self.facing = centroid_decomposition(index)
+
+        # Sites: the corners of every triangle, and a finer grid inside the long ones.
+        corners = vertices[triangles]
+        longest = np.hypot(*(corners - np.roll(corners, 1, axis=1)).transpose(2, 0, 1)).max(axis=1)
+        spacing = float(np.median(longest)) if count else 1.0
+        steps = np.clip(np.ceil(longest / spacing), 1, max(1, subdivisions)).astype(np.int64)
+        grids = {k: _grid(k) for k in np.unique(steps).tolist()}
+        sizes = np.array([len(grids[k]) for k in steps.tolist()], dtype=np.int64)
+        self.site_offsets = np.concatenate(([0], np.cumsum(sizes)))
+        self.sites = np.empty((int(self.site_offsets[-1]), 2))
+        for t, k in enumerate(steps.tolist()):
+            a, b, c = corners[t]
+            weights = grids[k]
+            self.sites[self.site_offsets[t]:self.site_offsets[t + 1]] = a + weights[:, :1] * (b - a) + weights[:, 1:] * (c - a)
+
+        # Distances from the sites of every triangle to the portals of the separators above it:
+        # for depth d, rows of 'portals' values, one per site, d times.
+        self.table_offsets = np.concatenate(([0], np.cumsum(self.depth * sizes * self.portals)))
+        self.table = np.full(int(self.table_offsets[-1]), np.inf)
+        steps = np.linspace(0.0, 1.0, self.portals)
+        dual = index.dual
+        for c in range(count):
+            if not dual.covers(c):
+                continue
+            level = int(self.depth[c])
+            for e in range(3):
+                if (n := int(neighbors[c, e])) < 0 or self.depth[n] <= level:
+                    continue
+                a, b = int(triangles[c, e]), int(triangles[c, (e + 1) % 3])
+                for i, (x, y) in enumerate((vertices[a] + steps[:, None] * (vertices[b] - vertices[a])).tolist()):
+                    self._fill(c, e, level, i, x, y)
+
+    def _fill(self, c: int, e: int, level: int, i: int, x: float, y: float):
+        """Stores the distances from portal i of edge e of separator c to the sites behind that edge."""
+        vertices, triangles = self.index.vertices, self.index.triangles
+        a, b = triangles[c, e].tolist(), triangles[c, (e + 1) % 3].tolist()
+        distance = {a: hypot(*(vertices[a] - (x, y))), b: hypot(*(vertices[b] - (x, y)))}
+        m = self.portals
+        for t, _, w, funnel in funnels(self.index, x, y, c, edges=(e,), depth=self.depth, min_depth=level):
+            ids, points, _ = funnel
+            if w not in distance:
+                wx, wy = vertices[w].tolist()
+                j = tangent(funnel, (wx, wy))
+                distance[w] = (0.0 if ids[j] == SOURCE else distance[ids[j]]) + hypot(wx - points[j][0], wy - points[j][1])
+
+            start, end = int(self.site_offsets[t]), int(self.site_offsets[t + 1])
+            row = int(self.table_offsets[t]) + level * (end - start) * m + i
+            for k, corner in enumerate(triangles[t].tolist()):
+                self.table[row + k * m] = distance[corner]
+            for k, site in enumerate(self.sites[start + 3:end].tolist(), start=3):
+                j = tangent(funnel, tuple(site))
+                px, py = points[j]
+                self.table[row + k * m] = (0.0 if ids[j] == SOURCE else distance[ids[j]]) + hypot(site[0] - px, site[1] - py)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.depth, self.ancestor_offsets, self.ancestors, self.facing,
+                                      self.site_offsets, self.sites, self.table_offsets, self.table))
+
+    def _side(self, t: int, c: int, level: int, x: float, y: float) -> tuple[np.ndarray, np.ndarray, np.ndarray, float]:
+        """
+            The portals where a path from (x, y), in triangle t, may cross into separator c, the
+            upper and lower bounds of the distance to each of them, and half their spacing.
+        """
+        if t == c:
+            return np.array([(x, y)]), np.zeros(1), np.zeros(1), 0.0
+        e = int(self.facing[int(self.ancestor_offsets[t]) - t + level])
+        vertices, triangles = self.index.vertices, self.index.triangles
+        a, b = vertices[triangles[c, e]], vertices[triangles[c, (e + 1) % 3]]
+        portals = a + np.linspace(0.0, 1.0, self.portals)[:, None] * (b - a)
+
+        start, end = int(self.site_offsets[t]), int(self.site_offsets[t + 1])
+        row = int(self.table_offsets[t]) + level * (end - start) * self.portals
+        known = self.table[row:row + (end - start) * self.portals].reshape(end - start, self.portals)
+        offsets = np.hypot(self.sites[start:end, 0] - x, self.sites[start:end, 1] - y)[:, None]
+        half_spacing = hypot(*(b - a)) / (2 * (self.portals - 1))
+        return portals, (known + offsets).min(axis=0), (known - offsets).max(axis=0), half_spacing
+
+    def _bounds(self, p: tuple[float, float], q: tuple[float, float], tp: int, tq: int) -> tuple[float, float]:
+        """Lower and upper bounds of the geodesic distance between p and q, in triangles tp and tq of a polygon."""
+        (px, py), (qx, qy) = p, q
+        straight = hypot(qx - px, qy - py)
+        if tp == tq:
+            return straight, straight
+        if not self.index.dual.covers(tp):
+            exact = self._exact(p, q, tp, tq)
+            return exact, exact
+
+        # The first separator between them is their deepest common one.
+        level = separator_level(self.ancestor_offsets, self.ancestors, tp, tq)
+        c = int(self.ancestors[self.ancestor_offsets[tp] + level])
+
+        portals_p, upper_p, lower_p, h_p = self._side(tp, c, level, px, py)
+        portals_q, upper_q, lower_q, h_q = self._side(tq, c, level, qx, qy)
+        # Straight across the separator, between any two crossing points.
+        between = np.hypot(portals_p[:, None, 0] - portals_q[None, :, 0], portals_p[:, None, 1] - portals_q[None, :, 1])
+        upper = float((upper_p[:, None] + between + upper_q[None, :]).min())
+        lower = float((lower_p[:, None] + between + lower_q[None, :]).min()) - 2 * (h_p + h_q)
+        return max(straight, lower), upper
+
+    def _locate(self, p: tuple[float, float], q: tuple[float, float]) -> Optional[tuple[int, int]]:
+        """The triangles of p and q, None if they are not in the same polygon."""
+        index = self.index
+        if (tp := index.locate(*p)) < 0 or (tq := index.locate(*q)) < 0 or index.polygon[tp] != index.polygon[tq]:
+            return None
+        return tp, tq
+
+    def bounds(self, p: tuple[float, float], q: tuple[float, float]) -> Optional[tuple[float, float]]:
+        """Lower and upper bounds of the geodesic distance between p and q, None if there is no path."""
+        if (located := self._locate(p, q)) is None:
+            return None
+        return self._bounds(p, q, *located)
+
+    def _exact(self, p: tuple[float, float], q: tuple[float, float], tp: int, tq: int) -> float:
+        """The geodesic distance between p and q, in triangles tp and tq of a polygon."""
+        index = self.index
+        return path_length(shortest_pull([index.portals(c) for c in index.corridors(tp, tq)], tuple(p), tuple(q)))
+
+    def exact_distance(self, p: tuple[float, float], q: tuple[float, float]) -> Optional[float]:
+        return None if (located := self._locate(p, q)) is None else self._exact(p, q, *located)
+
+    def approx_distance(self, p: tuple[float, float], q: tuple[float, float], exact: bool = False) -> Optional[float]:
+        """
+            Estimates the geodesic distance between two points, within a factor 1 + epsilon.
+
+            Arguments:
+            p, q -- the two points
+            exact -- compute the exact distance instead
+
+            Returns: the estimate, None if the points are not in the same polygon
+        """
+        if (located := self._locate(p, q)) is None:
+            return None
+        if exact:
+            return self._exact(p, q, *located)
+        if not self.index.dual.covers(located[0]):
+            self.fallbacks += 1
+            return self._exact(p, q, *located)
+        lower, upper = self._bounds(p, q, *located)
+        if upper <= (1 + self.epsilon) * lower:
+            self.certified += 1
+            return upper
+        self.fallbacks += 1
+        return self._exact(p, q, *located)
+
+    def _levels(self, tp: np.ndarray, tq: np.ndarray) -> np.ndarray:
+        """`separator_level` of arrays of triangle pairs: how far their chains of separators agree."""
+        offsets, ancestors = self.ancestor_offsets, self.ancestors
+        common = np.minimum(self.depth[tp], self.depth[tq]) + 1
+        level = np.full(len(tp), -1, dtype=np.int64)
+        agree = np.ones(len(tp), dtype=bool)
+        last = len(ancestors) - 1
+        for k in range(int(common.max(initial=0))):
+            agree &= k < common
+            agree &= ancestors[np.minimum(offsets[tp] + k, last)] == ancestors[np.minimum(offsets[tq] + k, last)]
+            level[agree] = k
+        return level
+
+    def _sides(self, t: np.ndarray, c: np.ndarray, level: np.ndarray,
+               points: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+            `_side` of arrays of queries: (N, portals, 2) crossing points, (N, portals) upper
+            and lower bounds of the distance to them, and (N,) half their spacing. A point in
+            the separator itself crosses at every portal where it stands, at no distance.
+        """
+        m = self.portals
+        vertices, triangles = self.index.vertices, self.index.triangles
+        own = t == c
+        e = np.where(own, 0, self.facing[np.where(own, 0, self.ancestor_offsets[t] - t + level)])
+        a, b = vertices[triangles[c, e]], vertices[triangles[c, (e + 1) % 3]]
+        portals = a[:, None, :] + np.linspace(0.0, 1.0, m)[None, :, None] * (b - a)[:, None, :]
+        portals[own] = points[own, None, :]
+        half_spacing = np.where(own, 0.0, np.hypot(*(b - a).T) / (2 * (m - 1)))
+
+        # The rows of every site of every query, one after the other.
+        start = self.site_offsets[t]
+        sizes = np.where(own, 1, self.site_offsets[t + 1] - start)
+        firsts = np.cumsum(sizes) - sizes
+        owner = np.repeat(np.arange(len(t)), sizes)
+        k = np.arange(int(sizes.sum())) - firsts[owner]
+        offsets = np.hypot(*(self.sites[start[owner] + k] - points[owner]).T)[:, None]
+        rows = np.where(own, 0, self.table_offsets[t] + level * sizes * m)[owner] + k * m
+        known = np.where(own[owner, None], offsets, self.table[rows[:, None] + np.arange(m)])
+        upper = np.minimum.reduceat(known + offsets, firsts, axis=0)
+        lower = np.maximum.reduceat(known - offsets, firsts, axis=0)
+        upper[own], lower[own] = 0.0, 0.0
+        return portals, upper, lower, half_spacing
+
+    def approx_distances(self, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        """
+            `approx_distance` of a batch of queries: the points are located with
+            `locate_many` and bounded with array operations, the exact distance is only
+            computed for the queries the bounds do not certify.
+
+            Arguments:
+            starts, ends -- (N, 2) coordinates of the two points of every query
+
+            Returns: (N,) float64 estimates, inf where the points are not in the same polygon
+        """
+        index = self.index
+        starts = np.asarray(starts, dtype=np.float64).reshape(-1, 2)
+        ends = np.asarray(ends, dtype=np.float64).reshape(-1, 2)
+        tp, tq = index.locate_many(starts), index.locate_many(ends)
+        result = np.full(len(starts), np.inf)
+        valid = (tp >= 0) & (tq >= 0)
+        valid[valid] = index.polygon[tp[valid]] == index.polygon[tq[valid]]
+        same = valid & (tp == tq)
+        result[same] = np.hypot(*(ends[same] - starts[same]).T)
+
+        dual = index.dual
+        split = np.flatnonzero(valid & ~same)
+        tree = dual.acyclic[dual.component[tp[split]]]
+        exact = split[~tree].tolist()
+        for chunk in range(0, int(tree.sum()), ORACLE_CHUNK):
+            queries = split[tree][chunk:chunk + ORACLE_CHUNK]
+            p, q, a, b = starts[queries], ends[queries], tp[queries], tq[queries]
+            level = self._levels(a, b)
+            c = self.ancestors[self.ancestor_offsets[a] + level]
+            portals_p, upper_p, lower_p, h_p = self._sides(a, c, level, p)
+            portals_q, upper_q, lower_q, h_q = self._sides(b, c, level, q)
+            between = np.hypot(*(portals_p[:, :, None, :] - portals_q[:, None, :, :]).transpose(3, 0, 1, 2))
+            upper = (upper_p[:, :, None] + between + upper_q[:, None, :]).min(axis=(1, 2))
+            lower = (lower_p[:, :, None] + between + lower_q[:, None, :]).min(axis=(1, 2)) - 2 * (h_p + h_q)
+            lower = np.maximum(lower, np.hypot(*(q - p).T))
+            certified = upper <= (1 + self.epsilon) * lower
+            result[queries[certified]] = upper[certified]
+            self.certified += int(certified.sum())
+            exact.extend(queries[~certified].tolist())
+
+        self.fallbacks += len(exact)
+        for query in exact:
+            result[query] = self._exact(starts[query].tolist(), ends[query].tolist(), int(tp[query]), int(tq[query]))
+        return result
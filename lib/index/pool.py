@@ -0,0 +1,139 @@
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Iterable, Optional
+
+import numpy as np
+
+from lib.index.shared import Layout, SharedIndex
+from lib.index.tree import distance_matrix
+from lib.index.versioned import IndexVersion, VersionedIndex
+
+# The blocks attached by each worker process, by name, with their version number.
+_attached: dict[str, tuple[int, SharedIndex]] = {}
+# The newest version a worker has been asked for.
+_latest = 0
+
+# A batch for a worker: the version it started on, the handle of its block and the pairs.
+Task = tuple[int, str, Layout, np.ndarray]
+
+
+def _attach(number: int, name: str, layout: Layout) -> SharedIndex:
+    """
+        The block of a version, attached on first use. Once a newer version is asked for,
+        the older ones are unmapped; a late batch of an older version attaches it again,
+        it is only unlinked when every batch started on it is done.
+    """
+    global _latest
+    _latest = max(_latest, number)
+    for other, (n, shared) in list(_attached.items()):
+        if n < _latest and other != name:
+            del _attached[other]
+            shared.close()
+    if name not in _attached:
+        _attached[name] = (number, SharedIndex.attach(name, layout))
+    return _attached[name][1]
+
+
+def _solve(task: Task) -> list[Optional[dict]]:
+    number, name, layout, pairs = task
+    index = _attach(number, name, layout).index
+    return [index.shortest_path((sx, sy), (ex, ey)) for sx, sy, ex, ey in pairs.tolist()]
+
+
+def _distances(task: tuple[int, str, Layout, np.ndarray, np.ndarray, np.ndarray, np.ndarray]) -> np.ndarray:
+    number, name, layout, sources, source_triangles, targets, target_triangles = task
+    index = _attach(number, name, layout).index
+    return distance_matrix(index, sources, targets, source_triangles, target_triangles)
+
+
+class QueryPool:
+    """
+        A pool of worker processes answering shortest path queries over a SharedIndex.
+        Each worker attaches to the shared block once, so the index is neither copied nor
+        rebuilt per worker.
+
+        Given a VersionedIndex of SharedIndex, the index can be swapped while the pool
+        runs: every batch is answered on the version current when it was sent, and the
+        workers move to a new block with their next batch.
+    """
+
+    def __init__(self, shared: SharedIndex | VersionedIndex[SharedIndex], processes: Optional[int] = None,
+                 chunk_size: int = 1024):
+        self.processes = processes or os.cpu_count()
+        self.chunk_size = chunk_size
+        self.index = shared if isinstance(shared, VersionedIndex) else VersionedIndex(shared)
+        current = self.index.current
+        self._executor = ProcessPoolExecutor(max_workers=self.processes, initializer=_attach,
+                                             initargs=(current.number, *current.value.handle))
+
+    def swap(self, shared: SharedIndex) -> IndexVersion[SharedIndex]:
+        """Answers the next batches on another block; see `VersionedIndex.swap`."""
+        return self.index.swap(shared)
+
+    def _task(self, version: IndexVersion[SharedIndex], pairs: np.ndarray) -> Task:
+        return (version.number, *version.value.handle, pairs)
+
+    def shortest_paths(self, pairs: np.ndarray | Iterable[tuple[float, float, float, float]]) -> list[Optional[dict]]:
+        """
+            Answers a batch of queries across all workers.
+
+            Arguments:
+            pairs -- (N, 4) start x, start y, end x, end y of every query
+
+            Returns: the path of every query, in order, None where there is no path
+        """
+        pairs = np.asarray(pairs, dtype=np.float64).reshape(-1, 4)
+        # Give every worker a few chunks so that slow queries even out.
+        chunk_size = max(1, min(self.chunk_size, -(-len(pairs) // (4 * self.processes))))
+        version = self.index.acquire()
+        try:
+            tasks = [self._task(version, pairs[i:i + chunk_size]) for i in range(0, len(pairs), chunk_size)]
+            return [path for paths in self._executor.map(_solve, tasks) for path in paths]
+        finally:
+            self.index.release(version)
+
+    def distance_matrix(self, sources: np.ndarray, targets: np.ndarray) -> np.ndarray:
+        """
+            Geodesic distances from every source to every target, see `tree.distance_matrix`.
+            All the points are located once here, and the rows are computed across workers.
+
+            Arguments:
+            sources, targets -- (N, 2) and (M, 2) coordinates
+
+            Returns: (N, M) float64 distances, inf where the points are not in the same polygon
+        """
+        sources = np.asarray(sources, dtype=np.float64).reshape(-1, 2)
+        targets = np.asarray(targets, dtype=np.float64).reshape(-1, 2)
+        version = self.index.acquire()
+        try:
+            index = version.value.index
+            source_triangles, target_triangles = index.locate_many(sources), index.locate_many(targets)
+            # Every row is a pass over a polygon: a few rows per task are enough to even out.
+            rows = max(1, -(-len(sources) // (4 * self.processes)))
+            tasks = [(version.number, *version.value.handle, sources[i:i + rows], source_triangles[i:i + rows],
+                      targets, target_triangles) for i in range(0, len(sources), rows)]
+            blocks = list(self._executor.map(_distances, tasks))
+        finally:
+            self.index.release(version)
+        return np.vstack(blocks) if blocks else np.empty((0, len(targets)))
+
+    def submit(self, pairs: np.ndarray) -> Future:
+        """Sends one batch to a single worker, returns a future of its paths."""
+        pairs = np.asarray(pairs, dtype=np.float64).reshape(-1, 4)
+        version = self.index.acquire()
+        try:
+            future = self._executor.submit(_solve, self._task(version, pairs))
+        except BaseException:
+            self.index.release(version)
+            raise
+        future.add_done_callback(lambda _: self.index.release(version))
+        return future
+
+    def close(self):
+        self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
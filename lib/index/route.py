@@ -0,0 +1,94 @@
+from typing import Optional
+
+import numpy as np
+
+from lib.index.flat import FlatIndex
+from lib.index.tree import distance_matrix
+from lib.path_finding.funnel import Coordinate, path_length, shortest_pull
+
+
+def visiting_order(distances: np.ndarray) -> list[int]:
+    """
+        A short open tour of the stops from the first one, which stays first: nearest
+        neighbor from the first stop, then 2-opt moves (reversing a run of stops) while one
+        shortens it.
+    """
+    count = len(distances)
+    if count < 3:
+        return list(range(count))
+    order = [0]
+    left = set(range(1, count))
+    while left:
+        nearest = min(left, key=lambda s: distances[order[-1], s])
+        order.append(nearest)
+        left.remove(nearest)
+
+    def length(tour: list[int]) -> float:
+        return float(distances[tour[:-1], tour[1:]].sum())
+
+    best = length(order)
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, count - 1):
+            for j in range(i + 1, count):
+                candidate = order[:i] + order[i:j + 1][::-1] + order[j + 1:]
+                if (candidate_length := length(candidate)) < best - 1e-12:
+                    order, best, improved = candidate, candidate_length, True
+    return order
+
+
+def route(index: FlatIndex, waypoints: np.ndarray, optimize_order: bool = False) -> Optional[dict]:
+    """
+        The shortest route through several stops, leg after leg. All the stops are located
+        at once, legs between the same two triangles share their corridors, and every edge
+        the legs cross gets its portal once, whichever legs cross it and in which direction.
+
+        With optimize_order the stops after the first are visited in the order chosen by
+        `visiting_order` over their distance matrix (see `distance_matrix`), computed from
+        the same located triangles.
+
+        Arguments:
+        waypoints -- (N, 2) coordinates of the stops, N >= 1
+        optimize_order -- reorder the stops after the first to shorten the route
+
+        Returns: a dict with the 'x' and 'y' coordinates of the whole route, the 'legs'
+        lengths and the 'order' the stops were visited in, or None if they are not all in
+        the same polygon
+    """
+    waypoints = np.asarray(waypoints, dtype=np.float64).reshape(-1, 2)
+    if not len(waypoints):
+        raise ValueError('A route needs at least one waypoint.')
+    located = index.locate_many(waypoints)
+    if (located < 0).any() or (index.polygon[located] != index.polygon[located[0]]).any():
+        return None
+
+    order = list(range(len(waypoints)))
+    if optimize_order:
+        distances = distance_matrix(index, waypoints, waypoints, located, located)
+        order = visiting_order(distances)
+    points: list[Coordinate] = [tuple(p) for p in waypoints[order].tolist()]
+    triangles = located[order].tolist()
+
+    # Legs cross the same edges wherever their corridors overlap, the part around a shared
+    # stop first of all: every edge gets its portal once, in both directions.
+    crossed: dict[tuple[int, int], tuple[Coordinate, Coordinate]] = {}
+
+    def portal(t: int, n: int) -> tuple[Coordinate, Coordinate]:
+        if (key := (t, n)) not in crossed:
+            if (n, t) in crossed:
+                left, right = crossed[(n, t)]
+                crossed[key] = right, left
+            else:
+                crossed[key] = index.portal(t, n)
+        return crossed[key]
+
+    portals: dict[tuple[int, int], list[list]] = {}
+    path, legs = [points[0]], []
+    for start, end, t1, t2 in zip(points, points[1:], triangles, triangles[1:]):
+        if (key := (t1, t2)) not in portals:
+            portals[key] = [[portal(t, n) for t, n in zip(c, c[1:])] for c in index.corridors(t1, t2)]
+        leg = shortest_pull(portals[key], start, end)
+        legs.append(path_length(leg))
+        path.extend(leg[1:])
+    return {'x': [p[0] for p in path], 'y': [p[1] for p in path], 'legs': legs, 'order': order}
@@ -0,0 +1,124 @@
+from typing import Optional
+
+from lib.index.flat import FlatIndex
+from lib.path_finding.funnel import IncrementalFunnel, path_length, to_xy
+
+Coordinate = tuple[float, float]
+
+
+class PathSession:
+    """
+        A shortest path query whose endpoints move. Keeps the triangle corridor and the
+        funnel between updates: a moved endpoint is followed through the triangles it
+        crosses, the corridor is trimmed or extended at that end only, and only the part of
+        the funnel after the last apex left is run again.
+
+        The funnel grows from the endpoint that did not move last. Moving the other
+        endpoint turns it around once, at the cost of a full query; moving the same
+        endpoint again is incremental.
+
+        In a polygon with a hole the shortest path may switch sides around it, so every
+        move there is a full query over both ways around the hole.
+    """
+
+    def __init__(self, index: FlatIndex, start: Coordinate, end: Coordinate):
+        self.index = index
+        self._start, self._end = tuple(start), tuple(end)
+        self._funnel: Optional[IncrementalFunnel] = None
+        # Triangles from the fixed endpoint to the moving one.
+        self._corridor: list[int] = []
+        self._moving_end = True
+        self._path: Optional[list[Coordinate]] = None
+        self._rebuild()
+
+    @property
+    def start(self) -> Coordinate:
+        return self._start
+
+    @property
+    def end(self) -> Coordinate:
+        return self._end
+
+    @property
+    def corridor(self) -> list[int]:
+        """The triangles crossed from start to end, empty if there is no path."""
+        return list(self._corridor if self._moving_end else reversed(self._corridor))
+
+    @property
+    def path(self) -> Optional[dict]:
+        """The current shortest path, None if the endpoints are not in the same polygon."""
+        if self._path is None:
+            return None
+        return to_xy(self._path if self._moving_end else self._path[::-1])
+
+    def move_start(self, point: Coordinate) -> Optional[dict]:
+        """Moves the start point, returns the new path or None (leaving the session unchanged) without one."""
+        return self._move(tuple(point), moving_end=False)
+
+    def move_end(self, point: Coordinate) -> Optional[dict]:
+        """Moves the end point, returns the new path or None (leaving the session unchanged) without one."""
+        return self._move(tuple(point), moving_end=True)
+
+    def _rebuild(self):
+        """Runs the whole query, growing the funnel from the fixed endpoint."""
+        fixed, moving = (self._start, self._end) if self._moving_end else (self._end, self._start)
+        index = self.index
+        self._corridor, self._funnel, self._path = [], None, None
+        if (t1 := index.locate(*fixed)) < 0 or (t2 := index.locate(*moving)) < 0:
+            return
+        if index.polygon[t1] != index.polygon[t2]:
+            return
+        for corridor in index.corridors(t1, t2):
+            funnel = IncrementalFunnel(fixed, index.portals(corridor))
+            path = funnel.path(moving)
+            if self._path is None or path_length(path) < path_length(self._path):
+                self._corridor, self._funnel, self._path = corridor, funnel, path
+
+    def _move(self, point: Coordinate, moving_end: bool) -> Optional[dict]:
+        if self._funnel is None:
+            # No path to update, try the new endpoints from scratch.
+            self._start, self._end = (self._start, point) if moving_end else (point, self._end)
+            self._moving_end = moving_end
+            self._rebuild()
+            return self.path
+
+        if not self.index.dual.covers(self._corridor[-1]):
+            kept = self._start, self._end, self._moving_end, self._corridor, self._funnel, self._path
+            self._start, self._end = (self._start, point) if moving_end else (point, self._end)
+            self._moving_end = moving_end
+            self._rebuild()
+            if self._funnel is None:
+                self._start, self._end, self._moving_end, self._corridor, self._funnel, self._path = kept
+                return None
+            return self.path
+
+        if moving_end != self._moving_end:
+            self._moving_end = moving_end
+            self._rebuild()
+
+        index = self.index
+        previous = self._end if moving_end else self._start
+        last = self._corridor[-1]
+        if (walked := index.walk(last, previous, point)) is None:
+            # The segment leaves the polygon: locate the point and search around the obstacle.
+            t = index.locate(*point)
+            if t < 0 or index.polygon[t] != index.polygon[last] or (walked := index.corridor(last, t)) is None:
+                return None
+
+        # The triangles form a tree, so stepping back into the previous triangle of the
+        # corridor removes its last one.
+        corridor, funnel = self._corridor, self._funnel
+        for t in walked[1:]:
+            if len(corridor) > 1 and corridor[-2] == t:
+                corridor.pop()
+                funnel.truncate(len(corridor))
+            else:
+                funnel.extend([index.portal(corridor[-1], t)])
+                corridor.append(t)
+
+        if moving_end:
+            self._end = point
+        else:
+            self._start = point
+        self._path = funnel.path(point)
+        return self.path
@@ -0,0 +1,83 @@
+import multiprocessing
+import sys
+from multiprocessing import resource_tracker, shared_memory
+from typing import Optional
+
+import numpy as np
+
+from lib.index.flat import FlatIndex
+
+# Offsets of the arrays inside the block are aligned to cache lines.
+ALIGNMENT = 64
+
+Layout = dict[str, tuple[int, str, tuple[int, ...]]]
+
+
+class SharedIndex:
+    """
+        A FlatIndex packed into a single `multiprocessing.shared_memory` block. The process
+        that creates it owns the block and unlinks it; other processes attach by name and
+        get zero-copy, read only views of the same pages, so adding workers does not add
+        memory.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, layout: Layout, owner: bool):
+        self.shm = shm
+        self.layout = layout
+        self.owner = owner
+        arrays = {}
+        for name, (offset, dtype, shape) in layout.items():
+            array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf, offset=offset)
+            array.flags.writeable = False
+            arrays[name] = array
+        self.index = FlatIndex(**arrays)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    @property
+    def handle(self) -> tuple[str, Layout]:
+        """What another process needs to `attach`; small and picklable."""
+        return self.shm.name, self.layout
+
+    @classmethod
+    def create(cls, index: FlatIndex, name: Optional[str] = None) -> 'SharedIndex':
+        """Copies the arrays of an index into a new shared memory block."""
+        layout: Layout = {}
+        size = 0
+        for array_name, array in index.arrays.items():
+            layout[array_name] = (size, array.dtype.str, array.shape)
+            size += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+
+        shm = shared_memory.SharedMemory(name=name, create=True, size=max(size, 1))
+        for array_name, array in index.arrays.items():
+            offset, dtype, shape = layout[array_name]
+            np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)[...] = array
+        return cls(shm, layout, owner=True)
+
+    @classmethod
+    def attach(cls, name: str, layout: Layout) -> 'SharedIndex':
+        """Maps an existing block created by `create` in another process."""
+        if sys.version_info >= (3, 13):
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        else:
+            shm = shared_memory.SharedMemory(name=name)
+            # Children of the creator share its resource tracker, an independent process has
+            # its own which would unlink the block when the process exits.
+            if multiprocessing.parent_process() is None:
+                resource_tracker.unregister(shm._name, 'shared_memory')
+        return cls(shm, layout, owner=False)
+
+    def close(self):
+        """Releases the mapping, and the block itself if this process created it."""
+        self.index = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
@@ -0,0 +1,684 @@
+import heapq
+from math import atan2, ceil, cos, hypot, pi, sin
+from typing import Iterator, Optional
+
+import numpy as np
+
+from lib.index.flat import FlatIndex
+from lib.path_finding.funnel import Coordinate, cross, path_length, segment_distance, to_xy
+
+# Parent of the vertices seen straight from the source.
+SOURCE = -1
+# Parent of the vertices outside the polygon of the source.
+UNREACHED = -2
+# The first triangle of the cycle around a hole of a walk that came back to it, see `walk_cycle`.
+CLOSED = -2
+
+# A funnel: the vertex ids from the left end of an edge to its right end through the apex, their
+# points and the position of the apex. SOURCE stands for the source point.
+Funnel = tuple[list[int], list[Coordinate], int]
+
+
+def tangent(funnel: Funnel, point: Coordinate) -> int:
+    """The position of the funnel vertex the shortest path to a point beyond the funnel edge bends around last."""
+    _, points, apex = funnel
+    j = apex
+    # Wrap around the left chain, then the right one, while the point is beyond the next edge.
+    while j > 0 and cross(points[j], points[j - 1], point) > 0:
+        j -= 1
+    if j == apex:
+        while j < len(points) - 1 and cross(points[j], points[j + 1], point) < 0:
+            j += 1
+    return j
+
+
+def hole_cycle(index: FlatIndex, t: int) -> Optional[np.ndarray]:
+    """
+        The cycle around the hole of the polygon of triangle t (see `DualTree.cycle`), None
+        if it has no hole. Raises ValueError for more holes: the funnels below then go round
+        and round.
+    """
+    dual = index.dual
+    if (holes := int(dual.holes[dual.component[t]])) > 1:
+        raise ValueError(f'Polygons with {holes} holes are not supported, at most one.')
+    return dual.cycle if holes else None
+
+
+def walk_cycle(cycle: Optional[np.ndarray], first: int, t: int) -> int:
+    """
+        The first triangle of the cycle around the hole a walk entering triangle t has
+        crossed, -1 before it reaches the cycle; CLOSED when t is that triangle again, the
+        walk having gone all around. Stopping there enters every triangle once per way
+        around the hole, the only two corridors to it.
+    """
+    if cycle is None or not cycle[t]:
+        return first
+    if first < 0:
+        return t
+    return CLOSED if first == t else first
+
+
+def funnels(index: FlatIndex, x: float, y: float, t0: int, edges=(0, 1, 2), depth: Optional[np.ndarray] = None,
+            min_depth: int = -1) -> Iterator[tuple[int, int, int, Funnel]]:
+    """
+        Splits funnels from a point, inside triangle t0 or on its boundary, over the triangles
+        it reaches across the given edges of t0. The triangles of a polygon without a hole
+        form a tree, so every triangle is entered once; around a hole, once per way around
+        it (see `walk_cycle`), and the caller keeps the shorter of the two distances it
+        finds for a vertex. With 'depth', only triangles deeper than 'min_depth' are entered.
+
+        Yields: (triangle, entry edge, third vertex, funnel of the entry edge) for every
+        triangle entered, parents before children. The caller must have set the distance
+        of the funnel vertices when it yields, the third vertex is reached through
+        funnel vertex tangent(funnel, its point).
+    """
+    vertices, triangles, neighbors = index.vertices, index.triangles, index.neighbors
+    source = (float(x), float(y))
+    corners = triangles[t0].tolist()
+    cycle = hole_cycle(index, t0)
+    start = walk_cycle(cycle, -1, t0)
+
+    stack = []
+    for e in edges:
+        if (n := int(neighbors[t0, e])) >= 0 and (depth is None or depth[n] > min_depth):
+            if (first := walk_cycle(cycle, start, n)) == CLOSED:
+                continue
+            left, right = corners[(e + 1) % 3], corners[e]
+            stack.append((n, t0, ([left, SOURCE, right],
+                                  [tuple(vertices[left].tolist()), source, tuple(vertices[right].tolist())], 1), first))
+
+    while stack:
+        t, previous, funnel, first = stack.pop()
+        tri = triangles[t].tolist()
+        i = neighbors[t].tolist().index(previous)
+        w = tri[(i + 2) % 3]
+        yield t, i, w, funnel
+
+        ids, points, apex = funnel
+        pw = tuple(vertices[w].tolist())
+        j = tangent(funnel, pw)
+        # The funnels of the two other edges of t, split at the parent of w.
+        for n, child in ((int(neighbors[t, (i + 2) % 3]), (ids[:j + 1] + [w], points[:j + 1] + [pw], min(j, apex))),
+                         (int(neighbors[t, (i + 1) % 3]), ([w] + ids[j:], [pw] + points[j:], max(j, apex) - j + 1))):
+            if n < 0 or (depth is not None and depth[n] <= min_depth):
+                continue
+            if (entered := walk_cycle(cycle, first, n)) != CLOSED:
+                stack.append((n, t, child, entered))
+
+
+def centroid_decomposition(index: FlatIndex) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+        Centroid decomposition of the trees of triangles of the polygons: picks a separator
+        triangle that splits a tree in parts of at most half its size, then does the same
+        in every part, so there are O(log T) separators above every triangle.
+
+        Returns: the depth of every triangle as a separator, offsets and separators above
+        every triangle (itself last, ancestors[ancestor_offsets[t]:ancestor_offsets[t + 1]]),
+        and the edge of each of them facing it (one less per triangle: its offsets are
+        ancestor_offsets - t)
+    """
+    neighbors = index.neighbors
+    count = len(index.triangles)
+    depth = np.full(count, -1, dtype=np.int32)
+    ancestors: list[list[int]] = [[] for _ in range(count)]
+    facing: list[list[int]] = [[] for _ in range(count)]
+    roots = np.unique(index.polygon, return_index=True)[1].tolist()
+    stack = [(t, 0, -1) for t in roots]
+    parent = np.full(count, -1, dtype=np.int64)
+    # The component every triangle was last gathered in.
+    stamp = np.full(count, -1, dtype=np.int64)
+    components = 0
+    while stack:
+        root, level, edge = stack.pop()
+        components += 1
+        order = [root]
+        stamp[root], parent[root] = components, -1
+        for t in order:
+            for n in neighbors[t].tolist():
+                if n >= 0 and depth[n] < 0 and stamp[n] != components:
+                    stamp[n], parent[n] = components, t
+                    order.append(n)
+        size = dict.fromkeys(order, 1)
+        for t in reversed(order[1:]):
+            size[int(parent[t])] += size[t]
+
+        c = root
+        while True:
+            heavy = [n for n in neighbors[c].tolist() if n >= 0 and stamp[n] == components and parent[n] == c
+                     and size[n] > len(order) // 2]
+            if not heavy:
+                break
+            c = heavy[0]
+        depth[c] = level
+        for t in order:
+            ancestors[t].append(c)
+            if edge >= 0:
+                facing[t].append(edge)
+        for e, n in enumerate(neighbors[c].tolist()):
+            if n >= 0 and depth[n] < 0:
+                stack.append((n, level + 1, e))
+
+    ancestor_offsets = np.concatenate(([0], np.cumsum(depth.astype(np.int64) + 1)))
+    return (depth, ancestor_offsets, np.array([c for chain in ancestors for c in chain], dtype=np.int32),
+            np.array([e for chain in facing for e in chain], dtype=np.int8))
+
+
+def separator_level(ancestor_offsets: np.ndarray, ancestors: np.ndarray, t1: int, t2: int) -> int:
+    """The level of the first separator between two triangles of a polygon: their deepest common one."""
+    chain_1 = ancestors[ancestor_offsets[t1]:ancestor_offsets[t1 + 1]]
+    chain_2 = ancestors[ancestor_offsets[t2]:ancestor_offsets[t2 + 1]]
+    common = min(len(chain_1), len(chain_2))
+    differ = chain_1[:common] != chain_2[:common]
+    return int(np.argmax(differ)) - 1 if differ.any() else common - 1
+
+
+def shortest_path_tree(index: FlatIndex, x: float, y: float,
+                       t0: Optional[int] = None) -> tuple[int, np.ndarray, np.ndarray]:
+    """
+        Shortest paths from a point to every vertex of its polygon, by splitting funnels over
+        the triangles of the polygon. t0 is the triangle of the point, located when not
+        given; giving it allows sources on the boundary of their triangle, such as vertices.
+
+        Returns: the triangle of the source (-1 if it is outside every polygon), the parent
+        vertex of every vertex (SOURCE or UNREACHED) and the geodesic distance to every
+        vertex (inf where unreached)
+    """
+    vertices = index.vertices
+    parent = np.full(len(vertices), UNREACHED, dtype=np.int32)
+    distance = np.full(len(vertices), np.inf)
+    if t0 is None:
+        t0 = index.locate(x, y)
+    if t0 < 0:
+        return t0, parent, distance
+
+    for c in index.triangles[t0].tolist():
+        vx, vy = vertices[c].tolist()
+        parent[c], distance[c] = SOURCE, hypot(vx - x, vy - y)
+
+    for _, _, w, funnel in funnels(index, x, y, t0):
+        ids, points, _ = funnel
+        wx, wy = vertices[w].tolist()
+        j = tangent(funnel, (wx, wy))
+        px, py = points[j]
+        if (d := (0.0 if ids[j] == SOURCE else distance[ids[j]]) + hypot(wx - px, wy - py)) < distance[w]:
+            parent[w], distance[w] = ids[j], d
+
+    return t0, parent, distance
+
+
+class ShortestPathTree:
+    """
+        Shortest paths from one origin to every point of its polygon. Keeps the parent and
+        distance of every vertex, as `shortest_path_tree`, and the edge every triangle was
+        entered by. A target is then answered by locating it and walking up the tree: the
+        paths to the ends of the entry edge of its triangle make its funnel, and the path
+        to the target leaves it at the tangent vertex.
+
+        Around a hole the paths to the two ends of an edge may pass on either side of it and
+        make no funnel: the vertex tree is kept, but targets in such a polygon are answered
+        by `FlatIndex.shortest_path` over both ways around the hole.
+    """
+
+    def __init__(self, index: FlatIndex, origin: tuple[float, float], t0: Optional[int] = None):
+        self.index = index
+        self.origin = (float(origin[0]), float(origin[1]))
+        vertices, triangles = index.vertices, index.triangles
+        self.parent = np.full(len(vertices), UNREACHED, dtype=np.int32)
+        self.distance = np.full(len(vertices), np.inf)
+        # The number of vertices from the origin, to find where two paths meet.
+        self.hops = np.zeros(len(vertices), dtype=np.int32)
+        self.entry = np.full(len(triangles), -1, dtype=np.int8)
+        self.t0 = index.locate(*self.origin) if t0 is None else t0
+        self.around_hole = False
+        if self.t0 < 0:
+            return
+        self.around_hole = hole_cycle(index, self.t0) is not None
+
+        x, y = self.origin
+        for c in triangles[self.t0].tolist():
+            self.parent[c], self.distance[c] = SOURCE, hypot(vertices[c, 0] - x, vertices[c, 1] - y)
+            self.hops[c] = 1
+        for t, i, w, funnel in funnels(index, x, y, self.t0):
+            self.entry[t] = i
+            ids, points, _ = funnel
+            wx, wy = vertices[w].tolist()
+            j = tangent(funnel, (wx, wy))
+            d = (0.0 if ids[j] == SOURCE else self.distance[ids[j]]) + hypot(wx - points[j][0], wy - points[j][1])
+            if d < self.distance[w]:
+                self.parent[w], self.distance[w] = ids[j], d
+                self.hops[w] = 1 if ids[j] == SOURCE else self.hops[ids[j]] + 1
+
+    def _funnel(self, t: int) -> Funnel:
+        """The funnel of the edge triangle t was entered by: the paths to its ends, from their meeting point."""
+        tri = self.index.triangles[t].tolist()
+        i = int(self.entry[t])
+        left, right = [tri[i]], [tri[(i + 1) % 3]]
+        parent, hops = self.parent, self.hops
+        while left[-1] != right[-1]:
+            if left[-1] != SOURCE and (right[-1] == SOURCE or hops[left[-1]] >= hops[right[-1]]):
+                left.append(int(parent[left[-1]]))
+            else:
+                right.append(int(parent[right[-1]]))
+        ids = left + right[-2::-1]
+        points = [self.origin if v == SOURCE else tuple(self.index.vertices[v].tolist()) for v in ids]
+        return ids, points, len(left) - 1
+
+    def _last_bend(self, target: tuple[float, float]) -> Optional[tuple[int, float]]:
+        """The last vertex of the path to a target (SOURCE if it is straight) and the length of the path."""
+        index = self.index
+        x, y = float(target[0]), float(target[1])
+        if self.t0 < 0 or (t := index.locate(x, y)) < 0 or index.polygon[t] != index.polygon[self.t0]:
+            return None
+        if t == self.t0:
+            return SOURCE, hypot(x - self.origin[0], y - self.origin[1])
+        ids, points, apex = funnel = self._funnel(t)
+        j = tangent(funnel, (x, y))
+        return ids[j], (0.0 if ids[j] == SOURCE else float(self.distance[ids[j]])) + hypot(x - points[j][0],
+                                                                                           y - points[j][1])
+
+    def distance_to(self, target: tuple[float, float]) -> Optional[float]:
+        """The geodesic distance from the origin to a point, None if it is not in the polygon of the origin."""
+        if self.around_hole:
+            return None if (path := self.path_to(target)) is None else path_length(list(zip(path['x'], path['y'])))
+        return None if (bend := self._last_bend(target)) is None else bend[1]
+
+    def path_to(self, target: tuple[float, float]) -> Optional[dict]:
+        """The shortest path from the origin to a point, None if it is not in the polygon of the origin."""
+        if self.around_hole:
+            return self.index.shortest_path(self.origin, (float(target[0]), float(target[1])))
+        if (bend := self._last_bend(target)) is None:
+            return None
+        path = [(float(target[0]), float(target[1]))]
+        v = bend[0]
+        while v != SOURCE:
+            path.append(tuple(self.index.vertices[v].tolist()))
+            v = int(self.parent[v])
+        if path[-1] != self.origin:
+            path.append(self.origin)
+        return to_xy(path[::-1])
+
+
+def distance_matrix(index: FlatIndex, sources: np.ndarray, targets: np.ndarray,
+                    source_triangles: Optional[np.ndarray] = None,
+                    target_triangles: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+        Geodesic distances from every source to every target. Each point is located once
+        (unless its triangle is given), then the funnels from each source are split over
+        its polygon until every triangle holding a target has been entered (around a hole,
+        over all of it, each triangle being entered once per way round): a target is
+        reached through the funnel of the edge its triangle was entered by.
+
+        Arguments:
+        sources, targets -- (N, 2) and (M, 2) coordinates
+        source_triangles, target_triangles -- their triangles, if already located
+
+        Returns: (N, M) float64 distances, inf where the points are not in the same polygon
+    """
+    sources = np.asarray(sources, dtype=np.float64).reshape(-1, 2)
+    targets = np.asarray(targets, dtype=np.float64).reshape(-1, 2)
+    if source_triangles is None:
+        source_triangles = index.locate_many(sources)
+    if target_triangles is None:
+        target_triangles = index.locate_many(targets)
+    vertices, triangles, polygon = index.vertices, index.triangles, index.polygon
+    result = np.full((len(sources), len(targets)), np.inf)
+
+    by_triangle: dict[int, list[int]] = {}
+    for k, t in enumerate(target_triangles.tolist()):
+        if t >= 0:
+            by_triangle.setdefault(t, []).append(k)
+    target_points = targets.tolist()
+
+    for row, ((x, y), t0) in enumerate(zip(sources.tolist(), source_triangles.tolist())):
+        if t0 < 0:
+            continue
+        pending = {t for t in by_triangle if polygon[t] == polygon[t0]}
+        if t0 in pending:
+            pending.discard(t0)
+            for k in by_triangle[t0]:
+                result[row, k] = hypot(target_points[k][0] - x, target_points[k][1] - y)
+        distance = {c: hypot(vertices[c, 0] - x, vertices[c, 1] - y) for c in triangles[t0].tolist()}
+
+        # Around a hole a triangle is entered once per way around it, and its targets keep
+        # the shorter distance: the search runs to the end.
+        around_hole = hole_cycle(index, t0) is not None
+        for t, _, w, funnel in funnels(index, x, y, t0):
+            if not pending:
+                break
+            ids, points, _ = funnel
+            wx, wy = vertices[w].tolist()
+            j = tangent(funnel, (wx, wy))
+            d = (0.0 if ids[j] == SOURCE else distance[ids[j]]) + hypot(wx - points[j][0], wy - points[j][1])
+            distance[w] = min(d, distance.get(w, np.inf))
+            if t in pending:
+                if not around_hole:
+                    pending.discard(t)
+                for k in by_triangle[t]:
+                    qx, qy = target_points[k]
+                    j = tangent(funnel, (qx, qy))
+                    d = (0.0 if ids[j] == SOURCE else distance[ids[j]]) + hypot(qx - points[j][0], qy - points[j][1])
+                    result[row, k] = min(result[row, k], d)
+    return result
+
+
+class CandidateSet:
+    """
+        Points registered once for `nearest` queries: located, then sorted by polygon and
+        triangle so that the candidates of a polygon, or of a triangle, are a slice.
+
+        points -- (M, 2) float64, the candidates in the order they were given
+        triangle -- (M,) int32, the triangle of every candidate, -1 outside every polygon
+        order -- (M,) int64, the candidates sorted by polygon, then triangle
+        sorted_polygon, sorted_triangle -- the polygon (-1 outside) and triangle of the candidates in that order
+    """
+
+    def __init__(self, index: FlatIndex, points: np.ndarray, triangles: Optional[np.ndarray] = None):
+        self.index = index
+        self.points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        self.triangle = index.locate_many(self.points) if triangles is None else np.asarray(triangles, dtype=np.int32)
+        polygon = np.where(self.triangle >= 0, index.polygon[np.maximum(self.triangle, 0)], -1)
+        self.order = np.lexsort((self.triangle, polygon))
+        self.sorted_polygon = polygon[self.order]
+        self.sorted_triangle = self.triangle[self.order]
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def in_polygon(self, p: int) -> np.ndarray:
+        """The candidates inside polygon p."""
+        return self.order[np.searchsorted(self.sorted_polygon, p):np.searchsorted(self.sorted_polygon, p, 'right')]
+
+    def in_triangle(self, t: int) -> list[int]:
+        """The candidates inside triangle t."""
+        start = int(np.searchsorted(self.sorted_triangle, t))
+        end = int(np.searchsorted(self.sorted_triangle, t, 'right'))
+        return self.order[start:end].tolist()
+
+
+def edge_bound(funnel: Funnel, distance: dict[int, float]) -> float:
+    """
+        A lower bound of the distance from the source to anything beyond the edge of a
+        funnel: a path there crosses the edge after its last funnel vertex.
+    """
+    ids, points, _ = funnel
+    a, b = points[0], points[-1]
+    return min((0.0 if v == SOURCE else distance[v]) + segment_distance(p, a, b) for v, p in zip(ids, points))
+
+
+def nearest(index: FlatIndex, point: tuple[float, float], candidates: CandidateSet,
+            k: int = 1) -> list[tuple[int, float]]:
+    """
+        The k candidates closest to a point by geodesic distance, from one search over the
+        polygon of the point instead of a query per candidate.
+
+        Funnels are split from the point as in `funnels`, but the triangles are entered in
+        the order of a lower bound of the distance to anything beyond their entry edge: the
+        smallest distance to a funnel vertex plus from it to the edge. A candidate is
+        reached through the funnel of its triangle, unless its straight line distance is
+        already above the k-th best distance found. The search stops once the k-th best is
+        below both the bound of the next triangle and the straight line distance of every
+        candidate not reached yet; around a hole, below the bound only.
+
+        Returns: (candidate, distance) pairs, nearest first; fewer than k if the polygon
+        of the point holds fewer candidates, none if the point is outside every polygon
+    """
+    if candidates.index is not index:
+        raise ValueError('The candidates were registered on another index.')
+    x, y = float(point[0]), float(point[1])
+    if k < 1 or (t0 := index.locate(x, y)) < 0:
+        return []
+    members = candidates.in_polygon(int(index.polygon[t0]))
+    if not len(members):
+        return []
+
+    vertices, triangles, neighbors = index.vertices, index.triangles, index.neighbors
+    points = candidates.points
+    straight = np.hypot(points[members, 0] - x, points[members, 1] - y)
+    # The candidates by straight line distance, the lower bound of those not reached yet.
+    by_straight = members[np.argsort(straight)].tolist()
+    straight = dict(zip(members.tolist(), straight.tolist()))
+    reached = set()
+    unreached = 0
+
+    # The k best as a max heap of (-distance, -candidate).
+    best: list[tuple[float, int]] = []
+
+    def kth() -> float:
+        return -best[0][0] if len(best) == k else np.inf
+
+    def reach(candidate: int, distance: float):
+        reached.add(candidate)
+        # Around a hole a candidate may be reached again, the other way round.
+        if (kept := next((e for e, (d, c) in enumerate(best) if c == -candidate), None)) is not None:
+            if distance < -best[kept][0]:
+                best[kept] = (-distance, -candidate)
+                heapq.heapify(best)
+        elif len(best) < k:
+            heapq.heappush(best, (-distance, -candidate))
+        elif distance < kth():
+            heapq.heapreplace(best, (-distance, -candidate))
+
+    def settled() -> bool:
+        nonlocal unreached
+        # Around a hole a candidate reached one way round may be closer the other way: only
+        # the bound of the next triangle ends the search.
+        if cycle is not None:
+            return False
+        while unreached < len(by_straight) and by_straight[unreached] in reached:
+            unreached += 1
+        return unreached == len(by_straight) or straight[by_straight[unreached]] >= kth()
+
+    for c in candidates.in_triangle(t0):
+        reach(c, straight[c])
+
+    source = (x, y)
+    distance = {c: hypot(vertices[c, 0] - x, vertices[c, 1] - y) for c in triangles[t0].tolist()}
+    corners = triangles[t0].tolist()
+    cycle = hole_cycle(index, t0)
+    start = walk_cycle(cycle, -1, t0)
+    queue = []
+    for e in range(3):
+        if (n := int(neighbors[t0, e])) >= 0 and (first := walk_cycle(cycle, start, n)) != CLOSED:
+            left, right = corners[(e + 1) % 3], corners[e]
+            pl, pr = tuple(vertices[left].tolist()), tuple(vertices[right].tolist())
+            queue.append((segment_distance(source, pl, pr), n, t0, ([left, SOURCE, right], [pl, source, pr], 1), first))
+    heapq.heapify(queue)
+
+    while queue and not settled():
+        bound, t, previous, funnel, first = heapq.heappop(queue)
+        if bound >= kth():
+            break
+        ids, funnel_points, apex = funnel
+        tri = triangles[t].tolist()
+        i = neighbors[t].tolist().index(previous)
+        w = tri[(i + 2) % 3]
+        pw = tuple(vertices[w].tolist())
+        j = tangent(funnel, pw)
+        d = (0.0 if ids[j] == SOURCE else distance[ids[j]]) + hypot(pw[0] - funnel_points[j][0],
+                                                                    pw[1] - funnel_points[j][1])
+        distance[w] = min(d, distance.get(w, np.inf))
+
+        for c in candidates.in_triangle(t):
+            if straight[c] >= kth():
+                reached.add(c)
+                continue
+            q = tuple(points[c].tolist())
+            m = tangent(funnel, q)
+            reach(c, (0.0 if ids[m] == SOURCE else distance[ids[m]]) + hypot(q[0] - funnel_points[m][0],
+                                                                             q[1] - funnel_points[m][1]))
+
+        # The funnels of the two other edges of t, split at the parent of w.
+        for n, child in ((int(neighbors[t, (i + 2) % 3]), (ids[:j + 1] + [w], funnel_points[:j + 1] + [pw], min(j, apex))),
+                         (int(neighbors[t, (i + 1) % 3]), ([w] + ids[j:], [pw] + funnel_points[j:], max(j, apex) - j + 1))):
+            if n < 0 or (entered := walk_cycle(cycle, first, n)) == CLOSED:
+                continue
+            heapq.heappush(queue, (max(bound, edge_bound(child, distance)), n, t, child, entered))
+
+    return [(-c, -d) for d, c in sorted(best, reverse=True)]
+
+
+def _clip(polygon: list[Coordinate], a: Coordinate, b: Coordinate, side: int) -> list[Coordinate]:
+    """The part of a convex polygon on one side of the line a->b: where side * cross(a, b, q) >= 0."""
+    clipped = []
+    for p, q in zip(polygon, polygon[1:] + polygon[:1]):
+        cp, cq = side * cross(a, b, p), side * cross(a, b, q)
+        if cp >= 0:
+            clipped.append(p)
+        if cp * cq < 0:
+            s = cp / (cp - cq)
+            clipped.append((p[0] + s * (q[0] - p[0]), p[1] + s * (q[1] - p[1])))
+    return clipped
+
+
+def _area(polygon: list[Coordinate]) -> float:
+    """Twice the signed area of a polygon, 0 below three vertices."""
+    if len(polygon) < 3:
+        return 0.0
+    return sum(cross(polygon[0], a, b) for a, b in zip(polygon[1:], polygon[2:]))
+
+
+def _clip_disk(polygon: list[Coordinate], center: Coordinate, radius: float, segments: int) -> list[Coordinate]:
+    """
+        A counter-clockwise convex polygon clipped to a disk: its vertices inside the disk,
+        the points where its edges cross the circle and, from every exit to the next entry,
+        the arc between them drawn with 'segments' chords per full circle.
+    """
+    cx, cy = center
+    if all(hypot(x - cx, y - cy) <= radius for x, y in polygon):
+        return polygon
+    step = 2 * pi / segments
+
+    def at(angle: float) -> Coordinate:
+        return cx + radius * cos(angle), cy + radius * sin(angle)
+
+    # The boundary of the result, and where it leaves the circle: (point, angle entering at, angle leaving at).
+    events: list[tuple[Coordinate, Optional[float], Optional[float]]] = []
+    for p, q in zip(polygon, polygon[1:] + polygon[:1]):
+        inside = hypot(p[0] - cx, p[1] - cy) <= radius
+        if inside:
+            events.append((p, None, None))
+        dx, dy, fx, fy = q[0] - p[0], q[1] - p[1], p[0] - cx, p[1] - cy
+        a, b, c = dx * dx + dy * dy, 2 * (fx * dx + fy * dy), fx * fx + fy * fy - radius * radius
+        if a == 0 or (discriminant := b * b - 4 * a * c) <= 0:
+            continue
+        root = discriminant ** 0.5
+        for s in sorted(((-b - root) / (2 * a), (-b + root) / (2 * a))):
+            if 0 < s < 1:
+                x, y = p[0] + s * dx, p[1] + s * dy
+                angle = atan2(y - cy, x - cx)
+                events.append(((x, y), None, angle) if inside else ((x, y), angle, None))
+                inside = not inside
+
+    if not events:
+        # The circle is inside the polygon, or misses it.
+        if all(cross(a, b, center) >= 0 for a, b in zip(polygon, polygon[1:] + polygon[:1])):
+            return [at(k * step) for k in range(segments)]
+        return []
+
+    clipped = []
+    for k, (point, _, leaving) in enumerate(events):
+        clipped.append(point)
+        if leaving is not None and (entering := events[(k + 1) % len(events)][1]) is not None:
+            sweep = (entering - leaving) % (2 * pi)
+            count = ceil(sweep / step)
+            clipped.extend(at(leaving + sweep * i / count) for i in range(1, count))
+    return clipped
+
+
+def _reachable_parts(corners: list[Coordinate], funnel: Funnel, distance: dict[int, float], budget: float,
+                     segments: int) -> list[list[Coordinate]]:
+    """
+        The parts of a triangle within 'budget' of the source, entered through the edge of a
+        funnel: for every funnel vertex, the triangle cut down to the points whose path
+        bends around it last (see `tangent`) and to the disk of the budget left there.
+    """
+    ids, points, apex = funnel
+    last = len(points) - 1
+    parts = []
+    for j, (v, center) in enumerate(zip(ids, points)):
+        left = budget - (0.0 if v == SOURCE else distance[v])
+        if left <= 0:
+            continue
+        part = corners
+        if j < apex:
+            part = _clip(part, points[j + 1], center, 1)
+        elif j > apex:
+            part = _clip(part, points[j - 1], center, -1)
+        if j > 0 and j <= apex:
+            part = _clip(part, center, points[j - 1], -1)
+        if j < last and j >= apex:
+            part = _clip(part, center, points[j + 1], 1)
+        if len(part) >= 3:
+            parts.append(_clip_disk(part, center, left, segments))
+    return parts
+
+
+def reachable_within(index: FlatIndex, point: tuple[float, float], max_distance: float,
+                     segments: int = 32) -> tuple[list[int], list[list[Coordinate]]]:
+    """
+        The part of the polygon of a point within a geodesic distance of it. Funnels are
+        split from the point as in `funnels`, but only into the triangles whose entry edge
+        may be within the distance (see `edge_bound`): the work grows with the area
+        reached, not with the polygon.
+
+        The geodesic distance is convex along segments inside a simple polygon, so a
+        triangle whose corners are all within the distance is reached whole. The others, and
+        all of them around a hole, where a triangle is entered once per way round, are cut
+        into the parts whose paths bend last around the same funnel vertex, each clipped to
+        a disk around that vertex; arcs are drawn with 'segments' segments per full circle,
+        from inside.
+
+        Returns: the triangles reached, and the counter-clockwise convex parts of them
+        within the distance (whole triangles included; around a hole, the parts of a
+        triangle reached both ways round may overlap), empty if the point is outside
+        every polygon
+    """
+    x, y = float(point[0]), float(point[1])
+    if max_distance < 0 or (t0 := index.locate(x, y)) < 0:
+        return [], []
+    vertices, triangles, neighbors = index.vertices, index.triangles, index.neighbors
+    source = (x, y)
+
+    corners = triangles[t0].tolist()
+    distance = {c: hypot(vertices[c, 0] - x, vertices[c, 1] - y) for c in corners}
+    reached = [t0]
+    parts = [_clip_disk([tuple(p) for p in vertices[corners].tolist()], source, max_distance, segments)]
+    cycle = hole_cycle(index, t0)
+    start = walk_cycle(cycle, -1, t0)
+    stack = []
+    for e in range(3):
+        if (n := int(neighbors[t0, e])) >= 0 and (first := walk_cycle(cycle, start, n)) != CLOSED:
+            left, right = corners[(e + 1) % 3], corners[e]
+            funnel = ([left, SOURCE, right], [tuple(vertices[left].tolist()), source, tuple(vertices[right].tolist())], 1)
+            if edge_bound(funnel, distance) <= max_distance:
+                stack.append((n, t0, funnel, first))
+
+    while stack:
+        t, previous, funnel, first = stack.pop()
+        ids, funnel_points, apex = funnel
+        tri = triangles[t].tolist()
+        i = neighbors[t].tolist().index(previous)
+        w = tri[(i + 2) % 3]
+        pw = tuple(vertices[w].tolist())
+        j = tangent(funnel, pw)
+        d = (0.0 if ids[j] == SOURCE else distance[ids[j]]) + hypot(pw[0] - funnel_points[j][0],
+                                                                    pw[1] - funnel_points[j][1])
+        distance[w] = min(d, distance.get(w, np.inf))
+        reached.append(t)
+        corners = [tuple(p) for p in vertices[tri].tolist()]
+        # Around a hole the corners may be closest the two ways round, and the points
+        # between them farther than both.
+        if cycle is None and all(distance[c] <= max_distance for c in tri):
+            parts.append(corners)
+        else:
+            parts.extend(_reachable_parts(corners, funnel, distance, max_distance, segments))
+
+        # The funnels of the two other edges of t, split at the parent of w.
+        for n, child in ((int(neighbors[t, (i + 2) % 3]), (ids[:j + 1] + [w], funnel_points[:j + 1] + [pw], min(j, apex))),
+                         (int(neighbors[t, (i + 1) % 3]), ([w] + ids[j:], [pw] + funnel_points[j:], max(j, apex) - j + 1))):
+            if n < 0 or (entered := walk_cycle(cycle, first, n)) == CLOSED:
+                continue
+            if edge_bound(child, distance) <= max_distance:
+                stack.append((n, t, child, entered))
+
+    return list(dict.fromkeys(reached)), [part for part in parts if _area(part) > 0]
@@ -0,0 +1,104 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Generic, Iterator, Optional, TypeVar
+
+T = TypeVar('T')
+
+
+class IndexVersion(Generic[T]):
+    """One version of an index: its number, the index itself and the queries still using it."""
+
+    def __init__(self, number: int, value: T):
+        self.number = number
+        self.value = value
+        self.refs = 0
+        self.retired = False
+        self.drained = threading.Event()
+
+
+class VersionedIndex(Generic[T]):
+    """
+        A handle to the current version of an index (a locator, a FlatIndex, a SharedIndex...).
+        Queries acquire the version that is current when they start and keep using it until
+        they release it, however many swaps happen in between. A swap replaces the current
+        version atomically; the replaced one is retired and passed to 'release' (e.g. to
+        unlink its shared memory) once its last query is done.
+    """
+
+    def __init__(self, value: T, release: Optional[Callable[[T], None]] = None):
+        self._release = release
+        self._lock = threading.Lock()
+        self._current = IndexVersion(1, value)
+        self._builder: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def current(self) -> IndexVersion[T]:
+        return self._current
+
+    @property
+    def version(self) -> int:
+        return self._current.number
+
+    def acquire(self) -> IndexVersion[T]:
+        """Returns the current version, kept alive until `release`."""
+        with self._lock:
+            version = self._current
+            version.refs += 1
+            return version
+
+    def release(self, version: IndexVersion[T]):
+        with self._lock:
+            version.refs -= 1
+            drained = version.retired and version.refs == 0
+        if drained:
+            self._free(version)
+
+    @contextmanager
+    def use(self) -> Iterator[T]:
+        """Context manager over the current index, for the duration of one query or batch."""
+        version = self.acquire()
+        try:
+            yield version.value
+        finally:
+            self.release(version)
+
+    def swap(self, value: T) -> IndexVersion[T]:
+        """Makes value the current index. Queries already running finish on the previous one."""
+        with self._lock:
+            previous = self._current
+            self._current = IndexVersion(previous.number + 1, value)
+            previous.retired = True
+            drained = previous.refs == 0
+        if drained:
+            self._free(previous)
+        return self._current
+
+    def reload(self, build: Callable[[], T]) -> Future:
+        """
+            Builds (or loads) a new index in a background thread and swaps it in once it is
+            ready, queries keep going on the current one meanwhile. Reloads run one at a time.
+
+            Returns: a future of the new IndexVersion
+        """
+        with self._lock:
+            if self._builder is None:
+                self._builder = ThreadPoolExecutor(max_workers=1, thread_name_prefix='index-reload')
+        return self._builder.submit(lambda: self.swap(build()))
+
+    def _free(self, version: IndexVersion[T]):
+        if self._release is not None:
+            self._release(version.value)
+        version.value = None
+        version.drained.set()
+
+    def close(self):
+        """Retires the current version, freed once its queries are done."""
+        if self._builder is not None:
+            self._builder.shutdown()
+        with self._lock:
+            version = self._current
+            version.retired = True
+            drained = version.refs == 0
+        if drained:
+            self._free(version)
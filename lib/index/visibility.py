@@ -0,0 +1,228 @@
+import heapq
+from math import hypot, inf
+from typing import Optional
+
+import numpy as np
+
+from lib.index.flat import FlatIndex
+from lib.path_finding.funnel import Coordinate, cross, to_ragged, to_xy
+
+# An edge to cross while looking for the vertices seen from a source: (triangle entered,
+# triangle it is entered from, left limit, right limit), the limits bounding the cone the source
+# sees through the edge.
+Opening = tuple[int, int, Coordinate, Coordinate]
+
+
+def _visible(points: list[Coordinate], triangles: list[list[int]], neighbors: list[list[int]], source: Coordinate,
+             openings: list[Opening], target: Optional[tuple[int, Coordinate]] = None) -> tuple[list[int], bool]:
+    """
+        The vertices seen from a source across the given edges, found by narrowing the cone
+        of every edge over the triangles behind it; only the triangles the source sees into
+        are entered. With a target (triangle, point), also whether the source sees it.
+
+        Returns: the vertex ids seen (the ends of the opening edges excluded), and whether the
+        source sees the target
+    """
+    sx, sy = source
+    seen, sees_target = [], False
+    stack = list(openings)
+    while stack:
+        t, previous, left, right = stack.pop()
+        (lx, ly), (rx, ry) = left, right
+        tri, adjacent = triangles[t], neighbors[t]
+        i = adjacent.index(previous)
+        if target is not None and t == target[0]:
+            sees_target = sees_target or (cross(source, left, target[1]) <= 0 <= cross(source, right, target[1]))
+
+        w = tri[(i + 2) % 3]
+        pw = points[w]
+        beyond_left = (lx - sx) * (pw[1] - sy) - (ly - sy) * (pw[0] - sx) > 0
+        beyond_right = (rx - sx) * (pw[1] - sy) - (ry - sy) * (pw[0] - sx) < 0
+        if not beyond_left and not beyond_right:
+            seen.append(w)
+        # The edge from the left end to w, then the one from w to the right end.
+        if (n := adjacent[(i + 2) % 3]) >= 0 and not beyond_left:
+            stack.append((n, t, left, right if beyond_right else pw))
+        if (n := adjacent[(i + 1) % 3]) >= 0 and not beyond_right:
+            stack.append((n, t, left if beyond_left else pw, right))
+    return seen, sees_target
+
+
+def _taut(point: Coordinate, previous: Coordinate, following: Coordinate, other: Coordinate) -> bool:
+    """Whether the line from a boundary vertex to another point leaves both its boundary neighbors on one side."""
+    return cross(point, other, previous) * cross(point, other, following) >= 0
+
+
+class VisibilityIndex:
+    """
+        Shortest paths over the visibility graph of the reflex vertices of every polygon.
+
+        A shortest path only bends at reflex vertices (those with an interior angle over
+        180 degrees), and only along lines leaving both boundary neighbors of the vertex
+        on one side. The edges between the reflex vertices that see each other and pass
+        that test at both ends are found once, from the triangulation (see `_visible`),
+        and stored in CSR arrays. A query looks for the reflex vertices each point sees,
+        or for the other point, in the triangles around it, then runs A* over the graph
+        with the straight line distance to the end as heuristic.
+
+        Preprocessing grows with the number of reflex vertices times the part of the
+        polygon each one sees; queries no longer depend on the number of triangles
+        between the points, but on how much of the graph A* explores.
+
+        node_keys -- (R,) int64, polygon * V + vertex of every reflex vertex, sorted
+        node_vertex -- (R,) int32, the vertex of every node
+        node_sides -- (R, 2) int32, the previous and next vertex along the boundary of every node
+        edge_offsets -- (R + 1,) int64, the edges of node k are edge_targets[edge_offsets[k]:edge_offsets[k + 1]]
+        edge_targets -- (E,) int32, node indices
+        edge_lengths -- (E,) float64
+
+        Queries read Python list copies of the triangulation and of the graph.
+    """
+
+    def __init__(self, index: FlatIndex):
+        self.index = index
+        vertices, triangles, neighbors, polygon = index.vertices, index.triangles, index.neighbors, index.polygon
+        count = len(vertices)
+        self._points = [tuple(p) for p in vertices.tolist()]
+        self._triangles, self._neighbors = triangles.tolist(), neighbors.tolist()
+        points = self._points
+
+        # Boundary edges run counter-clockwise around the interior, holes included.
+        t, e = np.nonzero(neighbors < 0)
+        a, b = triangles[t, e].astype(np.int64), triangles[t, (e + 1) % 3].astype(np.int64)
+        keys = polygon[t].astype(np.int64) * count
+        following = dict(zip((keys + a).tolist(), b.tolist()))
+        preceding = dict(zip((keys + b).tolist(), a.tolist()))
+        nodes = sorted((key, v, preceding[key], following[key]) for key, v in zip((keys + a).tolist(), a.tolist())
+                       if cross(points[preceding[key]], points[v], points[following[key]]) < 0)
+        self.node_keys = np.array([k for k, _, _, _ in nodes], dtype=np.int64)
+        self.node_vertex = np.array([v for _, v, _, _ in nodes], dtype=np.int32)
+        self.node_sides = np.array([(p, n) for _, _, p, n in nodes], dtype=np.int32).reshape(-1, 2)
+        self._node_of = {key: k for k, (key, _, _, _) in enumerate(nodes)}
+        self._node_points = [points[v] for _, v, _, _ in nodes]
+        self._node_sides = [(points[p], points[n]) for _, _, p, n in nodes]
+
+        # The triangles around every reflex vertex.
+        fans: dict[int, list[tuple[int, int]]] = {}
+        for t, (tri, p) in enumerate(zip(self._triangles, polygon.tolist())):
+            for c, v in enumerate(tri):
+                if (k := self._node_of.get(p * count + v)) is not None:
+                    fans.setdefault(k, []).append((t, c))
+
+        targets, lengths, sizes = [], [], []
+        for k, (key, v, _, _) in enumerate(nodes):
+            openings, seen = [], []
+            for t, c in fans[k]:
+                tri = self._triangles[t]
+                left, right = tri[(c + 2) % 3], tri[(c + 1) % 3]
+                seen.extend((left, right))
+                if (n := self._neighbors[t][(c + 1) % 3]) >= 0:
+                    openings.append((n, t, points[left], points[right]))
+            seen.extend(_visible(points, self._triangles, self._neighbors, points[v], openings)[0])
+            edges = self._taut_nodes(k, key - v, points[v], set(seen) - {v})
+            targets.extend(m for m, _ in edges)
+            lengths.extend(d for _, d in edges)
+            sizes.append(len(edges))
+        self.edge_offsets = np.concatenate(([0], np.cumsum(sizes, dtype=np.int64)))
+        self.edge_targets = np.array(targets, dtype=np.int32)
+        self.edge_lengths = np.array(lengths, dtype=np.float64)
+        bounds = self.edge_offsets.tolist()
+        self._edges = [list(zip(targets[a:b], lengths[a:b])) for a, b in zip(bounds, bounds[1:])]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.node_keys, self.node_vertex, self.node_sides,
+                                      self.edge_offsets, self.edge_targets, self.edge_lengths))
+
+    def _taut_nodes(self, node: int, base: int, point: Coordinate, seen: set[int]) -> list[tuple[int, float]]:
+        """
+            The reflex vertices among those seen from a point (of polygon base / V) a path
+            through the point can bend around, with their distance. With a node, the point
+            is that reflex vertex and the line must also pass the test at it.
+        """
+        node_of, node_points, node_sides = self._node_of, self._node_points, self._node_sides
+        taut = []
+        for v in seen:
+            if (m := node_of.get(base + v)) is None:
+                continue
+            other = node_points[m]
+            if not _taut(other, *node_sides[m], point):
+                continue
+            if node >= 0 and not _taut(point, *node_sides[node], other):
+                continue
+            taut.append((m, hypot(other[0] - point[0], other[1] - point[1])))
+        return taut
+
+    def _from_point(self, point: Coordinate, t: int,
+                    target: Optional[tuple[int, Coordinate]] = None) -> tuple[list[tuple[int, float]], bool]:
+        """The taut reflex vertices a point of triangle t sees, and whether it sees the target."""
+        if target is not None and target[0] == t:
+            return [], True
+        points, tri = self._points, self._triangles[t]
+        openings = [(n, t, points[tri[(e + 1) % 3]], points[tri[e]]) for e, n in enumerate(self._neighbors[t]) if n >= 0]
+        seen, sees_target = _visible(points, self._triangles, self._neighbors, point, openings, target)
+        if sees_target:
+            return [], True
+        base = int(self.index.polygon[t]) * len(points)
+        return self._taut_nodes(-1, base, point, set(seen) | set(tri)), False
+
+    def _path(self, start: Coordinate, end: Coordinate, t1: int, t2: int) -> Optional[dict]:
+        first, straight = self._from_point(start, t1, (t2, end))
+        if straight:
+            return to_xy([start, end])
+        last = dict(self._from_point(end, t2)[0])
+        node_points, edges = self._node_points, self._edges
+        ex, ey = end
+
+        # A* from the start, the end being node -1.
+        distance, parent, done, heap = {}, {}, set(), []
+        for m, d in first:
+            distance[m], parent[m] = d, None
+            x, y = node_points[m]
+            heapq.heappush(heap, (d + hypot(ex - x, ey - y), d, m))
+        while heap:
+            _, d, m = heapq.heappop(heap)
+            if m == -1:
+                break
+            if m in done:
+                continue
+            done.add(m)
+            if m in last and d + last[m] < distance.get(-1, inf):
+                distance[-1], parent[-1] = d + last[m], m
+                heapq.heappush(heap, (distance[-1], distance[-1], -1))
+            for n, length in edges[m]:
+                if n not in done and (nd := d + length) < distance.get(n, inf):
+                    distance[n], parent[n] = nd, m
+                    x, y = node_points[n]
+                    heapq.heappush(heap, (nd + hypot(ex - x, ey - y), nd, n))
+        if -1 not in parent:
+            return None
+        path, m = [end], parent[-1]
+        while m is not None:
+            path.append(node_points[m])
+            m = parent[m]
+        path.append(start)
+        return to_xy(path[::-1])
+
+    def shortest_path(self, start: tuple[float, float], end: tuple[float, float]) -> Optional[dict]:
+        """Finds the shortest path between two points, None if they are not in the same polygon."""
+        index = self.index
+        if (t1 := index.locate(*start)) < 0 or (t2 := index.locate(*end)) < 0:
+            return None
+        if index.polygon[t1] != index.polygon[t2]:
+            return None
+        return self._path(tuple(start), tuple(end), t1, t2)
+
+    def shortest_paths(self, starts: np.ndarray, ends: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """`shortest_path` for (N, 2) arrays of points, as a ragged array (see `FlatIndex.shortest_paths`)."""
+        index = self.index
+        starts = np.asarray(starts, dtype=np.float64).reshape(-1, 2)
+        ends = np.asarray(ends, dtype=np.float64).reshape(-1, 2)
+        t1, t2 = index.locate_many(starts), index.locate_many(ends)
+        paths: list[Optional[dict]] = []
+        for start, end, a, b in zip(starts.tolist(), ends.tolist(), t1.tolist(), t2.tolist()):
+            if a < 0 or b < 0 or index.polygon[a] != index.polygon[b]:
+                paths.append(None)
+                continue
+            paths.append(self._path(tuple(start), tuple(end), a, b))
+        return to_ragged(paths)
@@ -0,0 +1,31 @@
+import time
+from typing import Optional
+
+
+class QueryCancelled(Exception):
+    """Raised at a checkpoint of a cancelled or expired computation."""
+    pass
+
+
+class CancellationToken:
+    """
+        Cooperative cancellation for long running searches. The owner calls `cancel` (or lets
+        the deadline pass) and the computation stops with QueryCancelled the next time it
+        calls `check`.
+    """
+
+    def __init__(self, timeout: Optional[float] = None):
+        self.deadline = None if timeout is None else time.monotonic() + timeout
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled or (self.deadline is not None and time.monotonic() >= self.deadline)
+
+    def check(self):
+        """Raises QueryCancelled if the computation should stop."""
+        if self.cancelled:
+            raise QueryCancelled("The query was cancelled or exceeded its deadline.")
@@ -0,0 +1,149 @@
+from typing import Optional
+
+import numpy as np
+
+
+class DualTree:
+    """
+        The dual graph of a triangulation (a node per triangle, an arc per shared edge)
+        rooted at the first triangle of every connected part. The triangulation of a
+        polygon without holes has a tree as its dual, so the corridor between two of its
+        triangles is unique: up from the first to their lowest common ancestor, then down
+        to the second. The lowest common ancestor is the shallowest triangle between their
+        first visits of an Euler tour, read from a sparse table of its minima in O(1), and
+        `corridor` costs O(corridor length) whatever the size of the triangulation.
+
+        Parts whose dual has a cycle (a polygon with a hole) still get a spanning tree, but
+        its corridor is only one of those between two triangles, see `covers` and `corridors`.
+
+        parent -- (T,) int32, the neighbor towards the root, -1 for the roots
+        depth -- (T,) int32, the number of triangles crossed from the root
+        component -- (T,) int32, the connected part of every triangle
+        acyclic -- (C,) bool, whether the dual of every part is a tree
+        chords -- (K, 2) int32, the arcs left out of the tree, each closing a cycle of the dual
+        holes -- (C,) int32, the number of chords of every part, one per hole of its polygon
+        cycle -- (T,) bool, whether every triangle is on the cycle a chord closes
+        first -- (T,) int32, the first position of every triangle in the Euler tour
+        table -- int32 arrays, level k holds the shallowest triangle of the 2 ** k positions
+                 of the Euler tour (2T - C long) starting at each position
+    """
+
+    def __init__(self, neighbors: np.ndarray):
+        """
+            Arguments:
+            neighbors -- (T, 3) the triangle across every edge, -1 on the boundary
+        """
+        adjacent = np.asarray(neighbors).tolist()
+        count = len(adjacent)
+        parent, depth, component, first = [-1] * count, [0] * count, [-1] * count, [0] * count
+        acyclic, tour, chords = [], [], []
+        next_edge = [0] * count
+        for root in range(count):
+            if component[root] >= 0:
+                continue
+            c = len(acyclic)
+            acyclic.append(True)
+            component[root] = c
+            first[root] = len(tour)
+            tour.append(root)
+            # Depth first, every triangle is written to the tour on the way down and again
+            # after each of its children.
+            stack = [root]
+            while stack:
+                t = stack[-1]
+                if (e := next_edge[t]) == 3:
+                    stack.pop()
+                    if stack:
+                        tour.append(stack[-1])
+                    continue
+                next_edge[t] = e + 1
+                if (u := adjacent[t][e]) < 0 or u == parent[t]:
+                    continue
+                if component[u] >= 0:
+                    acyclic[c] = False
+                    # Seen from both of its ends, kept from the one reached first.
+                    if first[u] > first[t]:
+                        chords.append((t, u))
+                    continue
+                component[u], parent[u], depth[u] = c, t, depth[t] + 1
+                first[u] = len(tour)
+                tour.append(u)
+                stack.append(u)
+
+        self.parent = np.array(parent, dtype=np.int32)
+        self.depth = np.array(depth, dtype=np.int32)
+        self.component = np.array(component, dtype=np.int32)
+        self.acyclic = np.array(acyclic, dtype=bool)
+        self.chords = np.array(chords, dtype=np.int32).reshape(-1, 2)
+        self.first = np.array(first, dtype=np.int32)
+
+        level = np.array(tour, dtype=np.int32)
+        self.table = [level]
+        span = 1
+        while 2 * span <= len(tour):
+            a, b = level[:-span], level[span:]
+            level = np.where(self.depth[a] <= self.depth[b], a, b)
+            self.table.append(level)
+            span *= 2
+
+        self.holes = np.bincount(self.component[self.chords[:, 0]], minlength=len(acyclic)).astype(np.int32)
+        self.cycle = np.zeros(count, dtype=bool)
+        for a, b in chords:
+            self.cycle[self.corridor(a, b)] = True
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.parent, self.depth, self.component, self.acyclic, self.chords, self.holes,
+                                      self.cycle, self.first, *self.table))
+
+    def covers(self, t: int) -> bool:
+        """Whether the corridors from triangle t are those of the tree, its part having no cycle."""
+        return bool(self.acyclic[self.component[t]])
+
+    def lca(self, t1: int, t2: int) -> int:
+        """The lowest common ancestor of two triangles of the same part."""
+        l, r = int(self.first[t1]), int(self.first[t2])
+        if l > r:
+            l, r = r, l
+        k = (r - l + 1).bit_length() - 1
+        level = self.table[k]
+        a, b = int(level[l]), int(level[r - (1 << k) + 1])
+        return a if self.depth[a] <= self.depth[b] else b
+
+    def hops(self, t1: int, t2: int) -> Optional[int]:
+        """The number of edges crossed between two triangles, None if they are not connected."""
+        if self.component[t1] != self.component[t2]:
+            return None
+        return int(self.depth[t1] + self.depth[t2] - 2 * self.depth[self.lca(t1, t2)])
+
+    def corridor(self, t1: int, t2: int) -> Optional[list[int]]:
+        """The triangles from t1 to t2 along the tree, None if they are not connected."""
+        if self.component[t1] != self.component[t2]:
+            return None
+        top = self.lca(t1, t2)
+        parent = self.parent
+        up, down = [t1], [t2]
+        while up[-1] != top:
+            up.append(int(parent[up[-1]]))
+        while down[-1] != top:
+            down.append(int(parent[down[-1]]))
+        return up + down[-2::-1]
+
+    def corridors(self, t1: int, t2: int) -> list[list[int]]:
+        """
+            The corridors from t1 to t2 a shortest path may follow: the one along the tree, and
+            in a part with a cycle the one through each arc left out of the tree, when it
+            crosses no triangle twice. With a single hole these are the two ways around it.
+            Empty if the triangles are not connected.
+        """
+        if (corridor := self.corridor(t1, t2)) is None:
+            return []
+        options = [corridor]
+        if self.covers(t1):
+            return options
+        for a, b in self.chords[self.component[self.chords[:, 0]] == self.component[t1]].tolist():
+            for u, v in ((a, b), (b, a)):
+                through = self.corridor(t1, u) + self.corridor(v, t2)
+                if len(set(through)) == len(through):
+                    options.append(through)
+        return options
@@ -0,0 +1,316 @@
+from bisect import bisect_right
+from math import hypot
+from typing import Optional
+
+import numpy as np
+
+Coordinate = tuple[float, float]
+
+
+def cross(o: Coordinate, a: Coordinate, b: Coordinate) -> float:
+    """Twice the signed area of the triangle o, a, b (positive when b is left of o->a)."""
+    return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+
+# Apex checkpoint: (apex point, index of the portal the apex belongs to, index of the portal being
+# processed when it became the apex). A checkpoint depends only on the portals up to its last index:
+# IncrementalFunnel keeps the checkpoints whose portals are all kept, and resumes the funnel from the
+# last of them.
+Checkpoint = tuple[Coordinate, int, int]
+FunnelState = tuple[Coordinate, int, Coordinate, int, Coordinate, int]
+
+
+def _pull(portals: list[tuple[Coordinate, Coordinate]], i: int, state: FunnelState,
+          checkpoints: list[Checkpoint]) -> FunnelState:
+    """
+        Runs the funnel from portal i to the last one, starting from state (apex, apex index,
+        left, left index, right, right index). Appends every new apex to checkpoints and
+        returns the state after the last portal.
+    """
+    apex, apex_idx, left, left_idx, right, right_idx = state
+    while i < len(portals):
+        new_left, new_right = portals[i]
+
+        # Try to narrow the funnel from the right.
+        if cross(apex, right, new_right) >= 0:
+            if apex == right or cross(apex, left, new_right) < 0:
+                right, right_idx = new_right, i
+            else:
+                # The right side crossed over the left one, left becomes the new apex.
+                checkpoints.append((left, left_idx, i))
+                apex, apex_idx = left, left_idx
+                left = right = apex
+                left_idx = right_idx = apex_idx
+                i = apex_idx + 1
+                continue
+
+        # Try to narrow the funnel from the left.
+        if cross(apex, left, new_left) <= 0:
+            if apex == left or cross(apex, right, new_left) > 0:
+                left, left_idx = new_left, i
+            else:
+                # The left side crossed over the right one, right becomes the new apex.
+                checkpoints.append((right, right_idx, i))
+                apex, apex_idx = right, right_idx
+                left = right = apex
+                left_idx = right_idx = apex_idx
+                i = apex_idx + 1
+                continue
+
+        i += 1
+    return apex, apex_idx, left, left_idx, right, right_idx
+
+
+def _to_path(checkpoints: list[Checkpoint], end: Coordinate) -> list[Coordinate]:
+    path = []
+    for apex, _, _ in checkpoints:
+        if not path or path[-1] != apex:
+            path.append(apex)
+    if path[-1] != end:
+        path.append(end)
+    return path
+
+
+def string_pull(portals: list[tuple[Coordinate, Coordinate]], start: Coordinate, end: Coordinate) -> list[Coordinate]:
+    """
+        Funnel algorithm over a sequence of portals (the shared edges of a triangle corridor).
+
+        Arguments:
+        portals -- (left, right) endpoints of each edge crossed, as seen when walking from start to end
+        start -- the first point of the path
+        end -- the last point of the path
+
+        Returns: the vertices of the shortest path from start to end through the portals
+    """
+    portals = [(start, start)] + list(portals) + [(end, end)]
+    checkpoints = [(start, 0, 0)]
+    _pull(portals, 1, (start, 0, start, 0, start, 0), checkpoints)
+    return _to_path(checkpoints, end)
+
+
+# Rounds of `clear_string_pull` widening the margins of the portal ends the path passes too close.
+CLEAR_ROUNDS = 8
+
+
+def _tangent(a: Coordinate, side_a: int, b: Coordinate, side_b: int,
+             radius: float) -> Optional[tuple[Coordinate, Coordinate]]:
+    """
+        The segment from a to b moved to pass at the radius from both, keeping each on its
+        side of it (1 for left, -1 for right, 0 for a point it starts or ends at): the
+        tangent to their circles. None if the circles are too close for one.
+    """
+    dx, dy = b[0] - a[0], b[1] - a[1]
+    length = hypot(dx, dy)
+    if length == 0:
+        return None
+    k = (side_b - side_a) * radius / length
+    if abs(k) > 1:
+        return None
+    # The left normal of the tangent.
+    h = (1 - k * k) ** 0.5
+    nx, ny = (k * dx - h * dy) / length, (k * dy + h * dx) / length
+    return ((a[0] - side_a * radius * nx, a[1] - side_a * radius * ny),
+            (b[0] - side_b * radius * nx, b[1] - side_b * radius * ny))
+
+
+def _offset_path(path: list[Coordinate], vertex: dict[Coordinate, Coordinate],
+                 radius: float) -> Optional[list[Coordinate]]:
+    """
+        Moves the legs of a path to the tangents of the circles of the given radius around
+        the vertices it turns around, and every turn to where its two tangents meet.
+    """
+    if len(path) < 3:
+        return path
+    centers = [path[0]] + [vertex[p] for p in path[1:-1]] + [path[-1]]
+    # A vertex is on the side of the path it turns towards.
+    sides = [0] + [1 if cross(a, p, b) > 0 else -1 for a, p, b in zip(path, path[1:], path[2:])] + [0]
+    legs = []
+    for a, side_a, b, side_b in zip(centers, sides, centers[1:], sides[1:]):
+        if (leg := _tangent(a, side_a, b, side_b, radius)) is None:
+            return None
+        legs.append(leg)
+
+    turned = [path[0]]
+    for ((ax, ay), (bx, by)), ((cx, cy), (dx, dy)) in zip(legs, legs[1:]):
+        ux, uy, vx, vy = bx - ax, by - ay, dx - cx, dy - cy
+        if abs(det := ux * vy - uy * vx) <= 1e-12 * hypot(ux, uy) * hypot(vx, vy):
+            turned.append((bx, by))
+            continue
+        t = ((cx - ax) * vy - (cy - ay) * vx) / det
+        turned.append((ax + t * ux, ay + t * uy))
+    turned.append(path[-1])
+    return turned
+
+
+def clear_string_pull(portals: list[tuple[Coordinate, Coordinate]], start: Coordinate, end: Coordinate,
+                      radius: float, beside: Optional[list[list[Coordinate]]] = None) -> Optional[list[Coordinate]]:
+    """
+        `string_pull` for a disk of the given radius. Every portal is narrowed at both ends,
+        by the radius at first, and the path through them is moved out to the tangents of
+        the circles of that radius around the vertices it turns around (see `_offset_path`).
+        Where the moved path still passes closer than the radius to the end of a portal, or
+        to one of the points beside it, the portal is narrowed further on that side, by the
+        missing distance over the sine of the angle the path crosses it at, until the path
+        keeps that far from all of them.
+
+        Arguments:
+        beside -- other boundary points the path must keep the radius from, for every portal
+            the points near the part of the corridor around it
+
+        Returns: the path, or None if it still passes closer than the radius after
+        CLEAR_ROUNDS rounds. The portals must be at least twice the radius wide.
+    """
+    if radius <= 0:
+        return string_pull(portals, start, end)
+    # How far in from its left and its right end every portal is narrowed.
+    margins = [[radius, radius] for _ in portals]
+    for _ in range(CLEAR_ROUNDS):
+        narrowed, vertex, crossed_at = [], {}, {}
+        for i, ((left, right), (left_margin, right_margin)) in enumerate(zip(portals, margins)):
+            dx, dy = right[0] - left[0], right[1] - left[1]
+            width = hypot(dx, dy) or 1.0
+            fl, fr = min(0.5, left_margin / width), min(0.5, right_margin / width)
+            inner_left, inner_right = (left[0] + fl * dx, left[1] + fl * dy), (right[0] - fr * dx, right[1] - fr * dy)
+            vertex[inner_left], vertex[inner_right] = left, right
+            crossed_at[inner_left] = crossed_at[inner_right] = i
+            narrowed.append((inner_left, inner_right))
+        pulled = string_pull(narrowed, start, end)
+        # Turns at the narrowed ends of several portals of the same vertex are around that vertex once.
+        path = [pulled[0]]
+        for p in pulled[1:-1]:
+            if vertex[p] != vertex.get(path[-1]):
+                path.append(p)
+        path.append(pulled[-1])
+        if (turned := _offset_path(path, vertex, radius)) is None:
+            return None
+
+        # Portal i is crossed by the leg between the turns around it, or turned around.
+        turns = [-1] + [crossed_at[p] for p in path[1:-1]] + [len(portals)]
+        clear, widened = True, False
+        for i, (left, right) in enumerate(portals):
+            leg = bisect_right(turns, i) - 1
+            first = max(leg - 1, 0)
+            nearby = list(zip(turned[first:leg + 2], turned[first + 1:leg + 3]))
+            width = hypot(right[0] - left[0], right[1] - left[1]) or 1.0
+            # The side of the points beside the portal is the one of the path they are on.
+            for side, point in [(0, left), (1, right)] + [(-1, p) for p in (beside[i] if beside else ())]:
+                distance, (a, b) = min((segment_distance(point, a, b), (a, b)) for a, b in nearby)
+                if distance >= radius * (1 - 1e-9):
+                    continue
+                if side < 0:
+                    side = 0 if cross(a, b, point) > 0 else 1
+                clear = False
+                length = hypot(b[0] - a[0], b[1] - a[1]) or 1.0
+                sine = abs((right[0] - left[0]) * (b[1] - a[1]) - (right[1] - left[1]) * (b[0] - a[0])) / (width * length)
+                needed = min(width / 2, margins[i][side] + (radius - distance) / max(sine, 1e-9))
+                if needed > margins[i][side] * (1 + 1e-9):
+                    margins[i][side], widened = needed, True
+        if clear:
+            return turned
+        if not widened:
+            break
+    return None
+
+
+class IncrementalFunnel:
+    """
+        Funnel over a corridor that changes only at its far end. Keeps the apexes found so
+        far and the funnel state after the last portal: removing portals drops the apexes
+        they decided, adding portals resumes from the last apex left, and a new end point
+        only replays the portals after the last apex.
+    """
+
+    def __init__(self, start: Coordinate, portals: list[tuple[Coordinate, Coordinate]] = ()):
+        self.start = start
+        self.portals = [(start, start)]
+        self.checkpoints: list[Checkpoint] = [(start, 0, 0)]
+        self._state: FunnelState = (start, 0, start, 0, start, 0)
+        # The first portal the state does not include yet.
+        self._next = 1
+        self.extend(portals)
+
+    def __len__(self):
+        """The number of portals, counting the start as the first one."""
+        return len(self.portals)
+
+    def extend(self, portals: list[tuple[Coordinate, Coordinate]]):
+        self.portals.extend(portals)
+
+    def truncate(self, size: int):
+        """Keeps the first 'size' portals (the start included)."""
+        if size >= len(self.portals):
+            return
+        del self.portals[max(size, 1):]
+        checkpoints = self.checkpoints
+        popped = False
+        while len(checkpoints) > 1 and checkpoints[-1][2] >= len(self.portals):
+            checkpoints.pop()
+            popped = True
+        # The state may have been run past a removed portal, or from a removed apex.
+        if popped or self._next > len(self.portals):
+            apex, apex_idx, _ = checkpoints[-1]
+            self._state = (apex, apex_idx, apex, apex_idx, apex, apex_idx)
+            self._next = apex_idx + 1
+
+    def path(self, end: Coordinate) -> list[Coordinate]:
+        """The shortest path from the start through every portal to end."""
+        self._state = _pull(self.portals, self._next, self._state, self.checkpoints)
+        self._next = len(self.portals)
+
+        # The end point is not kept: its portal and the apexes it decides are removed again.
+        committed = len(self.checkpoints)
+        self.portals.append((end, end))
+        try:
+            _pull(self.portals, len(self.portals) - 1, self._state, self.checkpoints)
+            return _to_path(self.checkpoints, end)
+        finally:
+            self.portals.pop()
+            del self.checkpoints[committed:]
+
+
+def segment_distance(point: Coordinate, a: Coordinate, b: Coordinate) -> float:
+    """Returns the distance from a point to the segment a-b."""
+    (px, py), (ax, ay), (bx, by) = point, a, b
+    dx, dy = bx - ax, by - ay
+    length = dx * dx + dy * dy
+    s = 0.0 if length == 0 else min(1.0, max(0.0, ((px - ax) * dx + (py - ay) * dy) / length))
+    return hypot(px - ax - s * dx, py - ay - s * dy)
+
+
+def path_length(path: list[Coordinate]) -> float:
+    """Returns the length of a polyline."""
+    return sum(hypot(b[0] - a[0], b[1] - a[1]) for a, b in zip(path, path[1:]))
+
+
+def shortest_pull(options: list[list[tuple[Coordinate, Coordinate]]], start: Coordinate,
+                  end: Coordinate) -> Optional[list[Coordinate]]:
+    """The shortest of the `string_pull` paths through each list of portals, None without any."""
+    return min((string_pull(portals, start, end) for portals in options), key=path_length, default=None)
+
+
+def to_xy(path: list[Coordinate]) -> dict[str, list[float]]:
+    """Converts a list of coordinates to the {'x': [...], 'y': [...]} form used by the locators."""
+    return {'x': [p[0] for p in path], 'y': [p[1] for p in path]}
+
+
+def to_ragged(paths: list[Optional[dict]]) -> tuple[np.ndarray, np.ndarray]:
+    """
+        Packs paths in the {'x': [...], 'y': [...]} form into a ragged array.
+
+        Returns: (P, 2) float64 coordinates of every path one after the other, and (N + 1,)
+        int64 offsets: path i is coordinates[offsets[i]:offsets[i + 1]], empty where it is None
+    """
+    lengths = np.fromiter((0 if p is None else len(p['x']) for p in paths), dtype=np.int64, count=len(paths))
+    offsets = np.concatenate(([0], np.cumsum(lengths)))
+    coordinates = np.empty((int(offsets[-1]), 2))
+    found = [p for p in paths if p is not None]
+    coordinates[:, 0] = np.fromiter((x for p in found for x in p['x']), dtype=np.float64, count=len(coordinates))
+    coordinates[:, 1] = np.fromiter((y for p in found for y in p['y']), dtype=np.float64, count=len(coordinates))
+    return coordinates, offsets
+
+
+def from_ragged(coordinates: np.ndarray, offsets: np.ndarray) -> list[Optional[dict]]:
+    """Unpacks a ragged array made by `to_ragged`."""
+    xs, ys = coordinates[:, 0].tolist(), coordinates[:, 1].tolist()
+    bounds = offsets.tolist()
+    return [{'x': xs[a:b], 'y': ys[a:b]} if a < b else None for a, b in zip(bounds, bounds[1:])]
@@ -2,8 +2,15 @@ from collections import deque
 from dataclasses import dataclass
 from typing import Optional, Iterable
 
+import numpy as np
+
 from lib.point_location.geo.shapes import Point, Triangle
 from lib.point_location.geo.shapes import ccw
+from lib.path_finding.cancellation import CancellationToken
+from lib.path_finding.dual_tree import DualTree
+
+# Number of loop iterations between two cancellation checkpoints.
+CHECK_INTERVAL = 64
 
 
 def point_pair_hash(p1: Point, p2: Point):
@@ -48,6 +55,7 @@ class DCEL:
         self.triangles: dict[int, TriangleInfo] = dict()
         self.edges: dict[int, Edge] = dict()
         self._create_graph(triangles)
+        self._root()
         return
 
     def _create_graph(self, triangles: Iterable[Triangle]):
@@ -67,32 +75,66 @@ class DCEL:
             self.triangles[this_triangle_hash] = TriangleInfo(t, edges, neighbors)
         return
 
-    def bfs(self, p1_triangle: Triangle, p2_triangle: Triangle) -> list[int]:
+    def _root(self):
+        """Numbers the triangles and roots their dual graph, see `DualTree`."""
+        self.hashes = list(self.triangles)
+        self.numbers = {h: i for i, h in enumerate(self.hashes)}
+        neighbors = np.full((len(self.hashes), 3), -1, dtype=np.int32)
+        for i, h in enumerate(self.hashes):
+            adjacent = [self.numbers[n] for n in self.triangles[h].neighbors]
+            neighbors[i, :len(adjacent)] = adjacent
+        self.tree = DualTree(neighbors)
+
+    def corridor(self, p1_triangle: Triangle, p2_triangle: Triangle, cancel: CancellationToken = None) -> Optional[list[int]]:
+        """
+        The hashes of the triangles from p1 to p2, read from the dual tree in O(corridor length)
+        when their part of the triangulation has no hole, by `bfs` otherwise.
+        """
+        t1, t2 = self.numbers[hash(p1_triangle)], self.numbers[hash(p2_triangle)]
+        if not self.tree.covers(t1):
+            return self.bfs(p1_triangle, p2_triangle, cancel)
+        if (corridor := self.tree.corridor(t1, t2)) is None:
+            return None
+        return [self.hashes[t] for t in corridor]
+
+    def corridors(self, p1_triangle: Triangle, p2_triangle: Triangle) -> list[list[int]]:
+        """
+        The hashes of the triangles of every corridor from p1 to p2 a shortest path may follow:
+        the one of the dual tree, and around a hole the other way too (see `DualTree.corridors`).
+        """
+        t1, t2 = self.numbers[hash(p1_triangle)], self.numbers[hash(p2_triangle)]
+        return [[self.hashes[t] for t in corridor] for corridor in self.tree.corridors(t1, t2)]
+
+    def bfs(self, p1_triangle: Triangle, p2_triangle: Triangle, cancel: CancellationToken = None) -> list[int]:
         """
         Breadth First Search in order to find the shortest path from triangle p1 to p2.
         Returns a list of the hashes of the triangles of the path.
+        Stops with QueryCancelled once the cancel token is triggered.
         """
         p1_hash = hash(p1_triangle)
         p2_hash = hash(p2_triangle)
 
         graph = self.triangles
-        visited = [p1_hash]
-        queue = [p1_hash]
+        queue = deque((p1_hash,))
 
         traversal = {p1_hash: None}
 
+        iterations = 0
         while queue:
-            s = queue.pop(0)
+            s = queue.popleft()
             # print('current triangle hash:', s)
 
+            iterations += 1
+            if cancel is not None and iterations % CHECK_INTERVAL == 0:
+                cancel.check()
+
             # Reached the destination, retrieve the path.
             if s == p2_hash:
                 return retrieve_path(traversal, s)
 
             for neighbour in graph[s].neighbors:
-                if neighbour not in visited:
+                if neighbour not in traversal:
                     traversal[neighbour] = s
-                    visited.append(neighbour)
                     queue.append(neighbour)
 
     def presentable_form(self, triangle_hashes: list[int]):
@@ -105,7 +147,7 @@ class DCEL:
     def retrieve_triangles(self, triangle_hashes):
         return [self.triangles[h].triangle for h in triangle_hashes]
 
-    def funnel(self, triangle_hashes: list[int], start: Point, end: Point):
+    def funnel(self, triangle_hashes: list[int], start: Point, end: Point, cancel: CancellationToken = None):
         """
         Uses the funnel algorithm to get the shortest line that passes through the triangles
         given in the triangle_hashes
@@ -123,7 +165,7 @@ class DCEL:
             passthrough_edges.append({'x': [e.p1.x, e.p2.x], 'y': [e.p1.y, e.p2.y]})
         
         if not passthrough_edges:
-            return {'x': [start.x, end.x], 'y': [start.y, end.y]}
+            return passthrough_edges, {'x': [start.x, end.x], 'y': [start.y, end.y]}
 
         # First edge tunes the topology of the points
         pl, pr = edges[0].p1, edges[0].p2
@@ -159,10 +201,10 @@ class DCEL:
 
             return {'x': [p.x for p in tail], 'y': [p.y for p in tail]}
 
-        print("\noperation 0")
-
         # Each subsequent edge will have a common point
-        for edge in edges:
+        for edge_idx, edge in enumerate(edges):
+            if cancel is not None and edge_idx % CHECK_INTERVAL == 0:
+                cancel.check()
 
             # Get the points of the last edge.
             last_points = [prev_edge.p1, prev_edge.p2]
@@ -187,18 +229,13 @@ class DCEL:
                 # is the left and the free point is the right.
 
                 if bound_point == tail[-1]:
-                    print("op[right]: tail=left_bound")
-
                     # Remove all other points since their fluctuations
                     # do not contribute to the final path.
                     right.clear()
                 elif right[0] == tail[-1]:
-                    print("op[right]: tail=right_last")
                     right.popleft()
                 elif not ccw(left[0], tail[-1], free_point):
                     # Left is on the right of right.
-                    print("op[right]: crossing")
-
                     # Progressively remove items from left and add them to tail
                     # until there is no more crossing of right to left.
                     last_left_point = None
@@ -214,11 +251,9 @@ class DCEL:
                 elif not ccw(tail[-1], right[-1], free_point):
                     # In the right, the new point does not narrow the path,
                     # but instead changes the direction (widening).
-                    print("op[right]: widening")
+                    pass
                 else:
                     # The next right point narrows the path (no violation).
-                    print("op[right]: narrowing")
-
                     # Remove all the right points until there is widening.
                     # This means that the last right point is potentially a tail point.
                     # while right and not ccw(right[-1], tail[-1], free_point):
@@ -231,18 +266,13 @@ class DCEL:
                 # The common point between this and the last edges
                 # is the right and the free point is the left.
                 if bound_point == tail[-1]:
-                    print("op[left]: tail=right_bound (narrowing)")
-
                     # Remove all other points since their fluctuations
                     # do not contribute to the final path.
                     left.clear()
                 elif left[0] == tail[-1]:
-                    print("op[left]: tail=left_last")
                     left.popleft()
                 elif not ccw(free_point, tail[-1], left[0]):
                     # The right is on the left of left.
-                    print("op[left]: crossing")
-
                     # Progressively remove items from left and add them to tail
                     # until there is no more crossing of right to left.
                     last_right_point = None
@@ -258,11 +288,9 @@ class DCEL:
                 elif ccw(tail[-1], left[-1], free_point):
                     # In the right, the new point does not narrow the path,
                     # but instead changes the direction (widening).
-                    print("op[left]: widening")
+                    pass
                 else:
                     # The next left point narrows the path (no violation).
-                    print("op[left]: narrowing")
-
                     # Remove all the left points until there is widening.
                     # This means that the last right point is potentially a tail point.
                     # while left and not ccw(free_point, tail[-1], left[-1]):
@@ -1,8 +1,19 @@
+from typing import TYPE_CHECKING
+
+import numpy as np
+
 from . import spatial
-import matplotlib.pyplot as plt
+from .shapes import Shape2d
+
+# matplotlib is only imported when something is drawn, importing the geometry modules stays cheap.
+if TYPE_CHECKING:
+    from matplotlib.axes import Axes
+    from matplotlib.lines import Line2D
 
 
 def plot_points(points, style='bo'):
+    import matplotlib.pyplot as plt
+
     if not type(points) == list:
         points = [points]
 
@@ -11,6 +22,8 @@ def plot_points(points, style='bo'):
 
 
 def show_points(points, style='bo'):
+    import matplotlib.pyplot as plt
+
     plot_points(points, style=style)
     plt.show()
 
@@ -24,5 +37,75 @@ def plot(polygons, style='g-'):
 
 
 def show(polygons, style='g-'):
+    import matplotlib.pyplot as plt
+
     plot(polygons, style=style)
     plt.show()
+
+
+class OutlineCollection:
+    """
+        Draws many polygon outlines as a single LineCollection, built from their coordinate
+        arrays. Keeps the bounding box of every outline so that only the outlines
+        intersecting the current view are handed to matplotlib when the view changes.
+    """
+
+    def __init__(self, ax: 'Axes', shapes: list[Shape2d], **kwargs):
+        from matplotlib.collections import LineCollection
+
+        self.ax = ax
+        self.segments = [shape.coordinates for shape in shapes]
+        self.bounds = np.array([(s[:, 0].min(), s[:, 1].min(), s[:, 0].max(), s[:, 1].max())
+                                for s in self.segments], dtype=np.float64).reshape(-1, 4)
+
+        self.collection = LineCollection(self.segments, **kwargs)
+        ax.add_collection(self.collection)
+        if len(self.bounds):
+            ax.update_datalim([self.bounds[:, :2].min(axis=0), self.bounds[:, 2:].max(axis=0)])
+            ax.autoscale_view()
+
+        ax.callbacks.connect('xlim_changed', self.cull)
+        ax.callbacks.connect('ylim_changed', self.cull)
+
+    def visible(self, x_min: float, x_max: float, y_min: float, y_max: float) -> np.ndarray:
+        """Returns the indexes of the outlines whose bounding box intersects the given box."""
+        b = self.bounds
+        return np.flatnonzero((b[:, 0] <= x_max) & (b[:, 2] >= x_min) & (b[:, 1] <= y_max) & (b[:, 3] >= y_min))
+
+    def cull(self, ax: 'Axes' = None):
+        """Keeps only the outlines inside the current view in the collection."""
+        (x_min, x_max), (y_min, y_max) = sorted(self.ax.get_xlim()), sorted(self.ax.get_ylim())
+        self.collection.set_segments([self.segments[i] for i in self.visible(x_min, x_max, y_min, y_max)])
+
+
+class PathBlitter:
+    """
+        Adds lines and markers to an axes without redrawing the whole figure: every new
+        artist is drawn over a cached background and only the axes area is blitted. The
+        artists then become part of the background for later updates and full redraws.
+    """
+
+    def __init__(self, ax: 'Axes'):
+        self.ax = ax
+        self.canvas = ax.figure.canvas
+        self.background = None
+        self.canvas.mpl_connect('draw_event', self._on_draw)
+
+    def _on_draw(self, _event=None):
+        self.background = self.canvas.copy_from_bbox(self.ax.bbox)
+
+    def add(self, x, y, style: str = 'g-') -> 'Line2D':
+        """Draws a new line (or markers, depending on the style) and blits it."""
+        line, = self.ax.plot(x, y, style, animated=True)
+        if self.background is None:
+            # Nothing drawn yet, the next full draw includes the line.
+            line.set_animated(False)
+            self.canvas.draw_idle()
+            return line
+
+        self.canvas.restore_region(self.background)
+        self.ax.draw_artist(line)
+        self.canvas.blit(self.ax.bbox)
+        line.set_animated(False)
+        self.background = self.canvas.copy_from_bbox(self.ax.bbox)
+        return line
@@ -1,7 +1,11 @@
+import heapq
+from itertools import count
 from random import random
-from queue import PriorityQueue
+from typing import Optional
 
-from lib.point_location.geo.shapes import Point, Polygon
+import numpy as np
+
+from lib.point_location.geo.shapes import Point, Polygon, Triangle
 from lib.point_location.geo.spatial import convex_hull
 
 
@@ -22,39 +26,26 @@ def random_convex_polygon(sample, k=None, n=3):
 
 def random_tiling(polygon: Polygon, n: int, is_concave=False) -> list[Polygon]:
     """Generates a random concave tiling of a convex region."""
-    class PolygonWithArea(object):
-
-        def __init__(self, _polygon: Polygon):
-            self.polygon = _polygon
-            self.area = _polygon.area()
-
-        def __cmp__(self, that):
-            return super().__cmp__(self.area, that.area)
-
-    # Start with initial convex region
-    initial = PolygonWithArea(polygon)
-
-    # Place in PQ to pop by area
-    pq = PriorityQueue(maxsize=n + 1)
-    pq.put(initial)
+    # Max heap on the area, the counter breaks ties without comparing polygons
+    tie_breaker = count()
+    heap = [(-polygon.area(), next(tie_breaker), polygon)]
 
     # Create some concave regions
     triangles = []
     for i in range(n):
+        if not heap:
+            break
+
         # Split up largest polygon
-        polygon = pq.get().polygon
+        _, _, polygon = heapq.heappop(heap)
 
         for polygon in polygon.split(interior=is_concave):
             if polygon.n == 3:
                 triangles.append(polygon)
             else:
-                pq.put(PolygonWithArea(polygon))
-
-    polygons = triangles
-    while pq.qsize():
-        polygons.append(pq.get().polygon)
+                heapq.heappush(heap, (-polygon.area(), next(tie_breaker), polygon))
 
-    return polygons
+    return triangles + [polygon for _, _, polygon in heap]
 
 
 def random_concave_tiling(polygon, n=10):
@@ -63,3 +54,105 @@ def random_concave_tiling(polygon, n=10):
 
 def random_convex_tiling(polygon, n=10):
     return random_tiling(polygon, n)
+
+
+def to_polygon(coordinates: np.ndarray) -> Polygon:
+    """Creates a Polygon from an (n, 2) array of coordinates."""
+    return Polygon([Point(x, y) for x, y in coordinates.tolist()])
+
+
+def _star_ring(radii: np.ndarray, rng: np.random.Generator, center: tuple[float, float],
+               jitter: float) -> np.ndarray:
+    """Places the radii at increasing, jittered angles around the center."""
+    n = len(radii)
+    angles = (np.arange(n) + rng.uniform(0, jitter, n)) * (2 * np.pi / n)
+    return np.column_stack((center[0] + radii * np.cos(angles), center[1] + radii * np.sin(angles)))
+
+
+def random_simple_polygon(n: int, seed: Optional[int] = None, radius: float = 100.0,
+                          irregularity: float = 0.5, center: tuple[float, float] = (0.0, 0.0)) -> Polygon:
+    """
+        Creates a random simple polygon with n vertices. The vertices are placed at strictly
+        increasing angles around the center, so the polygon is star shaped and never
+        self intersecting.
+
+        Arguments:
+        n -- the number of vertices
+        seed -- the seed of the random generator, the same seed gives the same polygon
+        radius -- the largest distance of a vertex from the center
+        irregularity -- in [0, 1), how much the radii may shrink towards the center
+    """
+    rng = np.random.default_rng(seed)
+    radii = radius * (1 - irregularity * rng.random(n))
+    return to_polygon(_star_ring(radii, rng, center, jitter=0.9))
+
+
+def random_polygon_with_hole(n: int, hole_n: int, seed: Optional[int] = None, radius: float = 100.0,
+                             center: tuple[float, float] = (0.0, 0.0)) -> Polygon:
+    """
+        Creates a random simple polygon with n vertices around a random hole with hole_n
+        vertices. The outer radii lie in [0.6, 1] * radius and the hole radii in
+        [0.2, 0.5] * radius, so the rings never touch. The hole is set as Polygon.hole.
+    """
+    rng = np.random.default_rng(seed)
+    outer = _star_ring(radius * rng.uniform(0.6, 1.0, n), rng, center, jitter=0.9)
+    hole = _star_ring(radius * rng.uniform(0.2, 0.5, hole_n), rng, center, jitter=0.9)
+
+    polygon = to_polygon(outer)
+    polygon.hole = [Point(x, y) for x, y in hole[::-1].tolist()]
+    return polygon
+
+
+def fractal_coastline(n: int, seed: Optional[int] = None, radius: float = 100.0, roughness: float = 0.55,
+                      center: tuple[float, float] = (0.0, 0.0)) -> Polygon:
+    """
+        Creates a coastline-like ring with n vertices by midpoint displacement of the
+        logarithm of the radius: every level doubles the vertices and perturbs the new ones
+        by 'roughness' times the amplitude of the previous level.
+    """
+    rng = np.random.default_rng(seed)
+    log_radii = rng.normal(0, 0.3, 4)
+    amplitude = 0.3
+    while len(log_radii) < n:
+        amplitude *= roughness
+        midpoints = (log_radii + np.roll(log_radii, -1)) / 2 + rng.normal(0, amplitude, len(log_radii))
+        log_radii = np.column_stack((log_radii, midpoints)).ravel()
+
+    # Keep n of the vertices, spread evenly along the ring.
+    keep = np.linspace(0, len(log_radii), n, endpoint=False).astype(np.int64)
+    radii = np.exp(log_radii[keep] - log_radii.max()) * radius
+    return to_polygon(_star_ring(radii, rng, center, jitter=0.0))
+
+
+def triangle_array(triangles: list[Triangle]) -> np.ndarray:
+    """Returns the (T, 3, 2) coordinates of a list of triangles."""
+    return np.array([[(p.x, p.y) for p in t.points] for t in triangles], dtype=np.float64).reshape(-1, 3, 2)
+
+
+def sample_interior_points(polygon: Polygon | np.ndarray, count: int, seed: Optional[int] = None) -> np.ndarray:
+    """
+        Samples points uniformly inside a polygon: picks triangles of its triangulation
+        with probability proportional to their area, then a uniform point in each.
+
+        Arguments:
+        polygon -- a Polygon, or the (T, 3, 2) array of its triangles
+        count -- the number of points
+        seed -- the seed of the random generator
+
+        Returns: an (count, 2) array of coordinates
+    """
+    rng = np.random.default_rng(seed)
+    tri = polygon if isinstance(polygon, np.ndarray) else triangle_array(polygon.triangulation)
+    a, b, c = tri[:, 0], tri[:, 1], tri[:, 2]
+    areas = np.abs((b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) - (b[:, 1] - a[:, 1]) * (c[:, 0] - a[:, 0]))
+
+    chosen = rng.choice(len(tri), size=count, p=areas / areas.sum())
+    r1 = np.sqrt(rng.random(count))[:, None]
+    r2 = rng.random(count)[:, None]
+    return (1 - r1) * a[chosen] + r1 * (1 - r2) * b[chosen] + r1 * r2 * c[chosen]
+
+
+def sample_query_pairs(polygon: Polygon | np.ndarray, count: int, seed: Optional[int] = None) -> np.ndarray:
+    """Returns an (count, 4) array of start x, start y, end x, end y of random interior points."""
+    points = sample_interior_points(polygon, 2 * count, seed)
+    return np.hstack((points[:count], points[count:]))
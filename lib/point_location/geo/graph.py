@@ -57,9 +57,7 @@ class DirectedGraph:
 
     def root(self):
         """Returns one of the root nodes."""
-        root = self.roots.pop()
-        self.roots.add(root)
-        return root
+        return next(iter(self.roots))
 
 
 class UndirectedGraph(DirectedGraph):
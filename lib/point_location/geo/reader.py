@@ -0,0 +1,24 @@
+from typing import Optional
+
+from lib.point_location.geo.shapes import Point, Polygon
+
+
+def read_polygons(path: str, limit: Optional[int] = None) -> list[Polygon]:
+    """
+        Reads the outer rings of the shapes of a shapefile as polygons.
+
+        Arguments:
+        path -- the path of the .shp file
+        limit -- read only the first 'limit' shapes
+
+        Returns: a polygon for each shape, without the repeated closing point
+    """
+    import shapefile
+
+    with shapefile.Reader(path) as reader:
+        shapes = reader.shapes()
+
+    if limit is not None:
+        shapes = shapes[:limit]
+
+    return [Polygon([Point(p[0], p[1]) for p in shape.points[:-1]]) for shape in shapes]
@@ -3,8 +3,11 @@ from math import sqrt
 from typing import Optional
 from abc import ABC, abstractmethod
 
-from itertools import chain
+from bisect import bisect_left
+from itertools import chain, accumulate
 from copy import deepcopy
+
+import numpy as np
 # from .spatial import triangulate_polygon
 
 from lib.triangulation.earcut import earcut
@@ -145,6 +148,7 @@ class Shape2d(ABC):
         self.points = points
         self.n = len(points)
         self.__hash = None
+        self.__coordinates: Optional[np.ndarray] = None
         pass
 
     def __str__(self) -> str:
@@ -168,12 +172,25 @@ class Shape2d(ABC):
         self.__hash = None
 
     @property
-    def x(self) -> list[float]:
-        return [p.x for p in self.points] + [self.points[0].x]
+    def coordinates(self) -> np.ndarray:
+        """The (n + 1, 2) coordinates of the closed outline, computed on first access."""
+        if self.__coordinates is None:
+            coordinates = np.array([(p.x, p.y) for p in self.points] + [(self.points[0].x, self.points[0].y)],
+                                   dtype=np.float64)
+            coordinates.flags.writeable = False
+            self.__coordinates = coordinates
+        return self.__coordinates
+
+    def reset_coordinates(self):
+        self.__coordinates = None
+
+    @property
+    def x(self) -> np.ndarray:
+        return self.coordinates[:, 0]
 
     @property
-    def y(self) -> list[float]:
-        return [p.y for p in self.points] + [self.points[0].y]
+    def y(self) -> np.ndarray:
+        return self.coordinates[:, 1]
 
     @abstractmethod
     def contains_point(self, point: Point) -> bool:
@@ -342,27 +359,31 @@ class Polygon(Shape2d):
             else:
                 return Polygon(p1), Polygon(p2)
 
+        # Endpoints of every edge, to test a candidate split against all of them at once
+        x1 = np.array([p.x for p in self.points], dtype=np.float64)
+        y1 = np.array([p.y for p in self.points], dtype=np.float64)
+        x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+
+        def touches(q: Point) -> np.ndarray:
+            """Mask of the edges having q as an endpoint."""
+            return ((x1 == q.x) & (y1 == q.y)) | ((x2 == q.x) & (y2 == q.y))
+
+        def crosses(a: Point, b: Point, skip: np.ndarray) -> bool:
+            """Returns True if segment ab intersects an edge not masked by skip."""
+            def ccw_mask(ax, ay, bx, by, cx, cy):
+                return (bx - ax) * (cy - ay) > (by - ay) * (cx - ax)
+
+            hits = ((ccw_mask(a.x, a.y, b.x, b.y, x1, y1) != ccw_mask(a.x, a.y, b.x, b.y, x2, y2))
+                    & (ccw_mask(x1, y1, x2, y2, a.x, a.y) != ccw_mask(x1, y1, x2, y2, b.x, b.y)))
+            return bool(np.any(hits & ~skip))
+
         def valid_choice(u, v, p):
             """Returns True if choice u, v, p keeps polygons simple, non-intersecting."""
             p_u = self.points[u]
             p_v = self.points[v]
-            for i in range(self.n):
-                p1 = self.points[i]
-                p2 = self.points[(i + 1) % self.n]
-
-                if p:
-                    if p1 != p_u and p2 != p_u:
-                        if intersect(p_u, p, p1, p2):
-                            return False
-                    if p1 != p_v and p2 != p_v:
-                        if intersect(p_v, p, p1, p2):
-                            return False
-                else:
-                    if p1 == p_u or p2 == p_u or p1 == p_v or p2 == p_v:
-                        continue
-                    if intersect(p_v, p_u, p1, p2):
-                        return False
-            return True
+            if p:
+                return not (crosses(p_u, p, touches(p_u)) or crosses(p_v, p, touches(p_v)))
+            return not crosses(p_v, p_u, touches(p_u) | touches(p_v))
 
         # No need to check for overflow with a convex split
         if self.is_convex():
@@ -381,23 +402,8 @@ class Polygon(Shape2d):
         return sum(areas)
 
     def interior_point(self) -> Point:
-        """Returns a random point interior point via rejection sampling."""
-        min_x = min([p.x for p in self.points])
-        max_x = max([p.x for p in self.points])
-        min_y = min([p.y for p in self.points])
-        max_y = max([p.y for p in self.points])
-
-        def x():
-            return min_x + random() * (max_x - min_x)
-
-        def y():
-            return min_y + random() * (max_y - min_y)
-
-        p = Point(x(), y())
-        while not self.contains_point(p):
-            p = Point(x(), y())
-
-        return p
+        """Returns a uniformly random interior point (sampled through the triangulation)."""
+        return self.smart_interior_point()
 
     def exterior_point(self) -> Point:
         """Returns a random exterior point near the polygon."""
@@ -424,17 +430,12 @@ class Polygon(Shape2d):
     def smart_interior_point(self):
         """Returns a random interior point via triangulation."""
         triangles = self.triangulation
-        areas = [t.area() for t in triangles]
-        total = sum(areas)
-        probabilities = [area / total for area in areas]
+        cumulative_areas = list(accumulate(t.area() for t in triangles))
 
         # Sample triangle according to area
-        r = random()
-        count = 0
-        for (triangle, prob) in zip(triangles, probabilities):
-            count += prob
-            if count >= r:
-                return triangle.interior_point()
+        r = random() * cumulative_areas[-1]
+        idx = min(bisect_left(cumulative_areas, r), len(triangles) - 1)
+        return triangles[idx].interior_point()
 
     def to_triangle(self) -> Optional[Triangle]:
         if self.n == 3:
@@ -1,5 +1,4 @@
 import numpy as np
-import scipy.spatial as sp
 
 from itertools import chain
 from copy import deepcopy
@@ -35,6 +34,8 @@ def to_numpy(points: list[Point]):
 
 def triangulate_points(points: list[Point]) -> list[Triangle]:
     """Returns a triangulation of the given points (based on Delaunay algorithm)."""
+    import scipy.spatial as sp
+
     points = to_numpy(points)
     triangulation = sp.Delaunay(points)
     triangles = []
@@ -49,6 +50,9 @@ def triangulate_points(points: list[Point]) -> list[Triangle]:
 
 def convex_hull(points: list[Point]) -> Polygon:
     """Returns the minimum-area Polygon that includes all the points given."""
+    # SciPy takes longer to import than most queries take to run, load it on first use.
+    import scipy.spatial as sp
+
     points = to_numpy(points)
     vertices = sp.ConvexHull(points).vertices
     hull = list(map(lambda idx: Point(points[idx, 0], points[idx, 1]), vertices))
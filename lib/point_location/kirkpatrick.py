@@ -1,28 +1,78 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from functools import reduce
 from typing import Optional, Iterable
 
+import numpy as np
+
 # from lib.point_location.geo import spatial
 from lib.point_location.geo.spatial import convex_hull
 from lib.point_location.geo.shapes import Point, Polygon, Triangle, Shape2d
 from . import min_triangle
 from lib.point_location.geo.graph import UndirectedGraph, DirectedGraph
-from lib.path_finding.path_tools import DCEL
+from lib.path_finding.path_tools import DCEL, CHECK_INTERVAL
+from lib.path_finding.cancellation import CancellationToken
+from lib.path_finding.funnel import shortest_pull, to_ragged, to_xy
+
+# Points of the bounding box test done at once by MultiPolygonLocator.shortest_paths.
+LOCATE_CHUNK = 4096
+# Shortest path trees kept by every SinglePolygonLocator, the least recently used is dropped first.
+TREE_CACHE_SIZE = 16
 
 
 class BoundingTriangleCreationError(Exception):
     pass
 
 
+def _run_parallel(query, pairs: Iterable[tuple[Point, Point]], max_workers: int = None,
+                  cancel: CancellationToken = None) -> list:
+    """Runs query(start, end) for every pair on a thread pool, keeping the order of the pairs."""
+    pairs = list(pairs)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(lambda pair: query(*pair, cancel=cancel), pairs))
+
+
+def _as_points(points) -> np.ndarray:
+    return np.asarray(points, dtype=np.float64).reshape(-1, 2)
+
+
+def _locate_unique(locate, points: np.ndarray) -> list:
+    """Calls locate once for every distinct point, returns its result for every point."""
+    unique, inverse = np.unique(points, axis=0, return_inverse=True)
+    located = [locate(Point(x, y)) for x, y in unique.tolist()]
+    return [located[i] for i in inverse.ravel().tolist()]
+
+
 class SinglePolygonLocator:
+    """
+        Point location and shortest path queries inside a single polygon.
+
+        The index (triangulation, DCEL and Kirkpatrick hierarchy) is built once in
+        the constructor and never modified afterwards, so one instance can serve
+        `shortest_path` queries from many threads at once. Only the legacy
+        `set_first_point`/`get_shortest_path` pair keeps per-instance state.
+    """
 
-    def __init__(self, regions: list[Triangle], outline=None):
+    def __init__(self, regions: list[Triangle], outline=None, cancel: CancellationToken = None):
         self.triangles: dict[int, Triangle] = {hash(t): t for t in regions}
         self.dcel = DCEL(regions)
-        self._preprocess(regions, outline)
+        self._preprocess(regions, outline, cancel)
+        xs = [p.x for t in regions for p in t.points]
+        ys = [p.y for t in regions for p in t.points]
+        self.bounds = (min(xs), min(ys), max(xs), max(ys))
         self.__starting_point = None
         self.__starting_triangle = None
-
-    def _preprocess(self, regions: list[Triangle], outline=None):
+        self._flat = None
+        self._flat_lock = threading.Lock()
+        self._clear = None
+        # The number in `flat_index` of every initial triangle, by hash.
+        self._flat_ids: Optional[dict[int, int]] = None
+        self._trees = OrderedDict()
+        self.tree_cache_size = TREE_CACHE_SIZE
+        self._trees_lock = threading.Lock()
+
+    def _preprocess(self, regions: list[Triangle], outline=None, cancel: CancellationToken = None):
         def process_boundary(__regions: list[Triangle], __outline=None):
             """
                 Adds an outer triangle and triangulates the interior region. If an outline
@@ -31,10 +81,10 @@ class SinglePolygonLocator:
 
                 Arguments:
                 regions -- a set of non-overlapping polygons that tile some part of the plane
-                outline -- the polygonal outline of regions
+                outline -- the polygonal outline of regions, with its hole if it has one
 
                 Returns: a bounding triangle for regions and a triangulation for the area between
-                regions and the bounding triangle.
+                regions and the bounding triangle, the hole of the outline included.
             """
             def add_bounding_triangle(poly: Polygon):
                 """
@@ -57,7 +107,12 @@ class SinglePolygonLocator:
             if not __outline:
                 points = reduce(lambda ps, r: ps + r.points, __regions, [])
                 __outline = convex_hull(points)
-            return add_bounding_triangle(__outline)
+            bounding_tri, bounding_regions = add_bounding_triangle(__outline)
+            # The hole is outside the regions too: without its triangles the vertices
+            # around it would have an open fan of regions.
+            if bounding_tri and getattr(__outline, 'hole', None):
+                bounding_regions = bounding_regions + Polygon(__outline.hole).triangulation
+            return bounding_tri, bounding_regions
 
         def triangulate_regions(__regions: list[Shape2d]):
             """
@@ -139,7 +194,10 @@ class SinglePolygonLocator:
             # Track unaffected regions
             unaffected_regions = set([i for i in range(len(__regions))])
             new_regions = []
-            for p in removal:
+            for removed, p in enumerate(removal):
+                if cancel is not None and removed % CHECK_INTERVAL == 0:
+                    cancel.check()
+
                 # Take note of affected regions
                 affected_regions = points_to_regions[p]
                 unaffected_regions.difference_update(points_to_regions[p])
@@ -204,6 +262,8 @@ class SinglePolygonLocator:
         # Iterate until only bounding triangle remains
         frontier = triangulate_regions(regions + boundary)
         while len(frontier) > 1:
+            if cancel is not None:
+                cancel.check()
             frontier = remove_independent_set(frontier)
         return
 
@@ -242,11 +302,200 @@ class SinglePolygonLocator:
     def find_path(self, tri_1: Triangle, tri_2: Triangle) -> Optional[list[int]]:
         if not (hash(tri_1) in self.triangles and hash(tri_2) in self.triangles):
             return None
-        return self.dcel.bfs(tri_1, tri_2)
+        return self.dcel.corridor(tri_1, tri_2)
 
     def funnel(self, triangle_hashes: list[int], start: Point, end: Point):
         return self.dcel.funnel(triangle_hashes, start, end)
 
+    def shortest_path(self, start: Point, end: Point, start_triangle: Triangle = None,
+                      end_triangle: Triangle = None, cancel: CancellationToken = None,
+                      radius: float = 0.0) -> Optional[dict]:
+        """
+            Finds the shortest path between two points of the polygon, through the
+            corridors of `flat_index`. Does not modify any state of the locator, so it is
+            safe to call concurrently.
+
+            Arguments:
+            start -- the first point of the path
+            end -- the last point of the path
+            start_triangle, end_triangle -- the triangles containing the points, if already located
+            cancel -- checked before the search, stops it with QueryCancelled once triggered
+            radius -- the path of a disk of that radius instead, over `clearance_index`
+                (see `FlatIndex.clear_path`)
+
+            Returns: a dict with the 'x' and 'y' coordinates of the path, or None if either
+            point is outside the polygon (or closer than the radius to its boundary, or the
+            disk does not fit).
+        """
+        if radius > 0:
+            flat = self.clearance_index()
+            t1 = flat.locate(start.x, start.y) if start_triangle is None else self._flat_triangle(start_triangle)
+            t2 = flat.locate(end.x, end.y) if end_triangle is None else self._flat_triangle(end_triangle)
+            if t1 < 0 or t2 < 0:
+                return None
+            return flat.clear_path((start.x, start.y), (end.x, end.y), t1, t2, radius, cancel)
+        if start_triangle is None and (start_triangle := self.locate(start)) is None:
+            return None
+        if end_triangle is None and (end_triangle := self.locate(end)) is None:
+            return None
+
+        return self._paths(np.array([[start.x, start.y]]), np.array([[end.x, end.y]]), [start_triangle],
+                           [end_triangle], cancel)[0]
+
+    def _paths(self, starts: np.ndarray, ends: np.ndarray, start_triangles: list[Optional[Triangle]],
+               end_triangles: list[Optional[Triangle]], cancel: CancellationToken = None) -> list[Optional[dict]]:
+        """
+            Shortest paths between located points, with the corridors and the funnel of
+            `flat_index`; the portals of every pair of triangles are gathered once.
+        """
+        flat = self.flat_index()
+        portals: dict[tuple[int, int], list[list]] = {}
+        paths = []
+        for start, end, t1, t2 in zip(starts.tolist(), ends.tolist(), start_triangles, end_triangles):
+            if t1 is None or t2 is None:
+                paths.append(None)
+                continue
+            if cancel is not None:
+                cancel.check()
+            if (key := (hash(t1), hash(t2))) not in portals:
+                corridors = flat.corridors(self._flat_triangle(t1), self._flat_triangle(t2))
+                portals[key] = [flat.portals(c) for c in corridors]
+            path = shortest_pull(portals[key], tuple(start), tuple(end))
+            paths.append(None if path is None else to_xy(path))
+        return paths
+
+    def shortest_paths(self, starts: np.ndarray, ends: np.ndarray,
+                       cancel: CancellationToken = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+            Finds the shortest path of a batch of queries. Every distinct point is located
+            once, and queries between the same two triangles share their corridor search.
+
+            Arguments:
+            starts, ends -- (N, 2) coordinates of the first and last point of every query
+            cancel -- checked periodically, stops the batch with QueryCancelled once triggered
+
+            Returns: the paths as a ragged array, see `to_ragged`
+        """
+        starts, ends = _as_points(starts), _as_points(ends)
+        return to_ragged(self._paths(starts, ends, _locate_unique(self.locate, starts),
+                                     _locate_unique(self.locate, ends), cancel))
+
+    def shortest_paths_parallel(self, pairs: Iterable[tuple[Point, Point]], max_workers: int = None,
+                                cancel: CancellationToken = None) -> list[Optional[dict]]:
+        """Runs `shortest_path` for every (start, end) pair on a thread pool."""
+        return _run_parallel(self.shortest_path, pairs, max_workers, cancel)
+
+    def flat_index(self):
+        """The locator flattened to a FlatIndex (see `FlatIndex.from_locator`), built on first use."""
+        from lib.index.flat import FlatIndex
+
+        with self._flat_lock:
+            if self._flat is None:
+                self._flat = FlatIndex.from_locator(self)
+            return self._flat
+
+    def clearance_index(self):
+        """`flat_index` with the edge and passage widths of `FlatIndex.with_clearance`, built on first use."""
+        flat = self.flat_index()
+        with self._flat_lock:
+            if self._clear is None:
+                self._clear = flat.with_clearance()
+            return self._clear
+
+    def _flat_triangle(self, triangle: Triangle) -> int:
+        """The number of one of the initial triangles in `flat_index`, -1 for any other triangle."""
+        flat = self.flat_index()
+        with self._flat_lock:
+            if self._flat_ids is None:
+                numbers = {tuple(sorted(map(tuple, corners))): t for t, corners in enumerate(
+                    flat.vertices[flat.triangles].tolist())}
+                self._flat_ids = {hash(t): numbers[tuple(sorted((float(p.x), float(p.y)) for p in t.points))]
+                                  for t in self.regions}
+        return self._flat_ids.get(hash(triangle), -1)
+
+    def register_candidates(self, points: np.ndarray):
+        """Locates (M, 2) candidate points once for `nearest`, see CandidateSet."""
+        from lib.index.tree import CandidateSet
+
+        return CandidateSet(self.flat_index(), _as_points(points))
+
+    def nearest(self, p: Point, candidates, k: int = 1) -> list[tuple[int, float]]:
+        """
+            The k registered candidates closest to p by shortest path, from a single search
+            over the triangles (see `lib.index.tree.nearest`).
+
+            Returns: (candidate number, distance) pairs, nearest first; candidates in another
+            polygon than p are never returned
+        """
+        from lib.index.tree import nearest
+
+        return nearest(self.flat_index(), (p.x, p.y), candidates, k)
+
+    def route(self, waypoints: Iterable[Point], optimize_order: bool = False) -> Optional[dict]:
+        """
+            The shortest route through the waypoints in a row, as one path with the length of
+            every leg; optimize_order reorders the stops after the first to shorten it (see
+            `lib.index.route.route`).
+
+            Returns: a dict with 'x', 'y', 'legs' and 'order' (the waypoints in visiting
+            order), or None if the waypoints are not all in the same polygon
+        """
+        from lib.index.route import route
+
+        return route(self.flat_index(), [(p.x, p.y) for p in waypoints], optimize_order)
+
+    def reachable_within(self, p: Point, max_distance: float, segments: int = 32) -> Optional[dict]:
+        """
+            The part of the polygon within a shortest path distance of p. Only the triangles
+            that may be within the distance are entered, so the cost grows with the area
+            reached (see `lib.index.tree.reachable_within`).
+
+            Arguments:
+            p -- the point to measure from
+            max_distance -- the longest path allowed
+            segments -- the chords per full circle used to draw arcs
+
+            Returns: a dict with the 'triangles' reached and the convex parts of them within the
+            distance as 'region' (overlapping around a hole), each as {'x': [...], 'y': [...]};
+            None if p is outside the polygon
+        """
+        from lib.index.tree import reachable_within
+
+        flat = self.flat_index()
+        triangles, parts = reachable_within(flat, (p.x, p.y), max_distance, segments)
+        if not triangles:
+            return None
+        corners = flat.vertices[flat.triangles[triangles]]
+        return {'triangles': [{'x': c[:, 0].tolist(), 'y': c[:, 1].tolist()} for c in corners],
+                'region': [to_xy(part) for part in parts]}
+
+    def build_shortest_path_tree(self, origin: Point):
+        """
+            Shortest paths from one origin to the whole polygon, for many targets: the funnel
+            is split over every triangle once, then `path_to((x, y))` and `distance_to((x, y))`
+            of the returned ShortestPathTree only locate the target and walk up the tree.
+            The trees of the last `tree_cache_size` origins are kept and returned again.
+
+            Returns: the tree, None if the origin is outside the polygon
+        """
+        from lib.index.tree import ShortestPathTree
+
+        key = (origin.x, origin.y)
+        with self._trees_lock:
+            if key in self._trees:
+                self._trees.move_to_end(key)
+                return self._trees[key]
+
+        # Built outside the lock, so that other origins are not held up.
+        if (tree := ShortestPathTree(self.flat_index(), key)).t0 < 0:
+            return None
+        with self._trees_lock:
+            self._trees[key] = tree
+            self._trees.move_to_end(key)
+            while len(self._trees) > self.tree_cache_size:
+                self._trees.popitem(last=False)
+        return tree
+
     def set_first_point(self, point: Point, triangle: Triangle = None):
         if triangle is not None:
             if triangle.contains_point(point):
@@ -270,14 +519,9 @@ class SinglePolygonLocator:
     def get_shortest_path(self, end_point: Point):
         if self.__starting_point is None:
             return None
-        if (tri := self.locate(end_point)) is None:
+        if (res := self.shortest_path(self.__starting_point, end_point, self.__starting_triangle)) is None:
             return None
 
-        if (tri_path := self.dcel.bfs(self.__starting_triangle, tri)) is None:
-            return None
-
-        res = self.dcel.funnel(tri_path, self.__starting_point, end_point)
-
         self.__starting_triangle = None
         self.__starting_point = None
         return res
@@ -286,11 +530,25 @@ class SinglePolygonLocator:
 
 
 class MultiPolygonLocator:
+    """
+        Point location and shortest path queries over a set of disjoint polygons.
+
+        Regions are only added through `add_regions`; once that returns, the index is
+        treated as immutable and `locate`/`shortest_path` can be called from any number
+        of threads.
+    """
+
     def __init__(self) -> None:
         self.locators = set()
+        # Bounding boxes (min_x, min_y, max_x, max_y) of the locators, in the order of _bounded_locators
+        self._bounded_locators: list[SinglePolygonLocator] = []
+        self._bounds = np.empty((0, 4))
         self.all_triangles: dict[int, Triangle] = dict()
         self.triangle_owners: dict[int, SinglePolygonLocator] = dict()
 
+        self._flat = None
+        self._flat_lock = threading.Lock()
+
         self.__starting_point = None
         self.__starting_triangle = None
         self.__current_locator = None
@@ -299,17 +557,24 @@ class MultiPolygonLocator:
     # def add_region(self, triangulation: list[Triangle], outline_polygon: Polygon = None):
     #     for triangle in 
     
-    def add_regions(self, region_outlines: Iterable[Polygon]) -> Optional[set[int]]:
-        """Adds the regions to the class. Returns the indexes of the regions that were skipped."""
+    def add_regions(self, region_outlines: Iterable[Polygon], cancel: CancellationToken = None) -> Optional[set[int]]:
+        """
+            Adds the regions to the class. Returns the indexes of the regions that were skipped.
+            If the cancel token is triggered the build stops with QueryCancelled and the
+            index is left as it was.
+        """
         tri_triangles = {**self.all_triangles}
         tri_locators = {**self.triangle_owners}
 
         skipped = set()
         for i, region in enumerate(region_outlines):
 
+            if cancel is not None:
+                cancel.check()
+
             triangulation = region.triangulation
             try:
-                locator = SinglePolygonLocator(triangulation, region)
+                locator = SinglePolygonLocator(triangulation, region, cancel)
             except BoundingTriangleCreationError:
                 skipped.add(i)
                 continue
@@ -325,18 +590,169 @@ class MultiPolygonLocator:
 
         self.all_triangles = tri_triangles
         self.triangle_owners = tri_locators
+
+        self._bounded_locators = list(self.locators)
+        self._bounds = np.array([loc.bounds for loc in self._bounded_locators]).reshape(-1, 4)
+        with self._flat_lock:
+            self._flat = None
         return skipped
 
+    def candidate_locators(self, p: Point) -> list[SinglePolygonLocator]:
+        """Returns the locators whose bounding box contains p."""
+        b = self._bounds
+        mask = (b[:, 0] <= p.x) & (p.x <= b[:, 2]) & (b[:, 1] <= p.y) & (p.y <= b[:, 3])
+        return [self._bounded_locators[i] for i in np.flatnonzero(mask)]
+
     def locate(self, p: Point, previous_triangle: Triangle = None) -> Optional[Triangle]:
         if previous_triangle is not None:
             if (locator := self.triangle_owners.get(hash(previous_triangle))) is None:
                 return None
             return locator.locate(p)
-        for locator in self.locators:
+        for locator in self.candidate_locators(p):
             if (triangle := locator.locate(p)) is not None:
                 return triangle
         return None
 
+    def shortest_path(self, start: Point, end: Point, cancel: CancellationToken = None,
+                      radius: float = 0.0) -> Optional[dict]:
+        """
+            Finds the shortest path between two points that lie in the same region.
+            Safe to call concurrently, as it does not touch the state kept by
+            `set_first_point`. With a radius, the path of a disk of that radius (see
+            `SinglePolygonLocator.shortest_path`).
+
+            Returns: a dict with the 'x' and 'y' coordinates of the path, or None if
+            the points are not inside the same region.
+        """
+        if (start_triangle := self.locate(start)) is None:
+            return None
+
+        locator = self.triangle_owners[hash(start_triangle)]
+        if (end_triangle := locator.locate(end)) is None:
+            return None
+
+        return locator.shortest_path(start, end, start_triangle, end_triangle, cancel, radius)
+
+    def _locate_all(self, points: np.ndarray) -> list[Optional[Triangle]]:
+        """`locate` for every point, testing the bounding boxes of a whole chunk of points at once."""
+        b = self._bounds
+        located = []
+        for first in range(0, len(points), LOCATE_CHUNK):
+            chunk = points[first:first + LOCATE_CHUNK]
+            x, y = chunk[:, :1], chunk[:, 1:]
+            rows, columns = np.nonzero((b[:, 0] <= x) & (x <= b[:, 2]) & (b[:, 1] <= y) & (y <= b[:, 3]))
+            candidates: list[list[int]] = [[] for _ in range(len(chunk))]
+            for row, column in zip(rows.tolist(), columns.tolist()):
+                candidates[row].append(column)
+            for (px, py), columns in zip(chunk.tolist(), candidates):
+                point = Point(px, py)
+                for column in columns:
+                    if (triangle := self._bounded_locators[column].locate(point)) is not None:
+                        located.append(triangle)
+                        break
+                else:
+                    located.append(None)
+        return located
+
+    def shortest_paths(self, starts: np.ndarray, ends: np.ndarray,
+                       cancel: CancellationToken = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+            Finds the shortest path of a batch of queries. The distinct start points are
+            located in one pass, the queries are grouped by the polygon containing their
+            start and their ends are only looked for in that polygon. See
+            `SinglePolygonLocator.shortest_paths`.
+
+            Arguments:
+            starts, ends -- (N, 2) coordinates of the first and last point of every query
+            cancel -- checked periodically, stops the batch with QueryCancelled once triggered
+
+            Returns: the paths as a ragged array, see `to_ragged`; a query is empty when its
+            points are not inside the same region
+        """
+        starts, ends = _as_points(starts), _as_points(ends)
+        unique, inverse = np.unique(starts, axis=0, return_inverse=True)
+        located = self._locate_all(unique)
+        start_triangles = [located[i] for i in inverse.ravel().tolist()]
+
+        groups: dict[SinglePolygonLocator, list[int]] = {}
+        for query, triangle in enumerate(start_triangles):
+            if triangle is not None:
+                groups.setdefault(self.triangle_owners[hash(triangle)], []).append(query)
+
+        paths: list[Optional[dict]] = [None] * len(starts)
+        for locator, queries in groups.items():
+            if cancel is not None:
+                cancel.check()
+            group_ends = ends[queries]
+            found = locator._paths(starts[queries], group_ends, [start_triangles[q] for q in queries],
+                                   _locate_unique(locator.locate, group_ends), cancel)
+            for query, path in zip(queries, found):
+                paths[query] = path
+        return to_ragged(paths)
+
+    def flat_index(self):
+        """The locator flattened to a FlatIndex (see `FlatIndex.from_locator`), built on first use."""
+        from lib.index.flat import FlatIndex
+
+        with self._flat_lock:
+            if self._flat is None:
+                self._flat = FlatIndex.from_locator(self)
+            return self._flat
+
+    def register_candidates(self, points: np.ndarray):
+        """Locates (M, 2) candidate points once for `nearest`, see CandidateSet."""
+        from lib.index.tree import CandidateSet
+
+        return CandidateSet(self.flat_index(), _as_points(points))
+
+    def nearest(self, p: Point, candidates, k: int = 1) -> list[tuple[int, float]]:
+        """
+            The k registered candidates closest to p by shortest path, from a single search
+            over the triangles of the polygon of p (see `lib.index.tree.nearest`).
+
+            Returns: (candidate number, distance) pairs, nearest first; candidates in another
+            polygon than p are never returned
+        """
+        from lib.index.tree import nearest
+
+        return nearest(self.flat_index(), (p.x, p.y), candidates, k)
+
+    def route(self, waypoints: Iterable[Point], optimize_order: bool = False) -> Optional[dict]:
+        """
+            The shortest route through the waypoints in a row, as one path with the length of
+            every leg; optimize_order reorders the stops after the first to shorten it (see
+            `lib.index.route.route`).
+
+            Returns: a dict with 'x', 'y', 'legs' and 'order' (the waypoints in visiting
+            order), or None if the waypoints are not all in the same polygon
+        """
+        from lib.index.route import route
+
+        return route(self.flat_index(), [(p.x, p.y) for p in waypoints], optimize_order)
+
+    def reachable_within(self, p: Point, max_distance: float, segments: int = 32) -> Optional[dict]:
+        """`SinglePolygonLocator.reachable_within` in the region containing p, None outside every region."""
+        if (triangle := self.locate(p)) is None:
+            return None
+        return self.triangle_owners[hash(triangle)].reachable_within(p, max_distance, segments)
+
+    def build_shortest_path_tree(self, origin: Point):
+        """`SinglePolygonLocator.build_shortest_path_tree` of the region containing the origin, None outside."""
+        if (triangle := self.locate(origin)) is None:
+            return None
+        return self.triangle_owners[hash(triangle)].build_shortest_path_tree(origin)
+
+    def shortest_paths_parallel(self, pairs: Iterable[tuple[Point, Point]], max_workers: int = None,
+                                cancel: CancellationToken = None) -> list[Optional[dict]]:
+        """
+            Runs `shortest_path` for every (start, end) pair on a thread pool. The queries
+            are Python code holding the GIL, so the threads share one core; `QueryPool`
+            (lib.index.pool) spreads batches over processes instead.
+
+            Returns: the results in the same order as the pairs.
+        """
+        return _run_parallel(self.shortest_path, pairs, max_workers, cancel)
+
     def set_first_point(self, point: Point) -> bool:
 
         self.__starting_point = None
@@ -345,33 +761,26 @@ class MultiPolygonLocator:
 
         if (tri := self.locate(point)) is None:
             return False
-        h = hash(tri)
-        locator = self.triangle_owners[h]
 
-        if locator.set_first_point(point, tri):
-            self.__starting_point = point
-            self.__starting_triangle = tri
-            self.__current_locator = locator
-            return True
-        return False
+        self.__starting_point = point
+        self.__starting_triangle = tri
+        self.__current_locator = self.triangle_owners[hash(tri)]
+        return True
 
     def has_first_point(self):
         return not not self.__starting_point
 
     def get_shortest_path(self, end_point: Point):
-        if (tri := self.locate(end_point)) is None:
+        if (locator := self.__current_locator) is None:
             return None
-
-        h = hash(tri)
-        locator = self.triangle_owners[h]
-
-        if locator is not self.__current_locator:
+        if (tri := locator.locate(end_point)) is None:
             return None
 
+        start_point, start_triangle = self.__starting_point, self.__starting_triangle
         self.__starting_point = None
         self.__starting_triangle = None
         self.__current_locator = None
 
-        return locator.get_shortest_path(end_point)
+        return locator.shortest_path(start_point, end_point, start_triangle, tri)
     pass
         
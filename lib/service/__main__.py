@@ -0,0 +1,86 @@
+import argparse
+import os
+import signal
+import threading
+
+from lib.index.versioned import VersionedIndex
+from lib.point_location.geo.reader import read_polygons
+from lib.point_location.kirkpatrick import MultiPolygonLocator
+from lib.service.batching import MicroBatcher
+from lib.service.server import http_server, unix_server, locator_batch_processor
+from lib.service.trace import TraceRecorder
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m lib.service',
+                                     description='Serves shortest path queries over a shapefile.')
+    parser.add_argument('shapefile', nargs='?', default='data/GSHHS_c_L1.shp', help='reloaded on SIGHUP')
+    parser.add_argument('--limit', type=int, default=None, help='load only the first LIMIT shapes')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080, help='HTTP port, 0 disables HTTP')
+    parser.add_argument('--unix', default=None, help='path of the unix socket of the binary protocol')
+    parser.add_argument('--max-batch', type=int, default=256)
+    parser.add_argument('--max-wait-ms', type=float, default=2.0)
+    parser.add_argument('--max-queue', type=int, default=10_000)
+    parser.add_argument('--workers', type=int, default=1, help='threads processing batches')
+    parser.add_argument('--record', default=None, help='record the received queries to this trace file')
+    args = parser.parse_args()
+
+    def load() -> MultiPolygonLocator:
+        locator = MultiPolygonLocator()
+        skipped = locator.add_regions(read_polygons(args.shapefile, args.limit))
+        print(f'Index loaded, skipped regions: {sorted(skipped or [])}')
+        return locator
+
+    index = VersionedIndex(load())
+
+    def reload(*_):
+        # Rebuilt in the background from the (possibly updated) shapefile, queries keep
+        # being answered on the current index until the new one is swapped in.
+        index.reload(load).add_done_callback(reloaded)
+
+    def reloaded(future):
+        if (error := future.exception()) is not None:
+            print(f'Index reload failed, keeping version {index.version}: {error}')
+        else:
+            print(f'Index version {future.result().number} in service')
+
+    if hasattr(signal, 'SIGHUP'):
+        signal.signal(signal.SIGHUP, reload)
+
+    recorder = TraceRecorder(args.record) if args.record else None
+    batcher = MicroBatcher(locator_batch_processor(index), max_batch=args.max_batch,
+                           max_wait=args.max_wait_ms / 1000, max_queue=args.max_queue, workers=args.workers,
+                           recorder=recorder)
+
+    servers = []
+    if args.port:
+        servers.append(http_server(batcher, args.host, args.port, index))
+        print(f'HTTP on http://{args.host}:{args.port}')
+    if args.unix:
+        if os.path.exists(args.unix):
+            os.unlink(args.unix)
+        servers.append(unix_server(batcher, args.unix))
+        print(f'Binary protocol on {args.unix}')
+
+    threads = [threading.Thread(target=s.serve_forever, daemon=True) for s in servers]
+    for thread in threads:
+        thread.start()
+    try:
+        for thread in threads:
+            thread.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for server in servers:
+            server.shutdown()
+            server.server_close()
+        batcher.close()
+        index.close()
+        if recorder is not None:
+            recorder.close()
+        print(batcher.stats())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+import asyncio
+import time
+from concurrent.futures import Executor
+from typing import Callable, Iterable, Optional
+
+import numpy as np
+
+from lib.path_finding.cancellation import CancellationToken
+from lib.path_finding.funnel import from_ragged
+from lib.point_location.geo.shapes import Point, Polygon, Triangle
+from lib.point_location.kirkpatrick import MultiPolygonLocator
+
+
+class AsyncLocator:
+    """
+        asyncio front end of a MultiPolygonLocator. Every call runs on an executor so the
+        event loop never blocks, at most 'max_concurrency' calls run at once, and each call
+        may take a timeout in seconds. When a call times out or its task is cancelled, the
+        search running on the executor is cancelled cooperatively at its next checkpoint.
+    """
+
+    def __init__(self, locator: MultiPolygonLocator = None, executor: Executor = None,
+                 max_concurrency: int = 64):
+        self.locator = locator if locator is not None else MultiPolygonLocator()
+        self.executor = executor
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _run(self, func: Callable[[CancellationToken], object], timeout: Optional[float]):
+        """Runs func(token) on the executor, cancelling the token when the caller gives up."""
+        token = CancellationToken(timeout)
+        # Waiting for a free slot counts against the deadline as well.
+        await asyncio.wait_for(self._semaphore.acquire(), timeout)
+        remaining = None if token.deadline is None else max(0.0, token.deadline - time.monotonic())
+        future = asyncio.get_running_loop().run_in_executor(self.executor, func, token)
+
+        def done(f: asyncio.Future):
+            # The slot is only freed once the executor is done, so abandoned calls still count.
+            self._semaphore.release()
+            if not f.cancelled():
+                # Marks the QueryCancelled of an abandoned call as retrieved.
+                f.exception()
+
+        future.add_done_callback(done)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), remaining)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            token.cancel()
+            raise
+
+    async def add_regions(self, region_outlines: Iterable[Polygon],
+                          timeout: Optional[float] = None) -> Optional[set[int]]:
+        """Builds the index of the regions; returns the indexes of the skipped regions."""
+        region_outlines = list(region_outlines)
+        return await self._run(lambda token: self.locator.add_regions(region_outlines, token), timeout)
+
+    async def locate(self, p: Point, timeout: Optional[float] = None) -> Optional[Triangle]:
+        return await self._run(lambda _: self.locator.locate(p), timeout)
+
+    async def shortest_path(self, start: Point, end: Point, timeout: Optional[float] = None) -> Optional[dict]:
+        return await self._run(lambda token: self.locator.shortest_path(start, end, token), timeout)
+
+    async def shortest_paths(self, pairs: Iterable[tuple[Point, Point]],
+                             timeout: Optional[float] = None) -> list[Optional[dict]]:
+        """Answers a batch of queries in one executor call; the timeout applies to the whole batch."""
+        coordinates = np.array([(s.x, s.y, e.x, e.y) for s, e in pairs], dtype=np.float64).reshape(-1, 4)
+        return await self._run(lambda token: from_ragged(*self.locator.shortest_paths(
+            coordinates[:, :2], coordinates[:, 2:], token)), timeout)
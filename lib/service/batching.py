@@ -0,0 +1,137 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Optional
+
+from lib.point_location.geo.shapes import Point
+from lib.service.stats import LatencyRecorder
+
+
+class Overloaded(Exception):
+    """Raised when a request is not admitted because the queue is full."""
+    pass
+
+
+BatchProcessor = Callable[[list[tuple[Point, Point]]], list[Optional[dict]]]
+
+
+class Recorder:
+    """
+        Receives every request a MicroBatcher admits, before it is queued, from the threads
+        submitting them. See `lib.service.trace.TraceRecorder`.
+    """
+
+    def record(self, start: Point, end: Point):
+        pass
+
+
+class MicroBatcher:
+    """
+        Gathers concurrent (start, end) requests into micro-batches and runs them through
+        a batch processor on a fixed number of worker threads.
+
+        A batch is closed when it reaches 'max_batch' requests or when its oldest request
+        has waited 'max_wait' seconds. At most 'max_queue' requests may be waiting; beyond
+        that `submit` either rejects the request (admission control) or blocks the caller
+        until there is room (backpressure), depending on its timeout. If a recorder is
+        given, every submitted request is passed to it (see Recorder).
+    """
+
+    def __init__(self, process_batch: BatchProcessor, max_batch: int = 256, max_wait: float = 0.002,
+                 max_queue: int = 10_000, workers: int = 1, recorder: Optional[Recorder] = None):
+        self.process_batch = process_batch
+        self.recorder = recorder
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.latency = LatencyRecorder()
+        self.rejected = 0
+        self.batches = 0
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._closed = threading.Event()
+        self._threads = [threading.Thread(target=self._run, name=f'batcher-{i}', daemon=True)
+                         for i in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    @property
+    def depth(self) -> int:
+        """The number of requests waiting for a batch."""
+        return self._queue.qsize()
+
+    def submit(self, start: Point, end: Point, timeout: Optional[float] = 0) -> Future:
+        """
+            Queues a request. With timeout=0 a full queue rejects the request immediately,
+            otherwise the caller waits up to 'timeout' seconds (forever if None) for room.
+            Coordinates that are not numbers raise ValueError or TypeError here, before the
+            request can fail the batch it would join.
+
+            Returns: a future resolving to the result of the request.
+        """
+        if self._closed.is_set():
+            raise RuntimeError("The batcher is closed.")
+        start, end = Point(float(start.x), float(start.y)), Point(float(end.x), float(end.y))
+
+        if self.recorder is not None:
+            self.recorder.record(start, end)
+
+        future = Future()
+        item = (time.perf_counter(), start, end, future)
+        try:
+            if timeout == 0:
+                self._queue.put_nowait(item)
+            else:
+                self._queue.put(item, timeout=timeout)
+        except queue.Full:
+            self.rejected += 1
+            raise Overloaded(f"More than {self._queue.maxsize} requests are waiting.")
+        return future
+
+    def query(self, start: Point, end: Point, timeout: Optional[float] = 0) -> Optional[dict]:
+        """Submits a request and waits for its result."""
+        return self.submit(start, end, timeout).result()
+
+    def _collect(self) -> list:
+        """Blocks for the first request, then gathers more until the batch is full or too old."""
+        while True:
+            try:
+                batch = [self._queue.get(timeout=0.1)]
+                break
+            except queue.Empty:
+                if self._closed.is_set():
+                    return []
+
+        deadline = batch[0][0] + self.max_wait
+        while len(batch) < self.max_batch:
+            try:
+                remaining = deadline - time.perf_counter()
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while batch := self._collect():
+            self.batches += 1
+            try:
+                results = self.process_batch([(start, end) for _, start, end, _ in batch])
+            except Exception as e:
+                for _, _, _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            now = time.perf_counter()
+            for (received, _, _, future), result in zip(batch, results):
+                self.latency.record(now - received)
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        return {**self.latency.summary(), 'queue_depth': self.depth,
+                'rejected': self.rejected, 'batches': self.batches}
+
+    def close(self):
+        """Stops the workers once the queued requests are processed."""
+        self._closed.set()
+        for thread in self._threads:
+            thread.join()
@@ -0,0 +1,33 @@
+import socket
+import struct
+from typing import Optional
+
+from lib.service.server import REQUEST, RESPONSE, STATUS_OK, STATUS_NO_PATH
+
+
+class UnixClient:
+    """A minimal blocking client of the unix socket protocol, used for load testing."""
+
+    def __init__(self, path: str):
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.connect(path)
+        self.file = self.socket.makefile('rwb')
+        self.next_id = 0
+
+    def query(self, sx: float, sy: float, ex: float, ey: float) -> Optional[dict]:
+        """Returns the path between the points, None if there is none; raises on rejection."""
+        self.next_id += 1
+        self.file.write(REQUEST.pack(self.next_id, sx, sy, ex, ey))
+        self.file.flush()
+
+        request_id, status, n = RESPONSE.unpack(self.file.read(RESPONSE.size))
+        coordinates = struct.unpack(f'<{2 * n}d', self.file.read(16 * n))
+        if status == STATUS_NO_PATH:
+            return None
+        if status != STATUS_OK:
+            raise RuntimeError(f"Request {request_id} failed with status {status}.")
+        return {'x': list(coordinates[0::2]), 'y': list(coordinates[1::2])}
+
+    def close(self):
+        self.file.close()
+        self.socket.close()
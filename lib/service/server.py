@@ -0,0 +1,183 @@
+import json
+import queue
+import socketserver
+import struct
+import threading
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+import numpy as np
+
+from lib.index.versioned import VersionedIndex
+from lib.path_finding.funnel import from_ragged
+from lib.point_location.kirkpatrick import MultiPolygonLocator
+from lib.point_location.geo.shapes import Point
+from lib.service.batching import MicroBatcher, Overloaded
+
+# Binary protocol over the unix socket, all little endian:
+#   request  -- request id (uint32), start x, start y, end x, end y (float64)
+#   response -- request id (uint32), status (uint8), number of points n (uint32),
+#               followed by n (x, y) float64 pairs
+REQUEST = struct.Struct('<I4d')
+RESPONSE = struct.Struct('<IBI')
+
+STATUS_OK = 0
+STATUS_NO_PATH = 1
+STATUS_OVERLOADED = 2
+STATUS_ERROR = 3
+
+
+def _answer(locator: MultiPolygonLocator, pairs: list[tuple[Point, Point]]) -> list[Optional[dict]]:
+    coordinates = np.array([(s.x, s.y, e.x, e.y) for s, e in pairs], dtype=np.float64).reshape(-1, 4)
+    return from_ragged(*locator.shortest_paths(coordinates[:, :2], coordinates[:, 2:]))
+
+
+def locator_batch_processor(locator: MultiPolygonLocator | VersionedIndex[MultiPolygonLocator]):
+    """
+        Returns a batch processor answering a whole batch with one `shortest_paths` call. With
+        a VersionedIndex, a batch is answered on the version current when it starts.
+    """
+    if isinstance(locator, VersionedIndex):
+        handle = locator
+
+        def process(pairs: list[tuple[Point, Point]]) -> list[Optional[dict]]:
+            with handle.use() as current:
+                return _answer(current, pairs)
+        return process
+
+    def process(pairs: list[tuple[Point, Point]]) -> list[Optional[dict]]:
+        return _answer(locator, pairs)
+    return process
+
+
+class QueryHTTPHandler(BaseHTTPRequestHandler):
+    """
+        JSON over HTTP:
+        POST /path  {"start": [x, y], "end": [x, y]} -> {"x": [...], "y": [...]}
+        POST /paths {"pairs": [[sx, sy, ex, ey], ...]} -> {"paths": [path or null, ...]}
+        GET /stats -> latency percentiles, queue depth and rejections (and the index version)
+    """
+    batcher: MicroBatcher = None
+    index: Optional[VersionedIndex] = None
+
+    def log_message(self, format, *args):
+        return
+
+    def _reply(self, status: HTTPStatus, body: dict):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        if status == HTTPStatus.SERVICE_UNAVAILABLE:
+            self.send_header('Retry-After', '1')
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path != '/stats':
+            return self._reply(HTTPStatus.NOT_FOUND, {'error': f'unknown path {self.path}'})
+        stats = self.batcher.stats()
+        if self.index is not None:
+            stats['index_version'] = self.index.version
+        return self._reply(HTTPStatus.OK, stats)
+
+    def do_POST(self):
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            if self.path == '/path':
+                pairs = [(*body['start'], *body['end'])]
+            elif self.path == '/paths':
+                pairs = body['pairs']
+            else:
+                return self._reply(HTTPStatus.NOT_FOUND, {'error': f'unknown path {self.path}'})
+            # Every pair is checked before any is queued.
+            points = [(Point(float(sx), float(sy)), Point(float(ex), float(ey))) for sx, sy, ex, ey in pairs]
+            futures = [self.batcher.submit(start, end) for start, end in points]
+        except Overloaded as e:
+            return self._reply(HTTPStatus.SERVICE_UNAVAILABLE, {'error': str(e)})
+        except (ValueError, KeyError, TypeError) as e:
+            return self._reply(HTTPStatus.BAD_REQUEST, {'error': f'malformed request: {e}'})
+
+        try:
+            paths = [f.result() for f in futures]
+        except Exception as e:
+            return self._reply(HTTPStatus.INTERNAL_SERVER_ERROR, {'error': f'query failed: {e}'})
+        if self.path == '/paths':
+            return self._reply(HTTPStatus.OK, {'paths': paths})
+        if paths[0] is None:
+            return self._reply(HTTPStatus.NOT_FOUND, {'error': 'no path between the points'})
+        return self._reply(HTTPStatus.OK, paths[0])
+
+
+class QueryStreamHandler(socketserver.StreamRequestHandler):
+    """
+        Binary protocol over a unix socket. Requests of a connection may be pipelined: they
+        are read and submitted as they arrive, up to 'max_in_flight' unanswered ones, and a
+        writer thread answers them in order as their batches complete. With that many in
+        flight, or when the queue is full, the handler stops reading, pushing the
+        backpressure to the client.
+    """
+    batcher: MicroBatcher = None
+    backpressure_timeout: Optional[float] = None
+    max_in_flight: int = 256
+
+    def handle(self):
+        # (request id, future or the status of a request that was not submitted), None at the end.
+        pending = queue.Queue(maxsize=self.max_in_flight)
+        writer = threading.Thread(target=self._answer, args=(pending,), daemon=True)
+        writer.start()
+        try:
+            while data := self.rfile.read(REQUEST.size):
+                if len(data) < REQUEST.size:
+                    break
+                request_id, sx, sy, ex, ey = REQUEST.unpack(data)
+                try:
+                    answer = self.batcher.submit(Point(sx, sy), Point(ex, ey), timeout=self.backpressure_timeout)
+                except Overloaded:
+                    answer = STATUS_OVERLOADED
+                except Exception:
+                    answer = STATUS_ERROR
+                pending.put((request_id, answer))
+        finally:
+            pending.put(None)
+            writer.join()
+
+    def _answer(self, pending: queue.Queue):
+        # Once the client is gone the answers are dropped, but the queue is still drained.
+        connected = True
+        while (item := pending.get()) is not None:
+            request_id, answer = item
+            if not isinstance(answer, int):
+                try:
+                    path = answer.result()
+                    answer = STATUS_NO_PATH if path is None else STATUS_OK
+                except Exception:
+                    answer = STATUS_ERROR
+            if answer == STATUS_OK:
+                n = len(path['x'])
+                coordinates = [c for xy in zip(path['x'], path['y']) for c in xy]
+                response = RESPONSE.pack(request_id, STATUS_OK, n) + struct.pack(f'<{2 * n}d', *coordinates)
+            else:
+                response = RESPONSE.pack(request_id, answer, 0)
+            if connected:
+                try:
+                    self.wfile.write(response)
+                except OSError:
+                    connected = False
+
+
+def http_server(batcher: MicroBatcher, host: str = '127.0.0.1', port: int = 8080,
+                index: Optional[VersionedIndex] = None) -> ThreadingHTTPServer:
+    handler = type('Handler', (QueryHTTPHandler,), {'batcher': batcher, 'index': index})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def unix_server(batcher: MicroBatcher, path: str, backpressure_timeout: Optional[float] = None,
+                max_in_flight: int = 256) -> socketserver.ThreadingUnixStreamServer:
+    handler = type('Handler', (QueryStreamHandler,),
+                   {'batcher': batcher, 'backpressure_timeout': backpressure_timeout,
+                    'max_in_flight': max_in_flight})
+    server = socketserver.ThreadingUnixStreamServer(path, handler)
+    server.daemon_threads = True
+    return server
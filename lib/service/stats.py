@@ -0,0 +1,40 @@
+import threading
+from bisect import bisect_left
+from collections import deque
+
+# Upper bounds of the latency histogram buckets, in milliseconds.
+HISTOGRAM_BOUNDS_MS = (0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+class LatencyRecorder:
+    """Keeps the latencies of the most recent requests and reports their percentiles."""
+
+    def __init__(self, window: int = 100_000):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+
+    def percentiles(self, qs=(50, 90, 99, 99.9)) -> dict[str, float]:
+        """Returns the requested percentiles of the recorded latencies in milliseconds."""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return {f'p{q:g}': 0.0 for q in qs}
+        last = len(samples) - 1
+        return {f'p{q:g}': 1000 * samples[min(last, round(q / 100 * last))] for q in qs}
+
+    def histogram(self, bounds_ms=HISTOGRAM_BOUNDS_MS) -> dict[str, int]:
+        """Counts the recorded latencies per bucket, keyed by the bucket's upper bound in ms."""
+        counts = [0] * (len(bounds_ms) + 1)
+        with self._lock:
+            for seconds in self._samples:
+                counts[bisect_left(bounds_ms, 1000 * seconds)] += 1
+        return {**{f'<={b:g}': c for b, c in zip(bounds_ms, counts)}, 'inf': counts[-1]}
+
+    def summary(self) -> dict:
+        return {'count': self.count, 'latency_ms': self.percentiles()}
@@ -0,0 +1,172 @@
+import argparse
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Optional
+
+import numpy as np
+
+from lib.index.flat import FlatIndex
+from lib.index.pool import QueryPool
+from lib.index.shared import SharedIndex
+from lib.point_location.geo.reader import read_polygons
+from lib.point_location.geo.shapes import Point
+from lib.point_location.kirkpatrick import MultiPolygonLocator
+from lib.service.batching import Recorder
+from lib.service.stats import LatencyRecorder
+
+# File layout: a header (magic, version, unix time of the first record) followed by
+# fixed size little endian records.
+MAGIC = b'SPQTRACE'
+HEADER = struct.Struct('<8sId')
+VERSION = 1
+RECORD = np.dtype([('t', '<f8'), ('start_x', '<f8'), ('start_y', '<f8'), ('end_x', '<f8'), ('end_y', '<f8')])
+
+
+class TraceRecorder(Recorder):
+    """
+        Appends (start, end) queries with the time they arrived, relative to the creation of
+        the recorder, to a binary trace file. Safe to share between threads.
+    """
+
+    def __init__(self, path: str, flush_every: int = 4096):
+        self._file = open(path, 'wb')
+        self._file.write(HEADER.pack(MAGIC, VERSION, time.time()))
+        self._origin = time.perf_counter()
+        self._buffer = np.empty(flush_every, dtype=RECORD)
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def record(self, start: Point, end: Point):
+        t = time.perf_counter() - self._origin
+        with self._lock:
+            self._buffer[self._size] = (t, start.x, start.y, end.x, end.y)
+            self._size += 1
+            if self._size == len(self._buffer):
+                self._flush()
+
+    def _flush(self):
+        self._file.write(self._buffer[:self._size].tobytes())
+        self._file.flush()
+        self._size = 0
+
+    def close(self):
+        with self._lock:
+            self._flush()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+def read_trace(path: str) -> np.ndarray:
+    """Returns the records of a trace file as a structured array (see RECORD)."""
+    with open(path, 'rb') as f:
+        magic, version, _ = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} query trace.")
+        return np.frombuffer(f.read(), dtype=RECORD)
+
+
+def replay(path: str, locator: MultiPolygonLocator, speed: float = 1.0, threads: int = 1,
+           processes: int = 0) -> dict:
+    """
+        Pushes a recorded trace through a locator and measures it.
+
+        Arguments:
+        path -- the trace file
+        locator -- the index to query
+        speed -- 1 replays at the recorded pace, 10 ten times faster, 0 as fast as possible
+        threads -- the number of threads answering the queries
+        processes -- if non zero, answer the queries in that many processes sharing the index instead
+
+        Returns: throughput, latency percentiles and a latency histogram. Latencies are
+        measured from the time a query was due, so they include queueing.
+    """
+    records = read_trace(path)
+    latency = LatencyRecorder(window=max(1, len(records)))
+
+    if processes:
+        shared = SharedIndex.create(FlatIndex.from_locator(locator))
+        executor = QueryPool(shared, processes)
+        pairs = np.column_stack((records['start_x'], records['start_y'], records['end_x'], records['end_y']))
+
+        def submit(i: int):
+            return executor.submit(pairs[i])
+    else:
+        shared = None
+        executor = ThreadPoolExecutor(max_workers=threads)
+
+        def submit(i: int):
+            r = records[i]
+            return executor.submit(locator.shortest_path, Point(float(r['start_x']), float(r['start_y'])),
+                                   Point(float(r['end_x']), float(r['end_y'])))
+
+    futures = []
+    begin = time.perf_counter()
+    try:
+        for i, t in enumerate(records['t'].tolist()):
+            if speed > 0:
+                due = begin + t / speed
+                if (delay := due - time.perf_counter()) > 0:
+                    time.sleep(delay)
+            else:
+                due = time.perf_counter()
+            future = submit(i)
+            future.add_done_callback(lambda _, due=due: latency.record(time.perf_counter() - due))
+            futures.append(future)
+        wait(futures)
+        elapsed = time.perf_counter() - begin
+    finally:
+        if shared is not None:
+            executor.close()
+            shared.close()
+        else:
+            executor.shutdown()
+
+    found = sum(_found(f.result()) for f in futures)
+    return {'requests': len(records), 'found': found, 'elapsed_s': elapsed,
+            'throughput_qps': len(records) / elapsed if elapsed else 0.0,
+            'latency_ms': latency.percentiles(), 'histogram_ms': latency.histogram()}
+
+
+def _found(result: Optional[dict] | list) -> int:
+    """Process workers answer with a list of one path, threads with the path itself."""
+    if isinstance(result, list):
+        result = result[0]
+    return result is not None
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m lib.service.trace')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    info = commands.add_parser('info', help='summarize a trace file')
+    info.add_argument('trace')
+
+    run = commands.add_parser('replay', help='replay a trace file against a shapefile')
+    run.add_argument('trace')
+    run.add_argument('--shapefile', default='data/GSHHS_c_L1.shp')
+    run.add_argument('--limit', type=int, default=None)
+    run.add_argument('--speed', type=float, default=1.0, help='1 is real time, 0 as fast as possible')
+    run.add_argument('--threads', type=int, default=1)
+    run.add_argument('--processes', type=int, default=0)
+
+    args = parser.parse_args()
+    if args.command == 'info':
+        records = read_trace(args.trace)
+        duration = float(records['t'][-1] - records['t'][0]) if len(records) else 0.0
+        print({'requests': len(records), 'duration_s': duration})
+        return
+
+    locator = MultiPolygonLocator()
+    locator.add_regions(read_polygons(args.shapefile, args.limit))
+    print(replay(args.trace, locator, args.speed, args.threads, args.processes))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,46 +1,61 @@
-import shapefile
-import matplotlib
-import matplotlib.pyplot as plt
-from matplotlib.backend_bases import MouseEvent
+import argparse
 
 from lib.point_location.kirkpatrick import MultiPolygonLocator
-from lib.point_location.geo.shapes import Point, Polygon
-
-matplotlib.use('TkAgg')
+from lib.point_location.geo.drawer import OutlineCollection, PathBlitter
+from lib.point_location.geo.reader import read_polygons
+from lib.point_location.geo.shapes import Point
+from lib.service.trace import TraceRecorder
 
 if __name__ == '__main__':
-    fig = plt.figure()
-
-    with shapefile.Reader(f'data/GSHHS_c_L1.shp') as reader:
-        shapes = reader.shapes()
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--record', default=None, help='record the clicked queries to this trace file')
+    args = parser.parse_args()
+    recorder = TraceRecorder(args.record) if args.record else None
 
     locator = MultiPolygonLocator()
 
-    continents_polygons = [Polygon([Point(p[0], p[1]) for p in island.points[:-1]]) for island in shapes[:10]]
+    continents_polygons = read_polygons('data/GSHHS_c_L1.shp', limit=10)
 
     skipped = locator.add_regions(continents_polygons)
 
-    for i, continent in enumerate(continents_polygons):
-        if i in skipped:
-            continue
-        plt.plot(continent.x, continent.y, 'b-')
+    # The GUI is imported once the index is built, the backend must be selected before pyplot.
+    import matplotlib
+    matplotlib.use('TkAgg')
+    import matplotlib.pyplot as plt
+    from matplotlib.backend_bases import MouseEvent
+
+    fig, ax = plt.subplots()
 
+    # All the outlines are a single artist, culled to the view when zooming or panning.
+    outlines = OutlineCollection(ax, [c for i, c in enumerate(continents_polygons) if i not in skipped],
+                                 colors='b', linewidths=1)
+    # Paths and clicked points are blitted, without redrawing the outlines.
+    blitter = PathBlitter(ax)
+
+    # The click flow keeps its own state, the locator is only queried.
+    first_point: Point | None = None
 
     def on_click(event: MouseEvent):
+        global first_point
         ex, ey = event.xdata, event.ydata
+        if ex is None or ey is None:
+            return
         point = Point(ex, ey)
         is_valid = False
-        if locator.has_first_point():
-            res = locator.get_shortest_path(point)
+        if first_point is not None:
+            if recorder is not None:
+                recorder.record(first_point, point)
+            res = locator.shortest_path(first_point, point)
             if res:
-                plt.plot(res['x'], res['y'], 'g-')
+                blitter.add(res['x'], res['y'], 'g-')
+                first_point = None
                 is_valid = True
-        elif locator.set_first_point(point):
+        elif locator.locate(point) is not None:
+            first_point = point
             is_valid = True
         if is_valid:
             msg = f'VALID: received user coordinates: {ex}, {ey}'
-            plt.plot(ex, ey, 'k.')
-            plt.show()
+            blitter.add([ex], [ey], 'k.')
         else:
             msg = f'INVALID: received user coordinates: {ex}, {ey}'
         print(msg)
@@ -50,3 +65,6 @@ if __name__ == '__main__':
     fig.canvas.mpl_connect('button_press_event', on_click)
 
     plt.show()
+
+    if recorder is not None:
+        recorder.close()
@@ -0,0 +1,29 @@
+import pytest
+
+from lib.index.flat import FlatIndex
+from lib.point_location.geo import generator
+from lib.point_location.geo.shapes import Polygon
+from lib.point_location.kirkpatrick import MultiPolygonLocator
+
+# The polygons most tests run on: one simply connected, one around a hole.
+POLYGONS = {
+    'simple': lambda: generator.random_simple_polygon(200, seed=5),
+    'hole': lambda: generator.random_polygon_with_hole(150, 40, seed=0),
+}
+
+
+@pytest.fixture(scope='session', params=sorted(POLYGONS))
+def polygon(request) -> Polygon:
+    return POLYGONS[request.param]()
+
+
+@pytest.fixture(scope='session')
+def locator(polygon) -> MultiPolygonLocator:
+    locator = MultiPolygonLocator()
+    locator.add_regions([polygon])
+    return locator
+
+
+@pytest.fixture(scope='session')
+def index(locator) -> FlatIndex:
+    return FlatIndex.from_locator(locator)
@@ -0,0 +1,51 @@
+import asyncio
+import time
+
+import pytest
+
+from lib.path_finding.funnel import path_length
+from lib.point_location.geo import generator
+from lib.point_location.geo.shapes import Point
+from lib.point_location.kirkpatrick import MultiPolygonLocator
+from lib.service.aio import AsyncLocator
+
+
+def _length(path: dict) -> float:
+    return path_length(list(zip(path['x'], path['y'])))
+
+
+def test_async_paths_are_those_of_the_flat_index(polygon, locator, index):
+    points = generator.sample_interior_points(polygon, 20, seed=1).tolist()
+    pairs = list(zip(points[:10], points[10:]))
+
+    async def main():
+        engine = AsyncLocator(locator, max_concurrency=4)
+        single = await asyncio.gather(*(engine.shortest_path(Point(*p), Point(*q), timeout=10) for p, q in pairs))
+        batch = await engine.shortest_paths([(Point(*p), Point(*q)) for p, q in pairs], timeout=10)
+        outside = await engine.shortest_path(Point(1e6, 1e6), Point(*points[0]))
+        return single, batch, outside
+
+    single, batch, outside = asyncio.run(main())
+    assert outside is None
+    for (p, q), a, b in zip(pairs, single, batch):
+        expected = _length(index.shortest_path(p, q))
+        assert abs(_length(a) - expected) < 1e-9 and abs(_length(b) - expected) < 1e-9
+
+
+def test_timed_out_build_is_cancelled_and_frees_its_slot():
+    polygon = generator.random_simple_polygon(5000, seed=1)
+    start = time.perf_counter()
+    MultiPolygonLocator().add_regions([polygon])
+    full = time.perf_counter() - start
+
+    async def main():
+        engine = AsyncLocator(MultiPolygonLocator(), max_concurrency=1)
+        start = time.perf_counter()
+        with pytest.raises(asyncio.TimeoutError):
+            await engine.add_regions([polygon], timeout=0.05)
+        # The only slot is held until the build on the executor stops at its next checkpoint.
+        await engine.locate(Point(0.0, 0.0), timeout=5)
+        return time.perf_counter() - start
+
+    # The cancelled build stops at its next checkpoint instead of running to the end.
+    assert asyncio.run(main()) < full / 2
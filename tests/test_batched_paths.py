@@ -0,0 +1,36 @@
+import numpy as np
+
+from lib.path_finding.funnel import from_ragged, path_length
+from lib.point_location.geo import generator
+from lib.point_location.geo.shapes import Point
+
+
+def _length(path: dict) -> float:
+    return path_length(list(zip(path['x'], path['y'])))
+
+
+def test_batches_answer_like_single_queries(polygon, locator, index):
+    starts = generator.sample_interior_points(polygon, 100, seed=1)
+    ends = generator.sample_interior_points(polygon, 100, seed=2)
+    # Queries sharing both triangles, and points outside.
+    starts[50:60], ends[50:60] = starts[0], ends[0] + 1e-9
+    starts[70, :] = 1e6
+    ends[80, :] = -1e6
+
+    for engine in (index, locator):
+        coordinates, offsets = engine.shortest_paths(starts, ends)
+        assert coordinates.shape == (offsets[-1], 2) and offsets.dtype == np.int64
+        for p, q, path in zip(starts.tolist(), ends.tolist(), from_ragged(coordinates, offsets)):
+            expected = index.shortest_path(p, q)
+            if expected is None:
+                assert path is None
+                continue
+            assert (path['x'][0], path['y'][0]) == tuple(p) and (path['x'][-1], path['y'][-1]) == tuple(q)
+            assert abs(_length(path) - _length(expected)) < 1e-9
+            assert abs(_length(path) - _length(locator.shortest_path(Point(*p), Point(*q)))) < 1e-9
+
+
+def test_empty_batch(locator, index):
+    for engine in (index, locator):
+        coordinates, offsets = engine.shortest_paths(np.empty((0, 2)), np.empty((0, 2)))
+        assert coordinates.shape == (0, 2) and offsets.tolist() == [0]
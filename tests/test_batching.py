@@ -0,0 +1,34 @@
+import subprocess
+import sys
+
+from lib.point_location.geo.shapes import Point
+from lib.service.batching import MicroBatcher, Recorder
+from lib.service.trace import TraceRecorder, read_trace
+
+
+def test_batching_does_not_import_the_trace_or_the_pool():
+    code = 'import sys, lib.service.batching; print(" ".join(sorted(sys.modules)))'
+    loaded = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout.split()
+    for module in ('lib.service.trace', 'lib.index.pool', 'lib.index.shared'):
+        assert module not in loaded
+
+
+def test_submitted_requests_reach_the_recorder(tmp_path):
+    class Gather(Recorder):
+        def __init__(self):
+            self.requests = []
+
+        def record(self, start: Point, end: Point):
+            self.requests.append((start.x, start.y, end.x, end.y))
+
+    gather = Gather()
+    with TraceRecorder(str(tmp_path / 'queries.trace')) as trace:
+        for recorder in (gather, trace):
+            batcher = MicroBatcher(lambda pairs: [None] * len(pairs), recorder=recorder)
+            for i in range(5):
+                batcher.query(Point(i, 0), Point(0, i))
+            batcher.close()
+    expected = [(float(i), 0.0, 0.0, float(i)) for i in range(5)]
+    assert gather.requests == expected
+    records = read_trace(str(tmp_path / 'queries.trace'))
+    assert list(zip(*(records[f].tolist() for f in ('start_x', 'start_y', 'end_x', 'end_y')))) == expected
@@ -0,0 +1,38 @@
+import numpy as np
+
+from lib.path_finding.funnel import segment_distance
+from lib.point_location.geo import generator
+from lib.point_location.geo.shapes import Point
+from lib.point_location.kirkpatrick import MultiPolygonLocator
+
+
+def test_disk_paths_keep_the_radius_from_the_boundary():
+    polygon = generator.random_simple_polygon(300, seed=7)
+    locator = MultiPolygonLocator()
+    locator.add_regions([polygon])
+    points = [(p.x, p.y) for p in polygon.points]
+    edges = list(zip(points, points[1:] + points[:1]))
+    radius = 3.0
+
+    def boundary_distance(p) -> float:
+        return min(segment_distance(p, a, b) for a, b in edges)
+
+    samples = generator.sample_interior_points(polygon, 300, seed=1).tolist()
+    clear = [p for p in samples if boundary_distance(p) >= radius]
+    near = [p for p in samples if boundary_distance(p) < radius]
+    assert locator.shortest_path(Point(*near[0]), Point(*clear[0]), radius=radius) is None
+
+    rng = np.random.default_rng(0)
+    found = 0
+    for _ in range(100):
+        start, end = clear[rng.integers(len(clear))], clear[rng.integers(len(clear))]
+        if (path := locator.shortest_path(Point(*start), Point(*end), radius=radius)) is None:
+            continue
+        found += 1
+        path = list(zip(path['x'], path['y']))
+        for p, q in zip(path, path[1:]):
+            # The legs do not cross the boundary, so the closest points include an endpoint.
+            distance = min(min(segment_distance(p, a, b), segment_distance(q, a, b),
+                               segment_distance(a, p, q), segment_distance(b, p, q)) for a, b in edges)
+            assert distance >= radius * (1 - 1e-6)
+    assert found > 90
@@ -0,0 +1,70 @@
+import os
+import struct
+
+import numpy as np
+
+from lib import cli
+from lib.index.flat import FlatIndex
+from lib.path_finding.funnel import path_length
+from lib.point_location.geo import generator
+from lib.point_location.geo.reader import read_polygons
+
+DATA = os.path.join(os.path.dirname(__file__), os.pardir, 'data')
+
+
+def _length(path: dict) -> float:
+    return path_length(list(zip(path['x'], path['y'])))
+
+
+def _read_paths(path: str) -> list[list[tuple[float, float]]]:
+    paths = []
+    with open(path, 'rb') as f:
+        while header := f.read(cli.PATH_HEADER.size):
+            n, = cli.PATH_HEADER.unpack(header)
+            coordinates = struct.unpack(f'<{2 * n}d', f.read(16 * n))
+            paths.append(list(zip(coordinates[0::2], coordinates[1::2])))
+    return paths
+
+
+def test_query_files_answer_like_the_index(polygon, index, tmp_path):
+    index.save(str(tmp_path / 'index'))
+    pairs = np.hstack((generator.sample_interior_points(polygon, 30, seed=1),
+                       generator.sample_interior_points(polygon, 30, seed=2)))
+    pairs[7, :2] = 1e6
+    with open(tmp_path / 'pairs.csv', 'w') as f:
+        f.write('sx,sy,ex,ey\n')
+        f.writelines(','.join(map(repr, row)) + '\n' for row in pairs.tolist())
+    expected = [index.shortest_path(p[:2], p[2:]) for p in pairs.tolist()]
+
+    assert cli.query(str(tmp_path / 'index'), str(tmp_path / 'pairs.csv'), str(tmp_path / 'paths.bin'),
+                     chunk_size=8) == 30
+    for path, answer in zip(_read_paths(str(tmp_path / 'paths.bin')), expected):
+        assert path == ([] if answer is None else list(zip(answer['x'], answer['y'])))
+
+    cli.query(str(tmp_path / 'index'), str(tmp_path / 'pairs.csv'), str(tmp_path / 'paths.csv'), chunk_size=8)
+    with open(tmp_path / 'paths.csv') as f:
+        rows = [line.rstrip('\n').split(',') for line in f]
+    assert [int(row[0]) for row in rows] == list(range(30))
+    for row, answer in zip(rows, expected):
+        assert row[1] == 'nan' if answer is None else abs(float(row[1]) - _length(answer)) < 1e-9
+
+
+def test_build_then_run_across_workers(tmp_path):
+    shapefile = os.path.join(DATA, 'GSHHS_c_L1.shp')
+    assert cli.main(['build', shapefile, str(tmp_path / 'index'), '--limit', '3', '--workers', '2']) == 0
+    index = FlatIndex.load(str(tmp_path / 'index'))
+    assert len(index.polygon_bounds) == 3 and index.next_hop is not None
+
+    polygons = list(read_polygons(shapefile, 3))
+    pairs = np.vstack([np.hstack((generator.sample_interior_points(p, 20, seed=1),
+                                  generator.sample_interior_points(p, 20, seed=2))) for p in polygons])
+    # Pairs across two polygons have no path.
+    pairs[::7, 2:] = pairs[::-7, 2:]
+    np.save(tmp_path / 'pairs.npy', pairs)
+    assert cli.main(['run', str(tmp_path / 'index'), str(tmp_path / 'pairs.npy'), str(tmp_path / 'lengths.bin'),
+                     '--distances', '--chunk-size', '7', '--workers', '2']) == 0
+    lengths = np.fromfile(tmp_path / 'lengths.bin', dtype='<f8')
+    expected = [np.nan if (path := index.shortest_path(p[:2], p[2:])) is None else _length(path)
+                for p in pairs.tolist()]
+    assert np.isnan(expected).any()
+    assert np.allclose(lengths, expected, rtol=0, atol=1e-9, equal_nan=True)
@@ -0,0 +1,38 @@
+import subprocess
+import sys
+
+from benchmarks import suite
+
+MIB = 2 ** 20
+
+
+def _report(stages: dict) -> dict:
+    return {'meta': {}, 'results': {'coastline-1000': {
+        stage: {'median_s': median_s, 'peak_bytes': peak_bytes} for stage, (median_s, peak_bytes) in stages.items()}}}
+
+
+def test_memory_and_time_regressions_are_flagged_apart(tmp_path):
+    baseline = _report({'locate': (0.010, 4 * MIB), 'funnel': (0.020, 2 * MIB), 'corridor': (0.005, 20_000),
+                         'walk': (0.010, 1 * MIB)})
+    current = _report({
+        'locate': (0.010, 6 * MIB),      # 50% more memory, same time
+        'funnel': (0.021, 2 * MIB),      # 5% slower, same memory
+        'corridor': (0.005, 40_000),     # twice the memory, but under MEMORY_SLACK_BYTES
+        'walk': (0.013, 1 * MIB),        # 30% slower, same memory
+    })
+    suite.save(baseline, str(tmp_path / 'baseline.json'))
+    suite.save(current, str(tmp_path / 'current.json'))
+
+    regressions = suite.compare(suite.load(str(tmp_path / 'baseline.json')), suite.load(str(tmp_path / 'current.json')),
+                                threshold=0.10, memory_threshold=0.10)
+    assert regressions == [('coastline-1000', 'locate', 'peak_bytes', 4 * MIB, 6 * MIB),
+                           ('coastline-1000', 'walk', 'median_s', 0.010, 0.013)]
+
+    def run(*args: str) -> subprocess.CompletedProcess:
+        return subprocess.run([sys.executable, '-m', 'benchmarks', 'compare', *args], capture_output=True, text=True)
+
+    flagged = run(str(tmp_path / 'baseline.json'), str(tmp_path / 'current.json'))
+    assert flagged.returncode == 1 and 'locate: peak' in flagged.stdout and 'funnel' not in flagged.stdout
+    allowed = run(str(tmp_path / 'baseline.json'), str(tmp_path / 'current.json'),
+                  '--threshold', '0.5', '--memory-threshold', '0.6')
+    assert allowed.returncode == 0 and 'No regressions.' in allowed.stdout
@@ -0,0 +1,42 @@
+import numpy as np
+
+from lib.index.pool import QueryPool
+from lib.index.shared import SharedIndex
+from lib.index.tree import distance_matrix
+from lib.path_finding.funnel import path_length
+from lib.point_location.geo import generator
+from lib.point_location.geo.shapes import Point
+
+
+def _length(path: dict) -> float:
+    return path_length(list(zip(path['x'], path['y'])))
+
+
+def _expected(index, sources, targets) -> np.ndarray:
+    return np.array([[_length(index.shortest_path(s, t)) for t in targets.tolist()] for s in sources.tolist()])
+
+
+def test_matrix_matches_shortest_paths(polygon, index):
+    sources = generator.sample_interior_points(polygon, 8, seed=1)
+    targets = generator.sample_interior_points(polygon, 25, seed=2)
+    outside = np.array([[1e6, 1e6]])
+    result = distance_matrix(index, np.vstack((sources, outside)), targets)
+    assert np.allclose(result[:-1], _expected(index, sources, targets), rtol=0, atol=1e-9)
+    assert np.isinf(result[-1]).all()
+
+
+def test_pool_matrix_matches_shortest_paths(polygon, index):
+    sources = generator.sample_interior_points(polygon, 4, seed=3)
+    targets = generator.sample_interior_points(polygon, 10, seed=4)
+    with SharedIndex.create(index) as shared, QueryPool(shared, processes=2) as pool:
+        result = pool.distance_matrix(sources, targets)
+    assert np.allclose(result, _expected(index, sources, targets), rtol=0, atol=1e-9)
+
+
+def test_ordered_route_legs_are_matrix_distances(polygon, index, locator):
+    points = generator.sample_interior_points(polygon, 8, seed=5)
+    route = locator.route([Point(x, y) for x, y in points.tolist()], optimize_order=True)
+    order = route['order']
+    assert order[0] == 0 and sorted(order) == list(range(8))
+    distances = distance_matrix(index, points, points)
+    assert np.allclose(route['legs'], [distances[a, b] for a, b in zip(order, order[1:])], rtol=0, atol=1e-9)
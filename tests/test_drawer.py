@@ -0,0 +1,43 @@
+import matplotlib
+
+matplotlib.use('Agg')
+
+import matplotlib.pyplot as plt
+import numpy as np
+
+from lib.point_location.geo import generator
+from lib.point_location.geo.drawer import OutlineCollection, PathBlitter
+
+
+def test_outlines_outside_the_view_are_culled():
+    shapes = [generator.random_simple_polygon(30, seed=i, radius=1.0, center=(10.0 * i, 0.0)) for i in range(5)]
+    fig, ax = plt.subplots()
+    try:
+        outlines = OutlineCollection(ax, shapes)
+        assert len(outlines.collection.get_segments()) == 5
+        ax.set_xlim(15.0, 25.0)
+        segments = outlines.collection.get_segments()
+        assert len(segments) == 1 and np.array_equal(segments[0], shapes[2].coordinates)
+    finally:
+        plt.close(fig)
+
+
+def test_blitted_paths_are_the_query_paths(polygon, index):
+    fig, ax = plt.subplots()
+    try:
+        OutlineCollection(ax, [polygon])
+        blitter = PathBlitter(ax)
+        points = generator.sample_interior_points(polygon, 4, seed=1).tolist()
+        paths = [index.shortest_path(points[0], points[1]), index.shortest_path(points[2], points[3])]
+        # Before the first draw the line waits for it, afterwards it is blitted over the background.
+        first = blitter.add(paths[0]['x'], paths[0]['y'])
+        fig.canvas.draw()
+        assert blitter.background is not None
+        background = blitter.background
+        second = blitter.add(paths[1]['x'], paths[1]['y'], 'r-')
+        assert blitter.background is not background
+        for line, path in zip((first, second), paths):
+            assert list(line.get_xdata()) == list(path['x']) and list(line.get_ydata()) == list(path['y'])
+            assert not line.get_animated()
+    finally:
+        plt.close(fig)
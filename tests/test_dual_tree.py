@@ -0,0 +1,67 @@
+from collections import deque
+
+import numpy as np
+
+from lib.index.flat import FlatIndex
+from lib.index.visibility import VisibilityIndex
+from lib.path_finding.dual_tree import DualTree
+from lib.path_finding.funnel import path_length, shortest_pull
+from lib.point_location.geo import generator
+from lib.point_location.kirkpatrick import MultiPolygonLocator
+
+
+def _bfs(neighbors: np.ndarray, t1: int, t2: int) -> list[int]:
+    parents, queue = {t1: -1}, deque((t1,))
+    while (t := queue.popleft()) != t2:
+        for n in neighbors[t].tolist():
+            if n >= 0 and n not in parents:
+                parents[n] = t
+                queue.append(n)
+    path = []
+    while t != -1:
+        path.append(t)
+        t = parents[t]
+    return path[::-1]
+
+
+def test_corridors_follow_the_tree_and_go_both_ways_round_a_hole(polygon, index):
+    dual = DualTree(index.neighbors)
+    simple = not polygon.hole
+    assert dual.acyclic.tolist() == [simple] and dual.holes.tolist() == [0 if simple else 1]
+    assert dual.cycle.any() != simple
+
+    rng = np.random.default_rng(0)
+    for t1, t2 in rng.integers(len(index.triangles), size=(300, 2)).tolist():
+        corridor = dual.corridor(t1, t2)
+        assert corridor[0] == t1 and corridor[-1] == t2 and len(set(corridor)) == len(corridor)
+        assert all(b in index.neighbors[a] for a, b in zip(corridor, corridor[1:]))
+        assert dual.hops(t1, t2) == len(corridor) - 1
+        assert dual.lca(t1, t2) == min(corridor, key=lambda t: dual.depth[t])
+        options = dual.corridors(t1, t2)
+        if simple:
+            assert options == [corridor] == [_bfs(index.neighbors, t1, t2)]
+        else:
+            assert 1 <= len(options) <= 2 and options[0] == corridor
+            assert all(len(set(c)) == len(c) and c[0] == t1 and c[-1] == t2 for c in options)
+
+
+def test_shortest_corridor_gives_the_exact_path(polygon, index):
+    exact = VisibilityIndex(index)
+    starts = generator.sample_interior_points(polygon, 100, seed=1).tolist()
+    ends = generator.sample_interior_points(polygon, 100, seed=2).tolist()
+    for p, q in zip(starts, ends):
+        options = [index.portals(c) for c in index.dual.corridors(index.locate(*p), index.locate(*q))]
+        path = exact.shortest_path(p, q)
+        assert abs(path_length(shortest_pull(options, tuple(p), tuple(q)))
+                   - path_length(list(zip(path['x'], path['y'])))) < 1e-6
+
+
+def test_parts_are_not_connected():
+    locator = MultiPolygonLocator()
+    locator.add_regions([generator.random_simple_polygon(50, seed=1, radius=10.0),
+                         generator.random_simple_polygon(50, seed=2, radius=10.0, center=(50.0, 0.0))])
+    index = FlatIndex.from_locator(locator)
+    dual = DualTree(index.neighbors)
+    a, b = int(np.flatnonzero(index.polygon == 0)[0]), int(np.flatnonzero(index.polygon == 1)[0])
+    assert dual.component[a] != dual.component[b]
+    assert dual.corridor(a, b) is None and dual.hops(a, b) is None and dual.corridors(a, b) == []
@@ -0,0 +1,57 @@
+from lib.index.flat import FlatIndex
+from lib.index.visibility import VisibilityIndex
+from lib.path_finding.funnel import path_length, segment_distance
+from lib.point_location.geo import generator
+from lib.point_location.geo.shapes import Point
+from lib.point_location.kirkpatrick import MultiPolygonLocator
+
+
+def length(path: dict) -> float:
+    return path_length(list(zip(path['x'], path['y'])))
+
+
+def test_polygons_with_a_hole_are_located():
+    for seed in range(10):
+        polygon = generator.random_polygon_with_hole(100, 25, seed=seed)
+        locator = MultiPolygonLocator()
+        locator.add_regions([polygon])
+        # The rings are drawn around the origin, which is inside the hole.
+        assert locator.locate(Point(0.0, 0.0)) is None
+        for x, y in generator.sample_interior_points(polygon, 20, seed=seed).tolist():
+            assert locator.locate(Point(x, y)) is not None
+
+
+def test_paths_go_the_shorter_way_around_the_hole():
+    polygon = generator.random_polygon_with_hole(200, 50, seed=0)
+    locator = MultiPolygonLocator()
+    locator.add_regions([polygon])
+    index = FlatIndex.from_locator(locator)
+    exact = VisibilityIndex(index)
+    starts = generator.sample_interior_points(polygon, 200, seed=1).tolist()
+    ends = generator.sample_interior_points(polygon, 200, seed=2).tolist()
+    for start, end in zip(starts, ends):
+        assert abs(length(index.shortest_path(start, end)) - length(exact.shortest_path(start, end))) < 1e-6
+
+
+def test_disk_paths_around_the_hole_keep_the_radius_from_the_boundary():
+    polygon = generator.random_polygon_with_hole(200, 50, seed=1)
+    locator = MultiPolygonLocator()
+    locator.add_regions([polygon])
+    edges = []
+    for ring in (polygon.points, polygon.hole):
+        points = [(p.x, p.y) for p in ring]
+        edges.extend(zip(points, points[1:] + points[:1]))
+    radius = 1.0
+
+    samples = generator.sample_interior_points(polygon, 200, seed=3).tolist()
+    found = 0
+    for start, end in zip(samples[:100], samples[100:]):
+        if (path := locator.shortest_path(Point(*start), Point(*end), radius=radius)) is None:
+            continue
+        found += 1
+        path = list(zip(path['x'], path['y']))
+        for p, q in zip(path, path[1:]):
+            distance = min(min(segment_distance(p, a, b), segment_distance(q, a, b),
+                               segment_distance(a, p, q), segment_distance(b, p, q)) for a, b in edges)
+            assert distance >= radius * (1 - 1e-6)
+    assert found > 50
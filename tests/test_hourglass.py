@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from lib import cli
+from lib.index.hourglass import HourglassIndex
+from lib.path_finding.funnel import path_length
+from lib.point_location.geo import generator
+
+
+def _length(path: dict) -> float:
+    return path_length(list(zip(path['x'], path['y'])))
+
+
+def test_hourglass_paths_or_refused_around_a_hole(polygon, index):
+    if len(index.dual.chords):
+        with pytest.raises(ValueError):
+            HourglassIndex(index)
+        return
+    engine = HourglassIndex(index)
+    starts = generator.sample_interior_points(polygon, 100, seed=1).tolist()
+    ends = generator.sample_interior_points(polygon, 100, seed=2).tolist()
+    for start, end in zip(starts, ends):
+        assert abs(_length(engine.shortest_path(start, end)) - _length(index.shortest_path(start, end))) < 1e-9
+
+
+def test_cli_hourglass_engine_matches_the_funnel(polygon, index, tmp_path):
+    index.save(str(tmp_path / 'index'))
+    pairs = np.hstack((generator.sample_interior_points(polygon, 50, seed=3),
+                       generator.sample_interior_points(polygon, 50, seed=4)))
+    np.save(tmp_path / 'pairs.npy', pairs)
+    for engine in ('funnel', 'hourglass'):
+        cli.query(str(tmp_path / 'index'), str(tmp_path / 'pairs.npy'), str(tmp_path / f'{engine}.bin'),
+                  distances=True, engine=engine)
+    funnel, hourglass = (np.fromfile(tmp_path / f'{engine}.bin', dtype='<f8') for engine in ('funnel', 'hourglass'))
+    expected = [_length(index.shortest_path(p[:2], p[2:])) for p in pairs.tolist()]
+    assert np.allclose(funnel, expected, rtol=0, atol=1e-9)
+    assert np.allclose(hourglass, expected, rtol=0, atol=1e-9)
@@ -0,0 +1,7 @@
+from benchmarks import suite
+
+
+def test_locator_imports_within_budget_without_heavy_modules():
+    result = suite.import_time(['lib.point_location.kirkpatrick'], repeat=3)
+    assert result['heavy'] == []
+    assert result['median_s'] * 1000 <= suite.IMPORT_BUDGET_MS
@@ -0,0 +1,41 @@
+import os
+
+import numpy as np
+
+from lib.index.flat import FlatIndex
+from lib.index.visibility import VisibilityIndex
+from lib.path_finding.funnel import from_ragged, path_length
+from lib.point_location.geo import generator
+from lib.point_location.geo.reader import read_polygons
+from lib.point_location.geo.shapes import Point
+from lib.point_location.kirkpatrick import MultiPolygonLocator
+
+DATA = os.path.join(os.path.dirname(__file__), os.pardir, 'data')
+
+
+def _length(path: dict) -> float:
+    return path_length(list(zip(path['x'], path['y'])))
+
+
+def test_locator_paths_are_those_of_the_flat_index(polygon, locator, index):
+    starts = generator.sample_interior_points(polygon, 500, seed=1)
+    ends = generator.sample_interior_points(polygon, 500, seed=2)
+    expected = [_length(index.shortest_path(p, q)) for p, q in zip(starts.tolist(), ends.tolist())]
+
+    single = [_length(locator.shortest_path(Point(*p), Point(*q))) for p, q in zip(starts.tolist(), ends.tolist())]
+    batch = [_length(path) for path in from_ragged(*locator.shortest_paths(starts, ends))]
+    assert np.allclose(single, expected, rtol=0, atol=1e-9)
+    assert np.allclose(batch, expected, rtol=0, atol=1e-9)
+
+
+def test_coastline_pair_of_the_old_funnel():
+    # The first GSHHS shape, where the funnel of the DCEL gave 108.05 for this pair.
+    polygon = next(iter(read_polygons(os.path.join(DATA, 'GSHHS_c_L1.shp'), 1)))
+    locator = MultiPolygonLocator()
+    locator.add_regions([polygon])
+    index = FlatIndex.from_locator(locator)
+    start, end = (98.03316500953086, 60.83979033361434), (14.641276429730182, 66.04970142175225)
+    exact = _length(VisibilityIndex(index).shortest_path(start, end))
+    assert abs(exact - 83.63025449019389) < 1e-6
+    assert abs(_length(locator.shortest_path(Point(*start), Point(*end))) - exact) < 1e-9
+    assert abs(_length(index.shortest_path(start, end)) - exact) < 1e-9
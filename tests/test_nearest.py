@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from lib.index.flat import FlatIndex
+from lib.index.tree import CandidateSet, nearest
+from lib.path_finding.funnel import path_length
+from lib.point_location.geo import generator
+from lib.point_location.geo.shapes import Point
+from lib.point_location.kirkpatrick import MultiPolygonLocator
+
+
+def _length(path: dict) -> float:
+    return path_length(list(zip(path['x'], path['y'])))
+
+
+def test_nearest_candidates_by_shortest_path(polygon, index):
+    points = generator.sample_interior_points(polygon, 60, seed=1)
+    candidates = CandidateSet(index, np.vstack((points, [[1e6, 1e6]])))
+    for origin in generator.sample_interior_points(polygon, 10, seed=2).tolist():
+        expected = sorted((_length(index.shortest_path(origin, p)), c) for c, p in enumerate(points.tolist()))
+        found = nearest(index, origin, candidates, k=5)
+        assert [c for c, _ in found] == [c for _, c in expected[:5]]
+        assert np.allclose([d for _, d in found], [d for d, _ in expected[:5]], rtol=0, atol=1e-9)
+
+
+def test_nearest_outside_or_too_many(polygon, index, locator):
+    points = generator.sample_interior_points(polygon, 6, seed=3)
+    candidates = locator.register_candidates(points)
+    assert locator.nearest(Point(1e6, 1e6), candidates) == []
+    origin = generator.sample_interior_points(polygon, 1, seed=4)[0]
+    assert sorted(c for c, _ in locator.nearest(Point(*origin), candidates, k=10)) == list(range(6))
+
+
+def test_candidates_of_other_polygons_are_never_returned():
+    polygons = [generator.random_simple_polygon(80, seed=1, radius=10.0),
+                generator.random_polygon_with_hole(80, 20, seed=2, radius=10.0, center=(30.0, 0.0))]
+    locator = MultiPolygonLocator()
+    locator.add_regions(polygons)
+    index = locator.flat_index()
+    points = np.vstack([generator.sample_interior_points(p, 30, seed=3) for p in polygons])
+    candidates = locator.register_candidates(points)
+    for polygon, members in zip(polygons, (range(30), range(30, 60))):
+        for origin in generator.sample_interior_points(polygon, 5, seed=4).tolist():
+            found = locator.nearest(Point(*origin), candidates, k=40)
+            assert sorted(c for c, _ in found) == list(members)
+            for c, d in found:
+                assert abs(d - _length(index.shortest_path(origin, points[c].tolist()))) < 1e-9
+
+    with pytest.raises(ValueError):
+        nearest(FlatIndex.from_locator(locator), (0.0, 0.0), candidates)
@@ -0,0 +1,32 @@
+import numpy as np
+
+from lib.index.flat import FlatIndex
+from lib.path_finding.funnel import from_ragged, path_length
+from lib.point_location.geo import generator
+
+
+def _length(path: dict) -> float:
+    return path_length(list(zip(path['x'], path['y'])))
+
+
+def test_saved_tables_give_the_same_corridors_and_paths(polygon, index, tmp_path):
+    tables = index.with_next_hops(max_triangles=len(index.triangles), processes=2)
+    assert np.array_equal(tables.next_hop, index.with_next_hops(max_triangles=len(index.triangles)).next_hop)
+    tables.save(str(tmp_path / 'index'))
+    loaded = FlatIndex.load(str(tmp_path / 'index'))
+    assert isinstance(loaded.next_hop, np.memmap) and np.array_equal(loaded.next_hop, tables.next_hop)
+    # Polygons over the limit get no table.
+    assert index.with_next_hops(max_triangles=len(index.triangles) - 1).next_hop.size == 0
+
+    rng = np.random.default_rng(0)
+    for t1, t2 in rng.integers(len(index.triangles), size=(200, 2)).tolist():
+        corridor = loaded.corridor(t1, t2)
+        assert corridor[0] == t1 and corridor[-1] == t2
+        assert all(b in loaded.neighbors[a] for a, b in zip(corridor, corridor[1:]))
+        if index.dual.covers(t1):
+            assert corridor == index.corridor(t1, t2)
+
+    starts = generator.sample_interior_points(polygon, 200, seed=1)
+    ends = generator.sample_interior_points(polygon, 200, seed=2)
+    for p, q, path in zip(starts.tolist(), ends.tolist(), from_ragged(*loaded.shortest_paths(starts, ends))):
+        assert abs(_length(path) - _length(index.shortest_path(p, q))) < 1e-9
@@ -0,0 +1,36 @@
+import numpy as np
+
+from lib.index.oracle import DistanceOracle
+from lib.path_finding.funnel import path_length
+from lib.point_location.geo import generator
+
+
+def test_estimates_stay_within_the_bound(polygon, index):
+    oracle = DistanceOracle(index, epsilon=0.1)
+    starts = generator.sample_interior_points(polygon, 300, seed=1)
+    ends = generator.sample_interior_points(polygon, 300, seed=2)
+    exact = np.array([path_length(list(zip(path['x'], path['y'])))
+                      for path in (index.shortest_path(p, q) for p, q in zip(starts.tolist(), ends.tolist()))])
+
+    single = np.array([oracle.approx_distance(p, q) for p, q in zip(starts.tolist(), ends.tolist())])
+    batch = oracle.approx_distances(np.vstack((starts, [[1e6, 1e6]])), np.vstack((ends, ends[:1])))
+    assert np.isinf(batch[-1])
+    for estimate in (single, batch[:-1]):
+        assert (estimate >= exact * (1 - 1e-9)).all()
+        assert (estimate <= exact * (1 + 0.1) + 1e-9).all()
+    assert np.allclose(single, batch[:-1], rtol=1e-12, atol=0)
+
+    for (p, q), d in zip(zip(starts.tolist(), ends.tolist()), exact):
+        lower, upper = oracle.bounds(p, q)
+        assert lower <= d * (1 + 1e-9) and d <= upper * (1 + 1e-9)
+
+
+def test_polygons_with_a_hole_are_answered_exactly(polygon, index):
+    oracle = DistanceOracle(index)
+    starts = generator.sample_interior_points(polygon, 50, seed=3)
+    ends = generator.sample_interior_points(polygon, 50, seed=4)
+    oracle.approx_distances(starts, ends)
+    if index.dual.acyclic.all():
+        assert oracle.certified > 0
+    else:
+        assert oracle.certified == 0 and oracle.fallbacks > 0
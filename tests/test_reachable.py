@@ -0,0 +1,64 @@
+import numpy as np
+
+from lib.index.tree import ShortestPathTree, reachable_within
+from lib.path_finding.funnel import path_length
+from lib.point_location.geo import generator
+from lib.point_location.geo.shapes import Point
+
+
+def _length(path: dict) -> float:
+    return path_length(list(zip(path['x'], path['y'])))
+
+
+def _area(part: list) -> float:
+    return sum(ax * by - bx * ay for (ax, ay), (bx, by) in zip(part, part[1:] + part[:1])) / 2
+
+
+def _inside(part: list, point: tuple[float, float]) -> bool:
+    x, y = point
+    return all((bx - ax) * (y - ay) - (by - ay) * (x - ax) >= -1e-9
+               for (ax, ay), (bx, by) in zip(part, part[1:] + part[:1]))
+
+
+def test_region_holds_the_points_within_the_distance(polygon, index):
+    origin = generator.sample_interior_points(polygon, 1, seed=1)[0].tolist()
+    samples = generator.sample_interior_points(polygon, 400, seed=2).tolist()
+    distances = np.array([_length(index.shortest_path(origin, p)) for p in samples])
+    max_distance = float(np.quantile(distances, 0.9))
+    triangles, parts = reachable_within(index, origin, max_distance, segments=64)
+    assert len(set(triangles)) == len(triangles)
+
+    within = 0
+    for point, d in zip(samples, distances):
+        inside = any(_inside(part, point) for part in parts)
+        if d <= max_distance * 0.995:
+            within += 1
+            assert inside and index.locate(*point) in triangles
+        elif d > max_distance * 1.001:
+            assert not inside
+    assert within > 100
+
+
+def test_nothing_is_reachable_from_outside(index):
+    assert reachable_within(index, (1e6, 1e6), 10.0) == ([], [])
+
+
+def test_regions_grow_with_the_distance(polygon, index, locator):
+    origin = generator.sample_interior_points(polygon, 1, seed=3)[0].tolist()
+    # The farthest points of a polygon are corners.
+    far = float(np.max(ShortestPathTree(index, origin).distance))
+    reached, areas = [], []
+    for max_distance in (0.0, far / 8, far / 2, far * 1.01):
+        result = locator.reachable_within(Point(*origin), max_distance)
+        reached.append({tuple(zip(t['x'], t['y'])) for t in result['triangles']})
+        areas.append(sum(_area(list(zip(part['x'], part['y']))) for part in result['region']))
+    assert all(a <= b for a, b in zip(reached, reached[1:])) and all(a < b for a, b in zip(areas, areas[1:]))
+    # Beyond the farthest point the region is the whole polygon.
+    assert len(reached[-1]) == len(index.triangles)
+    total = sum(_area(c.tolist()) for c in index.vertices[index.triangles])
+    if polygon.hole:
+        # The parts of a triangle reached both ways round the hole overlap.
+        assert areas[-1] > total
+    else:
+        assert abs(areas[-1] - total) < 1e-6 * total
+    assert locator.reachable_within(Point(1e6, 1e6), far) is None
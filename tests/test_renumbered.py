@@ -0,0 +1,15 @@
+import numpy as np
+
+from lib.index.flat import FlatIndex
+from lib.path_finding.funnel import from_ragged, path_length
+from lib.point_location.geo import generator
+
+
+def test_renumbered_index_answers_the_same(polygon, locator, index):
+    morton = FlatIndex.from_locator(locator, renumber=True)
+    assert len(morton.triangles) == len(index.triangles)
+    starts = generator.sample_interior_points(polygon, 200, seed=1)
+    ends = generator.sample_interior_points(polygon, 200, seed=2)
+    lengths = [[path_length(list(zip(p['x'], p['y']))) for p in from_ragged(*flat.shortest_paths(starts, ends))]
+               for flat in (index, morton)]
+    assert np.allclose(*lengths, rtol=0, atol=1e-9)
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from lib.index.route import route
+from lib.path_finding.funnel import path_length
+from lib.point_location.geo import generator
+
+
+def _length(path: dict) -> float:
+    return path_length(list(zip(path['x'], path['y'])))
+
+
+def test_route_legs_are_shortest_paths(polygon, index):
+    stops = generator.sample_interior_points(polygon, 6, seed=1)
+    result = route(index, stops)
+    assert result['order'] == list(range(6))
+    expected = [_length(index.shortest_path(p, q)) for p, q in zip(stops.tolist(), stops[1:].tolist())]
+    assert np.allclose(result['legs'], expected, rtol=0, atol=1e-9)
+    assert abs(_length(result) - sum(expected)) < 1e-9
+    path = list(zip(result['x'], result['y']))
+    assert all(tuple(p) in path for p in stops.tolist())
+
+
+def test_back_and_forth_legs_share_their_portals(polygon, index, monkeypatch):
+    a, b = generator.sample_interior_points(polygon, 2, seed=2).tolist()
+    calls = []
+    portal = index.portal
+    monkeypatch.setattr(index, 'portal', lambda t, n: calls.append((t, n)) or portal(t, n))
+
+    result = route(index, np.array([a, b, a, b]))
+    edges = {frozenset(edge) for edge in calls}
+    # Every edge is asked for once, whichever way and however many legs cross it.
+    assert len(calls) == len(edges)
+    assert np.allclose(result['legs'], [_length(index.shortest_path(a, b))] * 3, rtol=0, atol=1e-9)
+
+
+def test_routes_outside_or_without_stops(index):
+    assert route(index, np.array([[1e6, 1e6]])) is None
+    with pytest.raises(ValueError):
+        route(index, np.empty((0, 2)))
@@ -0,0 +1,91 @@
+import json
+import socket
+import struct
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from lib.path_finding.funnel import path_length
+from lib.point_location.geo import generator
+from lib.service.batching import MicroBatcher
+from lib.service.server import (REQUEST, RESPONSE, STATUS_NO_PATH, STATUS_OK, http_server, locator_batch_processor,
+                                unix_server)
+
+
+def _length(path: dict) -> float:
+    return path_length(list(zip(path['x'], path['y'])))
+
+
+@pytest.fixture
+def batcher(locator):
+    # Long enough a wait for the requests of a test to share a batch.
+    batcher = MicroBatcher(locator_batch_processor(locator), max_wait=0.2)
+    yield batcher
+    batcher.close()
+
+
+def _serve(server):
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def test_http_malformed_request_does_not_fail_its_batch(polygon, index, batcher):
+    server = _serve(http_server(batcher, port=0))
+    url = f'http://127.0.0.1:{server.server_address[1]}/path'
+    (a, b), (c, d) = generator.sample_interior_points(polygon, 4, seed=1).reshape(2, 2, 2).tolist()
+    bodies = [{'start': a, 'end': b}, {'start': ['x', 0.0], 'end': c}, {'start': c, 'end': d}]
+
+    def post(body: dict) -> tuple[int, dict]:
+        request = urllib.request.Request(url, json.dumps(body).encode(), {'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status, json.load(response)
+        except urllib.error.HTTPError as e:
+            return e.code, json.load(e)
+
+    try:
+        with ThreadPoolExecutor(3) as pool:
+            (status_1, path_1), (status_2, _), (status_3, path_3) = pool.map(post, bodies)
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert (status_1, status_2, status_3) == (200, 400, 200)
+    assert abs(_length(path_1) - _length(index.shortest_path(a, b))) < 1e-9
+    assert abs(_length(path_3) - _length(index.shortest_path(c, d))) < 1e-9
+
+
+def test_unix_pipelined_answers_come_back_in_order(polygon, index, batcher, tmp_path):
+    path = str(tmp_path / 'query.sock')
+    server = _serve(unix_server(batcher, path))
+    points = generator.sample_interior_points(polygon, 40, seed=2).reshape(20, 4).tolist()
+    # A request with coordinates that are not numbers in the middle of valid ones.
+    requests = points[:10] + [[float('nan')] * 4] + points[10:]
+
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.connect(path)
+    stream = client.makefile('rwb')
+    try:
+        stream.write(b''.join(REQUEST.pack(i, *r) for i, r in enumerate(requests)))
+        stream.flush()
+        answers = []
+        for _ in requests:
+            request_id, status, n = RESPONSE.unpack(stream.read(RESPONSE.size))
+            coordinates = struct.unpack(f'<{2 * n}d', stream.read(16 * n))
+            answers.append((request_id, status, {'x': coordinates[0::2], 'y': coordinates[1::2]}))
+    finally:
+        stream.close()
+        client.close()
+        server.shutdown()
+        server.server_close()
+
+    assert [request_id for request_id, _, _ in answers] == list(range(len(requests)))
+    for (_, status, path), (sx, sy, ex, ey) in zip(answers[:10] + answers[11:], points):
+        assert status == STATUS_OK
+        assert abs(_length(path) - _length(index.shortest_path((sx, sy), (ex, ey)))) < 1e-9
+    assert answers[10][1] == STATUS_NO_PATH
+    # All of them were answered in a batch or two, not one batch per request.
+    assert batcher.batches <= 2
@@ -0,0 +1,42 @@
+import numpy as np
+
+from lib.index.session import PathSession
+from lib.path_finding.funnel import path_length, string_pull
+from lib.point_location.geo import generator
+
+
+def test_session_moves_match_string_pull(polygon, index):
+    points = generator.sample_interior_points(polygon, 400, seed=3).tolist()
+    rng = np.random.default_rng(0)
+
+    session = PathSession(index, points[0], points[1])
+    for _ in range(600):
+        moving_end = bool(rng.random() < 0.7)
+        current = session.end if moving_end else session.start
+        # Mostly short moves, which step back and forth over the last triangles of the corridor.
+        target = points[rng.integers(len(points))]
+        if rng.random() < 0.8:
+            target = [c + 0.1 * (t - c) for c, t in zip(current, target)]
+        if index.locate(*target) < 0:
+            continue
+        path = session.move_end(target) if moving_end else session.move_start(target)
+        assert path is not None
+
+        corridor = session.corridor
+        expected = string_pull(index.portals(corridor), session.start, session.end)
+        assert list(zip(path['x'], path['y'])) == expected
+        fresh = index.shortest_path(session.start, session.end)
+        assert abs(path_length(expected) - path_length(list(zip(fresh['x'], fresh['y'])))) < 1e-9
+
+
+def test_moves_outside_leave_the_session_unchanged(polygon, index):
+    start, end, other = generator.sample_interior_points(polygon, 3, seed=4).tolist()
+    session = PathSession(index, start, end)
+    path = session.path
+    assert session.move_end((1e6, 1e6)) is None and session.move_start((1e6, 1e6)) is None
+    assert (session.start, session.end, session.path) == (tuple(start), tuple(end), path)
+
+    moved = session.move_start(other)
+    assert moved['x'][0] == other[0] and moved['x'][-1] == end[0]
+    fresh = index.shortest_path(other, end)
+    assert abs(path_length(list(zip(moved['x'], moved['y']))) - path_length(list(zip(fresh['x'], fresh['y'])))) < 1e-9
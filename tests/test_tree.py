@@ -0,0 +1,38 @@
+import numpy as np
+
+from lib.index.tree import SOURCE, ShortestPathTree, shortest_path_tree
+from lib.path_finding.funnel import path_length
+from lib.point_location.geo import generator
+from lib.point_location.geo.shapes import Point
+
+
+def _length(path: dict) -> float:
+    return path_length(list(zip(path['x'], path['y'])))
+
+
+def test_tree_answers_targets_like_shortest_path(polygon, locator, index):
+    origin, *targets = generator.sample_interior_points(polygon, 30, seed=1).tolist()
+    tree = locator.build_shortest_path_tree(Point(*origin))
+    for target in targets:
+        expected = _length(index.shortest_path(origin, target))
+        assert abs(tree.distance_to(target) - expected) < 1e-9
+        path = tree.path_to(target)
+        assert path['x'][0] == origin[0] and path['x'][-1] == target[0]
+        assert abs(_length(path) - expected) < 1e-9
+
+
+def test_vertex_distances_are_geodesic(polygon, index):
+    origin = generator.sample_interior_points(polygon, 1, seed=2)[0].tolist()
+    t0, parent, distance = shortest_path_tree(index, *origin)
+    tree = ShortestPathTree(index, origin)
+    assert np.array_equal(distance, tree.distance)
+
+    # Every vertex against a query to a point just inside one of its triangles.
+    corners = index.vertices[index.triangles]
+    for t in range(0, len(index.triangles), 7):
+        v = int(index.triangles[t, 0])
+        inside = corners[t, 0] + 1e-7 * (corners[t].mean(axis=0) - corners[t, 0])
+        assert abs(distance[v] - _length(index.shortest_path(origin, inside.tolist()))) < 1e-5
+        if parent[v] != SOURCE:
+            bend = index.vertices[parent[v]]
+            assert abs(distance[v] - distance[parent[v]] - np.hypot(*(index.vertices[v] - bend))) < 1e-9
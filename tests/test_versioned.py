@@ -0,0 +1,78 @@
+import threading
+
+from lib.index.flat import FlatIndex
+from lib.index.versioned import VersionedIndex
+from lib.path_finding.funnel import path_length
+from lib.point_location.geo import generator
+from lib.point_location.geo.shapes import Point
+from lib.point_location.kirkpatrick import MultiPolygonLocator
+from lib.service.batching import MicroBatcher
+from lib.service.server import locator_batch_processor
+
+
+def _locator(polygon) -> MultiPolygonLocator:
+    locator = MultiPolygonLocator()
+    locator.add_regions([polygon])
+    return locator
+
+
+def _length(path: dict) -> float:
+    return path_length(list(zip(path['x'], path['y'])))
+
+
+def test_queries_finish_on_the_version_they_started_on():
+    simple = FlatIndex.from_locator(_locator(generator.random_simple_polygon(200, seed=5)))
+    polygon = generator.random_polygon_with_hole(150, 40, seed=0)
+    hole = FlatIndex.from_locator(_locator(polygon))
+    # Two points of both polygons on either side of the hole.
+    points = [p for p in generator.sample_interior_points(polygon, 100, seed=1).tolist() if simple.locate(*p) >= 0]
+    start = points[0]
+    end = min(points, key=lambda p: p[0] * start[0] + p[1] * start[1])
+    straight = _length(simple.shortest_path(start, end))
+
+    released = []
+    handle = VersionedIndex(simple, release=released.append)
+    running = handle.acquire()
+    assert handle.swap(hole).number == 2
+    # The query that started before the swap is still answered on the simple polygon.
+    assert running.value is simple and _length(running.value.shortest_path(start, end)) == straight
+    with handle.use() as current:
+        assert current is hole and _length(current.shortest_path(start, end)) > straight
+    assert released == []
+    handle.release(running)
+    assert released == [simple] and running.drained.is_set()
+    handle.close()
+    assert released == [simple, hole]
+
+
+def test_reload_drops_no_query(polygon):
+    simple, hole = _locator(generator.random_simple_polygon(200, seed=5)), _locator(polygon)
+    handle = VersionedIndex(simple)
+    batcher = MicroBatcher(locator_batch_processor(handle), max_batch=8, workers=2)
+    points = [p for p in generator.sample_interior_points(polygon, 200, seed=1).tolist()
+              if simple.locate(Point(*p)) is not None]
+    pairs = list(zip(points[::2], points[1::2]))
+    expected = {i: {round(_length(locator.shortest_path(Point(*p), Point(*q))), 9) for locator in (simple, hole)}
+                for i, (p, q) in enumerate(pairs)}
+
+    answers, stop = [], threading.Event()
+
+    def query():
+        while not stop.is_set():
+            for i, (p, q) in enumerate(pairs):
+                answers.append((i, batcher.query(Point(*p), Point(*q), timeout=None)))
+
+    threads = [threading.Thread(target=query) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    try:
+        assert handle.reload(lambda: hole).result(timeout=10).number == 2
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+        batcher.close()
+        handle.close()
+    assert len(answers) >= len(pairs)
+    for i, path in answers:
+        assert path is not None and round(_length(path), 9) in expected[i]
@@ -0,0 +1,38 @@
+import numpy as np
+
+from lib.index.visibility import VisibilityIndex
+from lib.path_finding.funnel import from_ragged, path_length
+from lib.point_location.geo import generator
+from lib.point_location.kirkpatrick import MultiPolygonLocator
+
+
+def _length(path: dict) -> float:
+    return path_length(list(zip(path['x'], path['y'])))
+
+
+def test_visibility_paths_are_those_of_the_flat_index(polygon, index):
+    engine = VisibilityIndex(index)
+    assert engine.nbytes > 0 and len(engine.edge_offsets) == len(engine.node_keys) + 1
+    starts = generator.sample_interior_points(polygon, 100, seed=1)
+    ends = generator.sample_interior_points(polygon, 100, seed=2)
+    batch = from_ragged(*engine.shortest_paths(starts, ends))
+    for p, q, b in zip(starts.tolist(), ends.tolist(), batch):
+        a = engine.shortest_path(p, q)
+        assert (a['x'][0], a['y'][0]) == tuple(p) and (a['x'][-1], a['y'][-1]) == tuple(q)
+        expected = _length(index.shortest_path(p, q))
+        assert abs(_length(a) - expected) < 1e-6 and abs(_length(b) - expected) < 1e-6
+
+
+def test_no_path_outside_or_between_polygons(polygon, index):
+    engine = VisibilityIndex(index)
+    p = generator.sample_interior_points(polygon, 1, seed=3)[0].tolist()
+    assert engine.shortest_path((1e6, 1e6), p) is None
+    assert from_ragged(*engine.shortest_paths(np.array([[1e6, 1e6]]), np.array([p]))) == [None]
+
+    polygons = [generator.random_simple_polygon(60, seed=1, radius=10.0),
+                generator.random_polygon_with_hole(60, 20, seed=2, radius=10.0, center=(30.0, 0.0))]
+    locator = MultiPolygonLocator()
+    locator.add_regions(polygons)
+    engine = VisibilityIndex(locator.flat_index())
+    a, b = (generator.sample_interior_points(q, 1, seed=4)[0].tolist() for q in polygons)
+    assert engine.shortest_path(a, b) is None